@@ -0,0 +1,87 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Run the benchmarks, storing the results as JSON so runs can be compared across commits:
+
+    python -m benchmarks [--only book nbbo ...] [--output FILE] [--compare BASELINE.json] [--threshold 0.1]
+
+Results are written to benchmarks/results/<commit>.json by default. With --compare,
+per operation times are compared to the baseline and the exit status is 1 if any
+benchmark is slower by more than the threshold.
+'''
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import Suite
+
+
+MODULES = ('imports', 'book', 'callback', 'nbbo', 'backends', 'exchanges', 'parse')
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list:
+    """
+    Print the change of each benchmark against the baseline, returns the regressions
+    """
+    regressions = []
+    print(f"\n{'benchmark':<50} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['per_op']
+        change = result['per_op'] / before - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = ' REGRESSION'
+        print(f"{name:<50} {before * 1e6:10.3f}us {result['per_op'] * 1e6:10.3f}us {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cryptofeed benchmarks")
+    parser.add_argument('--only', nargs='+', choices=MODULES, help='benchmark modules to run')
+    parser.add_argument('--output', help='results file, defaults to benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', help='baseline results file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown reported as a regression')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    suite = Suite(repeat=args.repeat)
+    for module in args.only or MODULES:
+        importlib.import_module(f'benchmarks.{module}').run(suite)
+    suite.close()
+
+    commit = _commit()
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump({'commit': commit, 'time': time.time(), 'python': platform.python_version(),
+                   'platform': platform.platform(), 'results': suite.results}, fp, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+        if compare(baseline, suite.results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
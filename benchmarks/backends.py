@@ -0,0 +1,71 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Backend serialization: conversion of the callback data by the backend callbacks
+and JSON encoding, as done by the socket, zmq and http backends
+'''
+import json
+from decimal import Decimal
+
+from cryptofeed.backends.backend import BackendBookCallback, BackendBookDeltaCallback, BackendTradeCallback
+from cryptofeed.defines import BID, ASK, BUY
+from cryptofeed.util.book import BookView
+
+from benchmarks.book import make_book
+
+
+class _Serialize:
+    def __init__(self, numeric_type=float):
+        self.numeric_type = numeric_type
+
+    async def write(self, feed, pair, timestamp, data):
+        json.dumps(data)
+
+
+class _Trade(_Serialize, BackendTradeCallback):
+    pass
+
+
+class _Book(_Serialize, BackendBookCallback):
+    pass
+
+
+class _Delta(_Serialize, BackendBookDeltaCallback):
+    pass
+
+
+def run(suite):
+    count = 10000
+    for numeric_type in (float, str):
+        name = numeric_type.__name__
+        trade = _Trade(numeric_type)
+
+        async def trades():
+            for _ in range(count):
+                await trade(feed='BENCH', pair='BTC-USD', side=BUY, amount=Decimal('1.5'), price=Decimal('7500.5'), order_id='1', timestamp=0.0)
+        suite.time_async(f"backends.trade {name}", trades, count, numeric_type=name)
+
+        delta = _Delta(numeric_type)
+        update = {BID: [(Decimal('7500.5'), Decimal('1.5'))], ASK: [(Decimal('7501'), Decimal(0))]}
+
+        async def deltas():
+            for _ in range(count):
+                await delta(feed='BENCH', pair='BTC-USD', delta=update, timestamp=0.0)
+        suite.time_async(f"backends.book_delta {name}", deltas, count, numeric_type=name)
+
+        for levels in (100, 1000):
+            book = make_book(levels)
+            books = [_Book(numeric_type) for _ in range(3)]
+
+            async def full_books(view=False):
+                for _ in range(100):
+                    data = BookView(book) if view else book
+                    # three backends subscribed to the same book
+                    for backend in books:
+                        await backend(feed='BENCH', pair='BTC-USD', book=data, timestamp=0.0)
+            suite.time_async(f"backends.book[{levels}] x3 {name}", full_books, 100, levels=levels, numeric_type=name)
+            suite.time_async(f"backends.book[{levels}] x3 BookView {name}", lambda: full_books(True), 100, levels=levels, numeric_type=name)
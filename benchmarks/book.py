@@ -0,0 +1,53 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+util.book depth / book_delta and backends._util book_convert / book_flatten,
+against the size of the book
+'''
+import random
+from decimal import Decimal
+
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.backends._util import book_convert, book_flatten
+from cryptofeed.defines import BID, ASK
+from cryptofeed.util.book import depth, book_delta
+
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def make_book(levels: int, seed=1) -> dict:
+    rng = random.Random(seed)
+    mid = Decimal(10000)
+    tick = Decimal('0.5')
+    return {
+        BID: sd({mid - tick * (i + 1): Decimal(rng.randint(1, 10000)) / 1000 for i in range(levels)}),
+        ASK: sd({mid + tick * (i + 1): Decimal(rng.randint(1, 10000)) / 1000 for i in range(levels)})
+    }
+
+
+def changed(book: dict, changes: int, seed=2) -> dict:
+    """
+    Copy of the book with `changes` levels per side resized
+    """
+    rng = random.Random(seed)
+    ret = {BID: sd(book[BID]), ASK: sd(book[ASK])}
+    for side in (BID, ASK):
+        for price in rng.sample(list(ret[side]), min(changes, len(ret[side]))):
+            ret[side][price] += 1
+    return ret
+
+
+def run(suite):
+    for size in SIZES:
+        book = make_book(size)
+        later = changed(book, 5)
+        suite.time(f"book.depth[{size}] top 10", lambda: depth(book, 10), levels=size)
+        suite.time(f"book.book_delta[{size}] 5 changes", lambda: book_delta(book, later), levels=size)
+        suite.time(f"book.book_convert[{size}]", lambda: book_convert(book, {BID: {}, ASK: {}}), levels=size)
+        suite.time(f"book.book_flatten[{size}]", lambda: book_flatten('BENCH', 'BTC-USD', book, 0.0, False), levels=size)
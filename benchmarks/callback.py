@@ -0,0 +1,53 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Callback dispatch overhead, per dispatch mode and through Feed.callback
+'''
+from decimal import Decimal
+
+from cryptofeed.callback import Callback, TradeCallback
+from cryptofeed.defines import BITMEX, TRADES, BUY, INLINE, EXECUTOR
+from cryptofeed.feed import Feed
+
+
+class _Feed(Feed):
+    # bitmex does not load pair mappings, so no network access is needed
+    id = BITMEX
+
+
+async def _handler(*args, **kwargs):
+    pass
+
+
+def _sync_handler(*args, **kwargs):
+    pass
+
+
+def run(suite):
+    count = 10000
+    trade = dict(feed=BITMEX, pair='BTC-USD', side=BUY, amount=Decimal('1.5'), price=Decimal('7500.5'), order_id=None, timestamp=0.0)
+
+    def calls(cb, number=count):
+        async def run():
+            for _ in range(number):
+                await cb(**trade)
+        return run
+
+    suite.time_async("callback.Callback coroutine", calls(Callback(_handler)), count)
+    suite.time_async("callback.Callback INLINE", calls(Callback(_sync_handler, dispatch=INLINE)), count)
+    suite.time_async("callback.Callback EXECUTOR", calls(Callback(_sync_handler, dispatch=EXECUTOR), 1000), 1000)
+    suite.time_async("callback.TradeCallback coroutine", calls(TradeCallback(_handler)), count)
+
+    for callbacks in (1, 4):
+        feed = _Feed(None, callbacks={TRADES: [TradeCallback(_handler) for _ in range(callbacks)]})
+
+        def feed_calls():
+            async def run():
+                for _ in range(count):
+                    await feed.callback(TRADES, **trade)
+            return run()
+        suite.time_async(f"callback.Feed.callback {callbacks} callbacks", feed_calls, count, callbacks=callbacks)
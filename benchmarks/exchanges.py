@@ -0,0 +1,87 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Per exchange message handling throughput (decode, parse and book maintenance)
+on a recorded session of the exchange simulator (cryptofeed.util.simulator),
+generated with a fixed seed so runs are comparable
+'''
+import json
+import random
+from unittest import mock
+
+from cryptofeed.defines import COINBASE, BITMEX, HUOBI, OKEX, L2_BOOK, TRADES
+from cryptofeed.exchanges import Coinbase, Bitmex, Huobi, OKEx
+from cryptofeed.util.simulator import Market, _PROTOCOLS
+
+
+# exchange -> (feed class, exchange pair, standard pair)
+EXCHANGES = {
+    COINBASE: (Coinbase, 'BTC-USD', 'BTC-USD'),
+    BITMEX: (Bitmex, 'XBTUSD', 'XBTUSD'),
+    HUOBI: (Huobi, 'btcusdt', 'BTC-USDT'),
+    OKEX: (OKEx, 'BTC-USDT', 'BTC-USDT')
+}
+
+
+class _Websocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(msg)
+
+
+async def _handler(*args, **kwargs):
+    pass
+
+
+def record(loop, instance, exchange, count, levels=100):
+    """
+    Frames the simulator sends for the feed's subscriptions (one pair, book and trades)
+    """
+    rng = random.Random(1)
+    protocol = _PROTOCOLS[exchange]()
+    market = Market(rng, levels=levels)
+    websocket = _Websocket()
+    loop.run_until_complete(instance.subscribe(websocket))
+    channels = {}
+    for msg in websocket.sent:
+        for data_type, pair, channel in protocol.subscribe(json.loads(msg))[0]:
+            channels[data_type] = channel
+
+    frames = [protocol.encode(msg) for msg in protocol.snapshot(pair, channels[L2_BOOK], market)]
+    while len(frames) < count:
+        data_type, side, price, size = market.step()
+        if data_type == L2_BOOK:
+            messages = protocol.book(pair, channels[L2_BOOK], market, side, price, size)
+        else:
+            messages = protocol.trade(pair, channels[TRADES], side, price, size)
+        frames.extend(protocol.encode(msg) for msg in messages)
+    return frames
+
+
+def feed(exchange):
+    feed_class, pair, std_pair = EXCHANGES[exchange]
+    # pair mappings and instruments come from the exchanges' REST apis, supply them
+    with mock.patch('cryptofeed.standards.gen_pairs', return_value={std_pair: pair}), \
+         mock.patch.object(Bitmex, 'get_active_symbols', return_value=[pair]):
+        return feed_class(pairs=[std_pair], channels=[L2_BOOK, TRADES], callbacks={L2_BOOK: _handler, TRADES: _handler})
+
+
+def run(suite):
+    count = 20000
+    for exchange in EXCHANGES:
+        instance = feed(exchange)
+        frames = record(suite.loop, instance, exchange, count)
+
+        async def replay():
+            await instance.subscribe(_Websocket())
+            for frame in frames:
+                if instance.compressed:
+                    frame = instance.decode(frame)
+                await instance.message_handler(frame, 0.0)
+        suite.time_async(f"exchanges.{exchange.lower()} book + trades", replay, len(frames), frames=len(frames))
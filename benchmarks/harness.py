@@ -0,0 +1,75 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import time
+
+
+class Suite:
+    """
+    Collects timings. Each benchmark is run `repeat` times and the fastest run is
+    kept, as the least disturbed by the rest of the machine
+    """
+    def __init__(self, repeat=3, min_time=0.2):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.results = {}
+        self.loop = asyncio.new_event_loop()
+
+    def _record(self, name, per_op, ops, params):
+        self.results[name] = dict(params, per_op=per_op, ops_per_sec=1 / per_op if per_op else None, ops=ops)
+        print(f"{name:<50} {per_op * 1e6:12.3f} us/op")
+
+    def _calibrate(self, func) -> int:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time / 10:
+                # enough runs for min_time
+                return max(1, int(number * self.min_time / elapsed))
+            number *= 10
+
+    def time(self, name, func, number=None, **params):
+        """
+        Time a function taking no arguments
+        """
+        number = number or self._calibrate(func)
+        best = None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        self._record(name, best / number, number, params)
+
+    def time_async(self, name, make_run, ops, **params):
+        """
+        Time a coroutine performing `ops` operations. make_run is called before
+        each run, so state (e.g. books) can be reset, and returns the coroutine
+        """
+        best = None
+        for _ in range(self.repeat):
+            run = make_run()
+            start = time.perf_counter()
+            self.loop.run_until_complete(run)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        self._record(name, best / ops, ops, params)
+
+    def measure(self, name, func, **params):
+        """
+        Record a time in seconds reported by `func`, for timings that are measured
+        elsewhere (e.g. in a subprocess)
+        """
+        best = min(func() for _ in range(self.repeat))
+        self._record(name, best, 1, params)
+
+    def close(self):
+        self.loop.close()
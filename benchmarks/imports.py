@@ -0,0 +1,35 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Import time of cryptofeed, from the interpreter's -X importtime report
+'''
+import subprocess
+import sys
+
+
+def import_time(code: str, module: str) -> float:
+    """
+    Cumulative import time (seconds) of `module` when running `code` in a new interpreter
+    """
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+    times = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            # a module can be listed more than once, e.g. when imported by a lazy attribute access
+            times.append(int(cumulative))
+    if not times:
+        raise ValueError(f"{module} not imported")
+    return max(times) / 1e6
+
+
+def run(suite):
+    suite.measure("imports.import cryptofeed", lambda: import_time('import cryptofeed', 'cryptofeed'))
+    suite.measure("imports.from cryptofeed import FeedHandler", lambda: import_time('from cryptofeed import FeedHandler', 'cryptofeed.feedhandler'))
+    suite.measure("imports.from cryptofeed.exchanges import Coinbase", lambda: import_time('from cryptofeed.exchanges import Coinbase', 'cryptofeed.exchanges'))
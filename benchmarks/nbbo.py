@@ -0,0 +1,70 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+NBBO update cost, from full books, book deltas and top of book updates
+'''
+import random
+from decimal import Decimal
+
+from cryptofeed.defines import BID, ASK, INLINE
+from cryptofeed.nbbo import NBBO
+
+from benchmarks.book import make_book
+
+
+FEEDS = ('A', 'B', 'C', 'D')
+
+
+def _noop(*args):
+    pass
+
+
+def run(suite):
+    count = 5000
+    rng = random.Random(1)
+    books = {feed: make_book(100, seed=i) for i, feed in enumerate(FEEDS)}
+    updates = []
+    for _ in range(count):
+        feed = rng.choice(FEEDS)
+        side = rng.choice((BID, ASK))
+        price = books[feed][side].peekitem(-1 if side == BID else 0)[0]
+        # mostly at the touch, where the NBBO changes
+        price += Decimal('0.5') * rng.randint(-1, 1)
+        updates.append((feed, side, price, Decimal(rng.randint(0, 5000)) / 1000))
+
+    def from_books():
+        nbbo = NBBO(_noop, ['BTC-USD'], dispatch=INLINE)
+
+        async def run():
+            for feed, side, price, size in updates:
+                await nbbo(feed=feed, pair='BTC-USD', book=books[feed], timestamp=0.0)
+        return run()
+
+    def from_deltas(depth=None):
+        def make():
+            nbbo = NBBO(_noop, ['BTC-USD'], deltas=True, depth=depth, depth_callback=_noop if depth else None, dispatch=INLINE)
+
+            async def run():
+                for feed in FEEDS:
+                    await nbbo(feed=feed, pair='BTC-USD', book=books[feed], timestamp=0.0)
+                for feed, side, price, size in updates:
+                    await nbbo.delta(feed=feed, pair='BTC-USD', delta={BID: [(price, size)] if side == BID else [], ASK: [(price, size)] if side == ASK else []}, timestamp=0.0)
+            return run()
+        return make
+
+    def from_top():
+        nbbo = NBBO(_noop, ['BTC-USD'], dispatch=INLINE)
+
+        async def run():
+            for feed, side, price, size in updates:
+                await nbbo.top_of_book(feed=feed, pair='BTC-USD', bid=price - 1, bid_size=size, ask=price + 1, ask_size=size)
+        return run()
+
+    suite.time_async("nbbo.book", from_books, count)
+    suite.time_async("nbbo.delta", from_deltas(), count)
+    suite.time_async("nbbo.delta depth 10", from_deltas(10), count)
+    suite.time_async("nbbo.top_of_book", from_top, count)
@@ -0,0 +1,85 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Event loop cost of a message of the exchanges split into Feed.parse / Feed.apply,
+handled inline (parse then apply) or with parse_processes, where the loop receives
+the result of parse from a worker (unpickling) and applies it
+'''
+import json
+import pickle
+import random
+from unittest import mock
+
+from sortedcontainers import SortedDict as sd
+
+from benchmarks.exchanges import feed, record, _Websocket
+from cryptofeed.defines import BITMEX, OKEX, BINANCE, L2_BOOK, TRADES, BID, ASK
+from cryptofeed.exchanges import Binance
+
+
+async def _handler(*args, **kwargs):
+    pass
+
+
+def _binance(count):
+    """
+    Binance feed with its book initialized (the snapshot comes from the REST api), and
+    synthetic depth updates and trades
+    """
+    with mock.patch('cryptofeed.standards.gen_pairs', return_value={'BTC-USDT': 'BTCUSDT'}):
+        instance = Binance(pairs=['BTC-USDT'], channels=[L2_BOOK, TRADES], callbacks={L2_BOOK: _handler, TRADES: _handler})
+    rng = random.Random(1)
+    frames = []
+    for i in range(count):
+        if i % 4 == 3:
+            data = {'e': 'aggTrade', 'E': i, 's': 'BTCUSDT', 'a': i, 'p': f"{7500 + rng.randint(-50, 50) / 10:.1f}",
+                    'q': f"{rng.random():.4f}", 'f': i, 'l': i, 'T': i, 'm': rng.random() < 0.5, 'M': True}
+            frames.append(json.dumps({'stream': 'btcusdt@aggTrade', 'data': data}))
+        else:
+            levels = [[[f"{7500 + sign * rng.randint(1, 500) / 10:.1f}", f"{rng.random():.4f}" if rng.random() < 0.8 else "0"]
+                       for _ in range(rng.randint(1, 10))] for sign in (-1, 1)]
+            data = {'e': 'depthUpdate', 'E': i, 's': 'BTCUSDT', 'U': i, 'u': i, 'b': levels[0], 'a': levels[1]}
+            frames.append(json.dumps({'stream': 'btcusdt@depth@100ms', 'data': data}))
+
+    def reset():
+        instance.l2_book = {'BTC-USDT': {BID: sd(), ASK: sd()}}
+        instance.last_update_id = {}
+    return instance, frames, reset
+
+
+def run(suite):
+    count = 20000
+    setups = {}
+    for exchange in (BITMEX, OKEX):
+        instance = feed(exchange)
+        frames = record(suite.loop, instance, exchange, count)
+        if instance.compressed:
+            # decompression is timed separately, see decode_threads
+            frames = [instance.decode(frame) for frame in frames]
+        setups[exchange] = (instance, frames, lambda instance=instance: suite.loop.run_until_complete(instance.subscribe(_Websocket())))
+    setups[BINANCE] = _binance(count)
+
+    for exchange, (instance, frames, reset) in setups.items():
+        parsed = [pickle.dumps(type(instance).parse(frame), pickle.HIGHEST_PROTOCOL) for frame in frames]
+
+        async def inline():
+            for frame in frames:
+                await instance.apply(instance.parse(frame), 0.0)
+
+        async def worker():
+            for result in parsed:
+                await instance.apply(pickle.loads(result), 0.0)
+
+        def make(run):
+            reset()
+            return run()
+
+        name = exchange.lower()
+        suite.time_async(f"parse.{name} inline", lambda: make(inline), len(frames), frames=len(frames))
+        suite.time_async(f"parse.{name} parse_processes", lambda: make(worker), len(frames), frames=len(frames),
+                         result_bytes=sum(len(result) for result in parsed) // len(parsed))
+
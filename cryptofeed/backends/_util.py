@@ -4,6 +4,8 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+from collections.abc import Mapping
+
 from cryptofeed.defines import BID, ASK
 
 
@@ -30,19 +32,15 @@ def book_convert(book: dict, data: dict, convert=str):
     """
     for level in book[ASK]:
         _level = convert(level)
-        if isinstance(book[ASK][level], dict):
-            data[ASK][_level] = book[ASK][level]
-            for order in data[ASK][_level]:
-                data[ASK][_level][order] = convert(data[ASK][_level][order])
+        if isinstance(book[ASK][level], Mapping):
+            data[ASK][_level] = {order: convert(size) for order, size in book[ASK][level].items()}
         else:
             data[ASK][_level] = convert(book[ASK][level])
 
     for level in reversed(book[BID]):
         _level = convert(level)
-        if isinstance(book[BID][level], dict):
-            data[BID][_level] = book[BID][level]
-            for order in data[BID][convert(level)]:
-                data[BID][_level][order] = convert(data[BID][_level][order])
+        if isinstance(book[BID][level], Mapping):
+            data[BID][_level] = {order: convert(size) for order, size in book[BID][level].items()}
         else:
             data[BID][_level] = convert(book[BID][level])
 
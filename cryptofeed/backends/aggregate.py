@@ -4,10 +4,20 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
+import heapq
+import logging
 import time
+from collections import OrderedDict, deque
 from decimal import Decimal
 import numpy as np
 
+from cryptofeed.defines import BID, ASK
+from cryptofeed.util.book import BookView
+
+
+LOG = logging.getLogger('feedhandler')
+
 
 class AggregateCallback:
     def __init__(self, handler, *args, **kwargs):
@@ -32,6 +42,138 @@ class Throttle(AggregateCallback):
             await self.handler(**kwargs)
 
 
+class Conflate(AggregateCallback):
+    """
+    Wraps an L2_BOOK, L3_BOOK or BOOK_DELTA callback and conflates updates, per feed
+    and pair, for consumers that cannot keep up with the update rate. Unlike Throttle
+    no state is lost: book deltas are merged (the last size at a price, or of an order
+    at a price for L3 deltas, wins, a size of 0 still deletes) and full books are
+    replaced by the latest one, and the pending update of every pair is eventually
+    delivered. An instance can be registered for both books and deltas: a book
+    replaces the pending delta of its pair, and the deltas that follow it are merged
+    and delivered after it, so the latest state is always delivered last.
+
+    If interval is None, updates are published as soon as the handler is free, i.e.
+    updates arriving while the handler is busy are merged and delivered on its next
+    call. Otherwise pending updates are published every `interval` seconds. An update
+    whose handler raises stays pending, and is retried with the next publish, or
+    after `retry_delay` seconds if interval is None.
+
+    With book views (book_view=True) the book is copied on arrival, since views
+    are only valid until the callback returns.
+    """
+
+    def __init__(self, *args, interval=None, retry_delay=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.retry_delay = retry_delay
+        # (feed, pair) -> {'book': pending book kwargs, 'delta': pending delta kwargs}, in arrival order
+        self.pending = {}
+        self.task = None
+        self.updates = 0
+        self.published = 0
+
+    async def __call__(self, *, feed: str, pair: str, timestamp, **kwargs):
+        self.updates += 1
+        if 'delta' in kwargs:
+            self._merge((feed, pair), {'feed': feed, 'pair': pair, 'delta': self._delta_levels(kwargs['delta']), 'timestamp': timestamp})
+        else:
+            book = kwargs['book']
+            if isinstance(book, BookView):
+                book = book.copy()
+            self._merge((feed, pair), {'feed': feed, 'pair': pair, 'book': book, 'timestamp': timestamp})
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+
+    @staticmethod
+    def _delta_levels(delta) -> dict:
+        """
+        {side: {price: size}} for L2 deltas, {side: {(order id, price): size}} for L3 deltas
+        """
+        ret = {}
+        for side in (BID, ASK):
+            levels = ret[side] = {}
+            for entry in delta[side]:
+                level = entry[0] if len(entry) == 2 else entry[:2]
+                # re-insert so the merged delta keeps the order of the latest updates
+                levels.pop(level, None)
+                levels[level] = entry[-1]
+        return ret
+
+    def _merge(self, key, update):
+        """
+        Merge an update into the pending updates of its feed and pair
+        """
+        pending = self.pending.get(key)
+        if pending is None:
+            pending = self.pending[key] = {}
+        if 'book' in update:
+            # the book includes the pending delta
+            pending.pop('delta', None)
+            pending['book'] = update
+        elif 'delta' not in pending:
+            pending['delta'] = update
+        else:
+            merged = pending['delta']
+            for side in (BID, ASK):
+                levels = merged['delta'][side]
+                for level, size in update['delta'][side].items():
+                    levels.pop(level, None)
+                    levels[level] = size
+            merged['timestamp'] = update['timestamp']
+
+    async def _run(self):
+        while True:
+            if self.interval is not None:
+                await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                LOG.error("Conflate: exception in handler", exc_info=True)
+                if self.interval is None:
+                    # retry, also if no further update arrives for the pair
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+            if self.interval is None:
+                return
+
+    async def flush(self):
+        """
+        Publish all pending updates, including updates that arrive while publishing.
+        If the handler raises, the update remains pending and the exception is raised
+        """
+        while self.pending:
+            key = next(iter(self.pending))
+            # updates arriving while the handler runs start new pending updates
+            pending = self.pending.pop(key)
+            for kind in ('book', 'delta'):
+                if kind not in pending:
+                    continue
+                update = pending[kind]
+                kwargs = dict(update)
+                if kind == 'delta':
+                    kwargs['delta'] = {side: [(*level, size) if isinstance(level, tuple) else (level, size) for level, size in levels.items()]
+                                       for side, levels in update['delta'].items()}
+                try:
+                    await self.handler(**kwargs)
+                except Exception:
+                    # put the undelivered updates back, under the updates that arrived since
+                    newer = self.pending.pop(key, None)
+                    self.pending[key] = pending
+                    if newer is not None:
+                        for update in newer.values():
+                            self._merge(key, update)
+                    raise
+                del pending[kind]
+                self.published += 1
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
 class OHLCV(AggregateCallback):
     """
     Aggregate trades and calculate OHLCV for time window
@@ -69,68 +211,454 @@ class OHLCV(AggregateCallback):
         self._agg(pair, amount, price)
 
 
+class OHLCVBars(AggregateCallback):
+    """
+    OHLCV bars for several windows at once (e.g. windows=(1, 60, 300)), aligned to
+    wall clock boundaries (a 60 second bar starts on the minute). Every window must
+    be a multiple of the smallest one.
+
+    Trades are assigned to bars by their (exchange) timestamp and only update the
+    smallest window; larger windows are rolled up, for all pairs at once, from the
+    smaller bars as they close. Bars are closed by a timer, so a bar is published
+    even if no trades arrive, `lateness` seconds after the end of its window.
+    Trades arriving after their bar has closed are dropped and counted in `late`.
+    For each window the handler is called with:
+
+        handler(window=window, start=bar start, data={pair: {'open', 'high', 'low', 'close', 'volume', 'vwap', 'trades'}})
+
+    Pairs without trades in the window are reported with the last close price
+    and a volume of 0. Values are floats.
+    """
+    OPEN, HIGH, LOW, CLOSE, VOLUME, NOTIONAL, TRADES = range(7)
+
+    def __init__(self, *args, windows=(60,), lateness=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.windows = sorted(windows)
+        self.base = self.windows[0]
+        if any(window % self.base for window in self.windows):
+            raise ValueError("All windows must be multiples of the smallest window")
+        self.lateness = lateness
+        # pair -> row in the accumulator arrays
+        self.rows = {}
+        self.names = []
+        self.last_close = []
+        # base bar start -> {row: [open, high, low, close, volume, notional, trades]}
+        self.open_bars = {}
+        # window -> bar start -> array (rows x fields)
+        self.rollups = {window: {} for window in self.windows[1:]}
+        # bars starting before this time are closed
+        self.closed_until = None
+        self.late = 0
+        self.timer = None
+
+    def _row(self, pair):
+        if pair not in self.rows:
+            self.rows[pair] = len(self.names)
+            self.names.append(pair)
+            self.last_close.append(float('nan'))
+        return self.rows[pair]
+
+    async def __call__(self, *, feed: str, pair: str, side: str, amount: Decimal, price: Decimal, order_id=None, timestamp=None):
+        if self.timer is None:
+            self.timer = asyncio.ensure_future(self._run_timer())
+        now = time.time()
+        ts = timestamp if timestamp is not None else now
+        start = ts - ts % self.base
+        if self.closed_until is not None and start < self.closed_until:
+            self.late += 1
+            return
+
+        price = float(price)
+        amount = float(amount)
+        bar = self.open_bars.setdefault(start, {})
+        row = self._row(pair)
+        acc = bar.get(row)
+        if acc is None:
+            bar[row] = [price, price, price, price, amount, price * amount, 1]
+        else:
+            if price > acc[1]:
+                acc[1] = price
+            elif price < acc[2]:
+                acc[2] = price
+            acc[3] = price
+            acc[4] += amount
+            acc[5] += price * amount
+            acc[6] += 1
+
+    async def _run_timer(self):
+        while True:
+            now = time.time()
+            boundary = now - self.lateness
+            await asyncio.sleep(boundary - boundary % self.base + self.base - boundary)
+            try:
+                await self.close_bars(time.time())
+            except Exception:
+                # keep closing bars, a failing handler only loses the bars being published
+                LOG.error("OHLCVBars: exception closing bars", exc_info=True)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _base_array(self, bar):
+        data = np.empty((len(self.names), 7))
+        data[:, self.OPEN:self.CLOSE + 1] = np.array(self.last_close)[:, None]
+        data[:, self.VOLUME:] = 0
+        for row, acc in bar.items():
+            data[row] = acc
+        return data
+
+    def _merge(self, acc, bar):
+        if len(acc) < len(bar):
+            pad = np.zeros((len(bar) - len(acc), 7))
+            pad[:, self.OPEN:self.CLOSE + 1] = np.nan
+            acc = np.vstack((acc, pad))
+        traded = bar[:, self.TRADES] > 0
+        first = traded & (acc[:, self.TRADES] == 0)
+        both = traded & ~first
+        acc[first, self.OPEN:self.CLOSE + 1] = bar[first, self.OPEN:self.CLOSE + 1]
+        acc[both, self.HIGH] = np.maximum(acc[both, self.HIGH], bar[both, self.HIGH])
+        acc[both, self.LOW] = np.minimum(acc[both, self.LOW], bar[both, self.LOW])
+        acc[both, self.CLOSE] = bar[both, self.CLOSE]
+        # pairs that have not traded yet in this window carry the last close
+        idle = ~traded & (acc[:, self.TRADES] == 0)
+        acc[idle, self.OPEN:self.CLOSE + 1] = bar[idle, self.OPEN:self.CLOSE + 1]
+        acc[:, self.VOLUME:] += bar[:, self.VOLUME:]
+        return acc
+
+    def _to_dict(self, data):
+        ret = {}
+        for row, pair in enumerate(self.names[:len(data)]):
+            bar = data[row]
+            if np.isnan(bar[self.CLOSE]):
+                continue
+            volume = bar[self.VOLUME]
+            ret[pair] = {'open': bar[self.OPEN], 'high': bar[self.HIGH], 'low': bar[self.LOW], 'close': bar[self.CLOSE],
+                         'volume': volume, 'vwap': bar[self.NOTIONAL] / volume if volume else bar[self.CLOSE],
+                         'trades': int(bar[self.TRADES])}
+        return ret
+
+    async def close_bars(self, now: float):
+        """
+        Close and publish every bar that ended at least `lateness` seconds before now
+        """
+        boundary = now - self.lateness
+        limit = boundary - boundary % self.base
+        start = self.closed_until
+        if start is None:
+            start = min(self.open_bars) if self.open_bars else limit
+        if start >= limit:
+            return
+
+        # bars are closed synchronously, so concurrent calls (timer and trades) never publish twice
+        self.closed_until = limit
+        updates = []
+        while start < limit:
+            data = self._base_array(self.open_bars.pop(start, {}))
+            self.last_close = data[:, self.CLOSE].tolist()
+            updates.append((self.base, start, data))
+            end = start + self.base
+            for window, bars in self.rollups.items():
+                bar_start = start - start % window
+                acc = bars.get(bar_start)
+                bars[bar_start] = data.copy() if acc is None else self._merge(acc, data)
+                if end - bar_start == window:
+                    updates.append((window, bar_start, bars.pop(bar_start)))
+            start = end
+
+        for window, start, data in updates:
+            await self.handler(window=window, start=start, data=self._to_dict(data))
+
+
+class _RenkoState:
+    __slots__ = ('open', 'close', 'high', 'low', 'direction', 'brick_size')
+
+    def __init__(self, price, brick_size):
+        self.open = price
+        self.close = None
+        self.high = price
+        self.low = price
+        self.direction = 0
+        self.brick_size = brick_size
+
+
 class RenkoFixed(AggregateCallback):
     """
     Aggregate trades into Renko bricks with fixed size
     brick size is in points, default to 10 (change to ticks later?)
+
+    State is kept per pair. When a brick completes, the handler is called with
+    the last brick of every pair:
+
+        handler(data={pair: {'brick_open': price, 'brick_close': price}, ...})
     """
 
     def __init__(self, *args, brick_size=10, **kwargs):
         super().__init__(*args, **kwargs)
         self.brick_size = brick_size
-        self.new_brick = True
+        self.state = {}
         self.data = {}
-        self.brick_open = None
-        self.brick_close = None
-        self.brick_high = None
-        self.brick_low = None
-        self.prev_direction = 0
 
-    @staticmethod
-    def greater_abs(minus, plus):
-        return minus if -minus > plus else plus
+    def _brick_size(self, pair, state, price, timestamp):
+        return self.brick_size
 
-    def _agg(self, pair, price):
-        if pair not in self.data:
-            self.brick_open = price
-            self.brick_high = price
-            self.brick_low = price
+    def _agg(self, pair, price, timestamp=None) -> bool:
+        """
+        Update the pair's brick with a trade, return True if a brick was completed
+        """
+        state = self.state.get(pair)
+        if state is None:
+            state = self.state[pair] = _RenkoState(price, self._brick_size(pair, None, price, timestamp))
             self.data[pair] = {'brick_open': price, 'brick_close': price}
 
-        self.brick_low = np.min([self.brick_low, price])
-        self.brick_high = np.max([self.brick_high, price])
+        if price < state.low:
+            state.low = price
+        elif price > state.high:
+            state.high = price
 
         # Reversal brick logic
-        if self.prev_direction == 0:
-            self.minus_diff = self.brick_low - self.brick_open
-            self.plus_diff = self.brick_high - self.brick_open
-        elif self.prev_direction == 1:
-            self.minus_diff = self.brick_low - self.brick_open
-            self.plus_diff = self.brick_high - self.brick_close
-        elif self.prev_direction == -1:
-            self.minus_diff = self.brick_low - self.brick_close
-            self.plus_diff = self.brick_high - self.brick_open
-        self.greater_diff = self.greater_abs(self.minus_diff, self.plus_diff)
-
-        if abs(self.greater_diff) >= self.brick_size:
-            self.new_brick = True
-            self.new_direction = np.sign(self.greater_diff)
-            same = self.new_direction == self.prev_direction
-            if same:
-                self.brick_open = self.brick_close
-            self.data[pair]['brick_open'] = self.brick_open
-            self.brick_close = price
-            self.data[pair]['brick_close'] = self.brick_close
-            self.brick_high = self.brick_low = self.brick_close
-            self.prev_direction = self.new_direction
+        if state.direction == 1:
+            minus_diff = state.low - state.open
+            plus_diff = state.high - state.close
+        elif state.direction == -1:
+            minus_diff = state.low - state.close
+            plus_diff = state.high - state.open
+        else:
+            minus_diff = state.low - state.open
+            plus_diff = state.high - state.open
+        greater_diff = minus_diff if -minus_diff > plus_diff else plus_diff
+
+        if abs(greater_diff) < state.brick_size:
+            return False
+
+        direction = 1 if greater_diff > 0 else -1
+        if direction == state.direction:
+            state.open = state.close
+        state.close = price
+        state.high = state.low = price
+        state.direction = direction
+        state.brick_size = self._brick_size(pair, state, price, timestamp)
+        data = self.data[pair]
+        data['brick_open'] = state.open
+        data['brick_close'] = price
+        return True
+
+    async def __call__(self, *, feed: str, pair: str, side: str, amount: Decimal, price: Decimal, order_id=None, timestamp=None):
+        if self._agg(pair, price, timestamp):
+            await self.handler(data=self.data)
 
+
+class _ATRState:
+    __slots__ = ('start', 'high', 'low', 'close', 'prev_close', 'atr', 'count')
+
+    def __init__(self):
+        self.start = None
+        self.high = None
+        self.low = None
+        self.close = None
+        self.prev_close = None
+        self.atr = None
+        self.count = 0
+
+
+class RenkoATR(RenkoFixed):
+    """
+    Renko bricks sized from the Average True Range of each pair. Trades are
+    grouped into bars of `interval` seconds (by trade timestamp), and the ATR
+    is the Wilder average of the true range of the last `period` bars. The size
+    of the next brick, fixed when a brick completes, is multiplier * ATR (at least
+    min_brick_size, which defaults to brick_size, so a flat market does not turn
+    every trade into a brick); brick_size is used until `period` bars have been seen.
+    """
+
+    def __init__(self, *args, interval=60, period=14, multiplier=1, min_brick_size=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.period = period
+        # prices are Decimals
+        self.multiplier = Decimal(str(multiplier))
+        self.min_brick_size = Decimal(str(self.brick_size if min_brick_size is None else min_brick_size))
+        if self.min_brick_size <= 0:
+            raise ValueError("min_brick_size must be greater than 0")
+        self.atr = {}
+
+    def _update_atr(self, pair, price, timestamp):
+        state = self.atr.get(pair)
+        if state is None:
+            state = self.atr[pair] = _ATRState()
+        start = timestamp - timestamp % self.interval
+        if state.start is None or start > state.start:
+            if state.start is not None:
+                # close the previous bar
+                true_range = state.high - state.low
+                if state.prev_close is not None:
+                    true_range = max(true_range, abs(state.high - state.prev_close), abs(state.low - state.prev_close))
+                state.count += 1
+                if state.atr is None:
+                    state.atr = true_range
+                else:
+                    n = min(state.count, self.period)
+                    state.atr += (true_range - state.atr) / n
+                state.prev_close = state.close
+            state.start = start
+            state.high = state.low = state.close = price
         else:
-            self.new_brick = False
+            if price > state.high:
+                state.high = price
+            elif price < state.low:
+                state.low = price
+            state.close = price
+
+    def _brick_size(self, pair, state, price, timestamp):
+        atr = self.atr.get(pair)
+        if atr is None or atr.count < self.period:
+            return self.brick_size
+        return max(self.multiplier * atr.atr, self.min_brick_size)
 
     async def __call__(self, *, feed: str, pair: str, side: str, amount: Decimal, price: Decimal, order_id=None, timestamp=None):
-        if self.new_brick:
+        if timestamp is None:
+            timestamp = time.time()
+        self._update_atr(pair, price, timestamp)
+        if self._agg(pair, price, timestamp):
             await self.handler(data=self.data)
-        self._agg(pair, price)
+
+
+class RangeBars(AggregateCallback):
+    """
+    Aggregate trades into range bars: a bar completes when the difference between
+    its high and low reaches `bar_range`. State is kept per pair, and the handler is
+    called with each completed bar:
+
+        handler(pair=pair, data={'open', 'high', 'low', 'close', 'volume'})
+    """
+
+    def __init__(self, *args, bar_range=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bar_range = bar_range
+        # pair -> [open, high, low, close, volume]
+        self.bars = {}
+
+    async def __call__(self, *, feed: str, pair: str, side: str, amount: Decimal, price: Decimal, order_id=None, timestamp=None):
+        bar = self.bars.get(pair)
+        if bar is None:
+            self.bars[pair] = [price, price, price, price, amount]
+            return
+
+        if price > bar[1]:
+            bar[1] = price
+        elif price < bar[2]:
+            bar[2] = price
+        bar[3] = price
+        bar[4] += amount
+
+        if bar[1] - bar[2] >= self.bar_range:
+            del self.bars[pair]
+            await self.handler(pair=pair, data={'open': bar[0], 'high': bar[1], 'low': bar[2], 'close': bar[3], 'volume': bar[4]})
+
+
+class TradeDedupe(AggregateCallback):
+    """
+    Drops trades that have already been seen, keyed by (feed, pair, trade id), e.g.
+    trades resent by the exchange after a reconnect. The last `size` trade ids of
+    each feed and pair are remembered (least recently seen are evicted first), so
+    memory is bounded. Trades without an id are passed through.
+    """
+
+    def __init__(self, *args, size=10000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.size = size
+        # (feed, pair) -> OrderedDict of trade ids
+        self.seen = {}
+        self.duplicates = 0
+
+    async def __call__(self, *, feed: str, pair: str, order_id=None, **kwargs):
+        if order_id is not None:
+            key = (feed, pair)
+            seen = self.seen.get(key)
+            if seen is None:
+                seen = self.seen[key] = OrderedDict()
+            if order_id in seen:
+                seen.move_to_end(order_id)
+                self.duplicates += 1
+                return
+            seen[order_id] = None
+            if len(seen) > self.size:
+                seen.popitem(last=False)
+        await self.handler(feed=feed, pair=pair, order_id=order_id, **kwargs)
+
+
+class TradeMerge(AggregateCallback):
+    """
+    Merges trades from several feeds into a single tape ordered by trade timestamp.
+    Trades are held until the watermark, the latest timestamp seen minus `lateness`
+    seconds, passes them, or at the latest until `lateness` seconds after they were
+    received, so the last trades are published in a quiet market too. Trades older
+    than the last published trade are dropped and counted in `late`. Call flush() to
+    publish the held trades (e.g. on shutdown).
+    """
+
+    def __init__(self, *args, lateness=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lateness = lateness
+        self.heap = []
+        # sequence number, so trades with equal timestamps keep their arrival order
+        self.counter = 0
+        self.watermark = None
+        self.published = None
+        self.late = 0
+        # (receipt time, timestamp) of the trades, in arrival order
+        self.arrivals = deque()
+        self.timer = None
+        # publishing from trades and from the timer, one at a time, so the tape stays ordered
+        self.lock = asyncio.Lock()
+
+    async def __call__(self, *, timestamp, **kwargs):
+        if self.timer is None:
+            self.timer = asyncio.ensure_future(self._run_timer())
+        if self.published is not None and timestamp < self.published:
+            self.late += 1
+            return
+        self.counter += 1
+        heapq.heappush(self.heap, (timestamp, self.counter, kwargs))
+        self.arrivals.append((time.time(), timestamp))
+        watermark = timestamp - self.lateness
+        if self.watermark is None or watermark > self.watermark:
+            self.watermark = watermark
+        await self._publish(self.watermark)
+
+    async def _run_timer(self):
+        arrivals = self.arrivals
+        while True:
+            now = time.time()
+            until = None
+            while arrivals and arrivals[0][0] + self.lateness <= now:
+                # publishing a trade publishes the held trades before it
+                timestamp = arrivals.popleft()[1]
+                if until is None or timestamp > until:
+                    until = timestamp
+            if until is not None:
+                try:
+                    await self._publish(until)
+                except Exception:
+                    LOG.error("TradeMerge: exception in handler", exc_info=True)
+            await asyncio.sleep(arrivals[0][0] + self.lateness - now if arrivals else self.lateness)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    async def _publish(self, until):
+        heap = self.heap
+        async with self.lock:
+            while heap and (until is None or heap[0][0] <= until):
+                timestamp, _, kwargs = heapq.heappop(heap)
+                self.published = timestamp
+                await self.handler(timestamp=timestamp, **kwargs)
+
+    async def flush(self):
+        await self._publish(None)
 
 
 class CustomAggregate(AggregateCallback):
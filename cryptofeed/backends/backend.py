@@ -9,14 +9,25 @@ from decimal import Decimal
 
 from cryptofeed.defines import BID, ASK
 from cryptofeed.backends._util import book_convert, book_delta_convert
+from cryptofeed.util.book import BookView
 
 
 class BackendBookCallback:
     async def __call__(self, *, feed, pair, book, timestamp):
-        data = {'timestamp': timestamp, 'delta': False, BID: {}, ASK: {}}
-        book_convert(book, data, convert=self.numeric_type)
+        if isinstance(book, BookView):
+            # convert once per update, shared by all backends using the same numeric type
+            sides = book.cached(('convert', self.numeric_type), self._convert)
+            data = {'timestamp': timestamp, 'delta': False, BID: sides[BID], ASK: sides[ASK]}
+        else:
+            data = {'timestamp': timestamp, 'delta': False, BID: {}, ASK: {}}
+            book_convert(book, data, convert=self.numeric_type)
         await self.write(feed, pair, timestamp, data)
 
+    def _convert(self, book):
+        data = {BID: {}, ASK: {}}
+        book_convert(book, data, convert=self.numeric_type)
+        return data
+
 
 class BackendBookDeltaCallback:
     async def __call__(self, *, feed, pair, delta, timestamp):
@@ -34,6 +45,38 @@ class BackendTradeCallback:
         await self.write(feed, pair, timestamp, data)
 
 
+class BackendBatchCallback:
+    async def write_batch(self, feed, batch):
+        """
+        batch is a list of (pair, timestamp, data) tuples. Backends that can
+        write several entries in one round trip should override this
+        """
+        for pair, timestamp, data in batch:
+            await self.write(feed, pair, timestamp, data)
+
+
+class BackendTradeBatchCallback(BackendBatchCallback):
+    async def __call__(self, *, feed: str, updates: list):
+        batch = []
+        for trade in updates:
+            data = {'feed': feed, 'pair': trade['pair'], 'timestamp': trade.get('timestamp'),
+                    'side': trade['side'], 'amount': self.numeric_type(trade['amount']), 'price': self.numeric_type(trade['price'])}
+            if trade.get('order_id'):
+                data['id'] = trade['order_id']
+            batch.append((trade['pair'], data['timestamp'], data))
+        await self.write_batch(feed, batch)
+
+
+class BackendBookDeltaBatchCallback(BackendBatchCallback):
+    async def __call__(self, *, feed: str, updates: list):
+        batch = []
+        for update in updates:
+            data = {'timestamp': update['timestamp'], 'delta': True, BID: {}, ASK: {}}
+            book_delta_convert(update['delta'], data, convert=self.numeric_type)
+            batch.append((update['pair'], update['timestamp'], data))
+        await self.write_batch(feed, batch)
+
+
 class BackendFundingCallback:
     async def __call__(self, *, feed, pair, **kwargs):
         if 'timestamp' in kwargs:
@@ -0,0 +1,204 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Streaming indicators. Each indicator wraps a handler like the other
+aggregate callbacks, updates its per pair state in O(1) on every event, and
+forwards the event to the handler with its value added to the `indicators`
+dictionary (keyed by the indicator's name). Indicators can be chained:
+
+    RollingVWAP(TradeFlowImbalance(Callback(handler), window=500), window=100)
+
+calls handler(feed=..., pair=..., ..., indicators={'vwap': ..., 'trade_imbalance': ...})
+on every trade. Values are floats, None until enough data has been seen.
+'''
+import math
+from collections import defaultdict
+
+from cryptofeed.backends.aggregate import AggregateCallback
+from cryptofeed.defines import BID, ASK, BUY
+
+
+class RingBuffer:
+    """
+    Window over the last `size` values, with a running sum. The sum is
+    recomputed each time the buffer wraps around, to bound floating point drift
+    """
+    __slots__ = ('values', 'size', 'index', 'count', 'total')
+
+    def __init__(self, size: int):
+        self.values = [0.0] * size
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def append(self, value: float):
+        if self.count == self.size:
+            self.total -= self.values[self.index]
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+            self.total = math.fsum(self.values)
+
+
+class Indicator(AggregateCallback):
+    name = None
+
+    def __init__(self, *args, name=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if name:
+            self.name = name
+
+    def update(self, **kwargs):
+        raise NotImplementedError
+
+    async def __call__(self, **kwargs):
+        value = self.update(**kwargs)
+        if 'indicators' not in kwargs:
+            kwargs['indicators'] = {}
+        kwargs['indicators'][self.name] = value
+        await self.handler(**kwargs)
+
+
+class RollingVWAP(Indicator):
+    """
+    Volume weighted average price of the last `window` trades
+    """
+    name = 'vwap'
+
+    def __init__(self, *args, window=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.notional = defaultdict(lambda: RingBuffer(window))
+        self.volume = defaultdict(lambda: RingBuffer(window))
+
+    def update(self, *, pair, amount, price, **kwargs):
+        amount = float(amount)
+        volume = self.volume[pair]
+        self.notional[pair].append(float(price) * amount)
+        volume.append(amount)
+        return self.notional[pair].total / volume.total if volume.total else None
+
+
+class TradeFlowImbalance(Indicator):
+    """
+    (buy volume - sell volume) / total volume over the last `window` trades,
+    between -1 (all sells) and 1 (all buys)
+    """
+    name = 'trade_imbalance'
+
+    def __init__(self, *args, window=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.signed = defaultdict(lambda: RingBuffer(window))
+        self.volume = defaultdict(lambda: RingBuffer(window))
+
+    def update(self, *, pair, side, amount, **kwargs):
+        amount = float(amount)
+        volume = self.volume[pair]
+        self.signed[pair].append(amount if side == BUY else -amount)
+        volume.append(amount)
+        return self.signed[pair].total / volume.total if volume.total else None
+
+
+class RealizedVolatility(Indicator):
+    """
+    Square root of the sum of squared log returns between the last `window` + 1
+    trades. Not annualized
+    """
+    name = 'realized_vol'
+
+    def __init__(self, *args, window=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.returns = defaultdict(lambda: RingBuffer(window))
+        self.last_price = {}
+
+    def update(self, *, pair, price, **kwargs):
+        price = float(price)
+        last = self.last_price.get(pair)
+        self.last_price[pair] = price
+        if last is None:
+            return None
+        returns = self.returns[pair]
+        returns.append(math.log(price / last) ** 2)
+        # the running sum can drift slightly negative
+        return math.sqrt(max(returns.total, 0.0))
+
+
+def _best(book, side):
+    if len(book[side]) == 0:
+        return None
+    return book[side].peekitem(-1 if side == BID else 0)[0]
+
+
+class EWMAMid(Indicator):
+    """
+    Exponentially weighted moving average of the mid price, per update. Accepts
+    TICKER (bid / ask) or L2_BOOK (book) events. Either alpha or halflife (in updates)
+    can be given
+    """
+    name = 'ewma_mid'
+
+    def __init__(self, *args, alpha=None, halflife=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if alpha is None:
+            if halflife is None:
+                raise ValueError("alpha or halflife must be specified")
+            alpha = 1 - math.exp(math.log(0.5) / halflife)
+        self.alpha = alpha
+        self.value = {}
+
+    def update(self, *, pair, **kwargs):
+        if 'book' in kwargs:
+            bid = _best(kwargs['book'], BID)
+            ask = _best(kwargs['book'], ASK)
+        else:
+            bid = kwargs.get('bid')
+            ask = kwargs.get('ask')
+        if bid is None or ask is None:
+            return self.value.get(pair)
+        mid = (float(bid) + float(ask)) / 2
+        prev = self.value.get(pair)
+        value = mid if prev is None else prev + self.alpha * (mid - prev)
+        self.value[pair] = value
+        return value
+
+
+class BookImbalance(Indicator):
+    """
+    (bid size - ask size) / total size over the top `levels` levels of an L2 book,
+    between -1 and 1. The cost per update is proportional to `levels`
+    """
+    name = 'book_imbalance'
+
+    def __init__(self, *args, levels=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.levels = levels
+
+    def update(self, *, book, **kwargs):
+        bids = book[BID]
+        asks = book[ASK]
+        bid_size = 0.0
+        for i, price in enumerate(reversed(bids)):
+            if i == self.levels:
+                break
+            bid_size += float(bids[price])
+        ask_size = 0.0
+        for i, price in enumerate(asks):
+            if i == self.levels:
+                break
+            ask_size += float(asks[price])
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else None
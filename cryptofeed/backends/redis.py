@@ -8,7 +8,8 @@ import json
 
 import aioredis
 
-from cryptofeed.backends.backend import BackendBookCallback, BackendBookDeltaCallback, BackendTickerCallback, BackendTradeCallback, BackendFundingCallback, BackendOrderCallback, BackendPositionCallback
+from cryptofeed.backends.backend import (BackendBookCallback, BackendBookDeltaCallback, BackendTickerCallback, BackendTradeCallback, BackendFundingCallback,
+                                         BackendOrderCallback, BackendPositionCallback, BackendTradeBatchCallback, BackendBookDeltaBatchCallback)
 
 
 class RedisCallback:
@@ -31,6 +32,14 @@ class RedisZSetCallback(RedisCallback):
             self.redis = await aioredis.create_redis_pool(self.conn_str, encoding='utf-8')
         await self.redis.zadd(f"{self.key}-{feed}-{pair}", timestamp, data, exist=self.redis.ZSET_IF_NOT_EXIST)
 
+    async def write_batch(self, feed: str, batch: list):
+        if self.redis is None:
+            self.redis = await aioredis.create_redis_pool(self.conn_str, encoding='utf-8')
+        pipe = self.redis.pipeline()
+        for pair, timestamp, data in batch:
+            pipe.zadd(f"{self.key}-{feed}-{pair}", timestamp, json.dumps(data), exist=self.redis.ZSET_IF_NOT_EXIST)
+        await pipe.execute()
+
 
 class RedisStringCallback(RedisCallback):
     async def write(self, feed: str, pair: str, timestamp: float, data: dict):
@@ -97,6 +106,10 @@ class TradeRedis(RedisZSetCallback, BackendTradeCallback):
     default_key = 'trades'
 
 
+class TradeBatchRedis(RedisZSetCallback, BackendTradeBatchCallback):
+    default_key = 'trades'
+
+
 class TradeStream(RedisStreamCallback, BackendTradeCallback):
     default_key = 'trades'
 
@@ -121,6 +134,10 @@ class BookDeltaRedis(RedisZSetCallback, BackendBookDeltaCallback):
     default_key = 'book'
 
 
+class BookDeltaBatchRedis(RedisZSetCallback, BackendBookDeltaBatchCallback):
+    default_key = 'book'
+
+
 class BookStream(RedisStreamCallback, BackendBookCallback):
     default_key = 'book'
 
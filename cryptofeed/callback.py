@@ -6,22 +6,125 @@ associated with this software.
 '''
 import asyncio
 import inspect
+import logging
+import queue
+import threading
+import weakref
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
+from functools import partial
+from time import perf_counter
+
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.defines import EXECUTOR, INLINE, THREAD, PROCESS, BID, ASK
+from cryptofeed.util.book import BookView, book_arrays, l3_book_arrays, delta_arrays
+
+
+LOG = logging.getLogger('feedhandler')
+
+_callbacks = weakref.WeakSet()
+_process_pool = None
+
+
+def dispatch_stats() -> dict:
+    """
+    Number of calls and total seconds spent in synchronous callbacks, per dispatch mode.
+    For EXECUTOR and PROCESS this is the time from submission to completion, for
+    INLINE and THREAD the time spent running the callback
+    """
+    ret = {mode: {'calls': 0, 'time': 0.0} for mode in (EXECUTOR, INLINE, THREAD, PROCESS)}
+    for cb in list(_callbacks):
+        ret[cb.dispatch]['calls'] += cb.calls
+        ret[cb.dispatch]['time'] += cb.elapsed
+    return ret
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+    return _process_pool
 
 
 class Callback:
-    def __init__(self, callback):
+    def __init__(self, callback, dispatch=EXECUTOR):
+        """
+        dispatch: str
+            how a synchronous (non coroutine) callback is invoked. Ignored for coroutines.
+            EXECUTOR - in the event loop's default thread pool (awaited)
+            INLINE - called directly on the event loop. Use for fast callbacks
+            THREAD - queued to a dedicated worker thread for this callback. Calls
+                     are made in order and are not awaited by the feed, so the
+                     arguments must not be modified afterwards. Books passed to
+                     BookCallback are copied for the worker, as the feed keeps
+                     updating them
+            PROCESS - in a shared process pool (awaited). The callback and its arguments
+                      must be picklable
+        """
+        if dispatch not in {EXECUTOR, INLINE, THREAD, PROCESS}:
+            raise ValueError(f"Invalid dispatch mode {dispatch}")
         self.callback = callback
         self.is_async = inspect.iscoroutinefunction(callback)
+        self.dispatch = dispatch
+        self.calls = 0
+        self.elapsed = 0.0
+        self._queue = None
+        self._worker = None
+        if callback is not None and not self.is_async:
+            _callbacks.add(self)
 
     async def __call__(self, *args, **kwargs):
         if self.callback is None:
             return
         elif self.is_async:
             await self.callback(*args, **kwargs)
+        elif self.dispatch == INLINE:
+            start = perf_counter()
+            self.callback(*args, **kwargs)
+            self.elapsed += perf_counter() - start
+            self.calls += 1
+        elif self.dispatch == THREAD:
+            if self._worker is None:
+                self._start_worker()
+            self._queue.put((args, kwargs))
         else:
+            func = partial(self.callback, *args, **kwargs) if kwargs else self.callback
+            executor = _get_process_pool() if self.dispatch == PROCESS else None
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.callback, *args, **kwargs)
+            start = perf_counter()
+            await loop.run_in_executor(executor, func, *(() if kwargs else args))
+            self.elapsed += perf_counter() - start
+            self.calls += 1
+
+    def _start_worker(self):
+        self._queue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run_worker, name=f'callback-{id(self)}', daemon=True)
+        self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            args, kwargs = item
+            start = perf_counter()
+            try:
+                self.callback(*args, **kwargs)
+            except Exception:
+                LOG.error("Exception in callback %s", self.callback, exc_info=True)
+            self.elapsed += perf_counter() - start
+            self.calls += 1
+
+    def stop(self):
+        """
+        Stop the worker thread (THREAD dispatch), after the queued calls complete
+        """
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
 
 
 class TradeCallback(Callback):
@@ -39,9 +142,51 @@ class BookCallback(Callback):
     For full L2/L3 book updates
     """
     async def __call__(self, *, feed: str, pair: str, book: dict, timestamp):
+        if self.dispatch == THREAD and self.callback is not None and not self.is_async:
+            # the worker reads the book later, while the feed keeps updating it
+            book = _copy_book(book)
         await super().__call__(feed, pair, book, timestamp)
 
 
+def _copy_book(book) -> dict:
+    """
+    Copy of a book or BookView, L3 levels included
+    """
+    return {side: sd((price, dict(size) if isinstance(size, Mapping) else size) for price, size in book[side].items()) for side in (BID, ASK)}
+
+
+class BookArrayCallback(Callback):
+    """
+    For full L2/L3 book updates, delivered as NumPy arrays. L2 books are
+    {BID: (prices, sizes), ASK: (prices, sizes)}, L3 books are structured arrays.
+    See book_arrays and l3_book_arrays in cryptofeed.util.book
+    """
+    async def __call__(self, *, feed: str, pair: str, book: dict, timestamp):
+        if isinstance(book, BookView):
+            data = book.to_l3_arrays() if _is_l3(book) else book.to_arrays()
+        elif _is_l3(book):
+            data = l3_book_arrays(book)
+        else:
+            data = book_arrays(book)
+        await super().__call__(feed, pair, data, timestamp)
+
+
+def _is_l3(book) -> bool:
+    for side in (BID, ASK):
+        for size in book[side].values():
+            return isinstance(size, Mapping)
+    return False
+
+
+class BookDeltaArrayCallback(Callback):
+    """
+    For Book Deltas, delivered as NumPy structured arrays (see delta_arrays
+    in cryptofeed.util.book)
+    """
+    async def __call__(self, *, feed: str, pair: str, delta: dict, timestamp):
+        await super().__call__(feed, pair, delta_arrays(delta), timestamp)
+
+
 class BookUpdateCallback(Callback):
     """
     For Book Deltas
@@ -58,6 +203,41 @@ class BookUpdateCallback(Callback):
         await super().__call__(feed, pair, delta, timestamp)
 
 
+class TradeBatchCallback(Callback):
+    """
+    For all trades received in a single exchange message
+    """
+    async def __call__(self, *, feed: str, updates: list):
+        """
+        updates is a list of dictionaries with the same keys as the
+        arguments to TradeCallback (feed, pair, side, amount, price, order_id, timestamp)
+        """
+        await super().__call__(feed, updates)
+
+
+class BookDeltaBatchCallback(Callback):
+    """
+    For all book deltas generated by a single exchange message
+    """
+    async def __call__(self, *, feed: str, updates: list):
+        """
+        updates is a list of dictionaries with the keys feed, pair, delta and timestamp
+        """
+        await super().__call__(feed, updates)
+
+
+class BookStatusCallback(Callback):
+    """
+    For books retained across reconnects (see retain_books on Feed)
+    """
+    async def __call__(self, *, feed: str, pair: str, stale: bool, timestamp: float):
+        """
+        stale is True when the book of the previous connection is kept after a
+        reconnect, and False once a new snapshot replaces it
+        """
+        await super().__call__(feed, pair, stale, timestamp)
+
+
 class VolumeCallback(Callback):
     pass
 
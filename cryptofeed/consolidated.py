@@ -0,0 +1,131 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+from collections import defaultdict
+from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING
+
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.callback import Callback
+from cryptofeed.defines import BID, ASK
+from cryptofeed.util.book import book_delta
+
+
+class ConsolidatedBook(Callback):
+    """
+    L2 book per pair merged across feeds. Each price level holds the size
+    contributed by every feed, so the size at a level can be attributed to
+    venues:
+
+        book(pair)[BID] = SortedDict({price: {feed: size, ...}, ...})
+
+    The book is updated incrementally from each feed's book deltas (`delta`,
+    registered for BOOK_DELTA), with the periodic full books (the instance
+    itself is the L2_BOOK callback) diffed against the feed's last known
+    book. After every update the callback is invoked with the change to the
+    consolidated book, in the usual delta format (a size of 0 deletes the level)
+
+        callback(pair, delta, timestamp)
+
+    tick_size (a Decimal, or a dict of pair -> Decimal) buckets prices so venues
+    quoting with different precisions share levels. Bids are rounded down and asks
+    up to a multiple of the tick size, so a level never looks better than the orders in it.
+    """
+    def __init__(self, callback, pairs=None, tick_size=None, **kwargs):
+        self.tick_size = tick_size
+        # pair -> {BID: SortedDict(price -> {feed: size}), ASK: ...}
+        self.books = defaultdict(lambda: {BID: sd(), ASK: sd()})
+        # pair -> feed -> {BID: {price: size}, ASK: ...} as last reported by the feed, before bucketing
+        self.venue_books = defaultdict(dict)
+        # pair -> feed -> {BID: {bucket: size}, ASK: ...}
+        self.venue_buckets = defaultdict(dict)
+        if pairs:
+            for pair in pairs:
+                self.books[pair]
+        super().__init__(callback, **kwargs)
+
+    def book(self, pair: str) -> dict:
+        return self.books[pair]
+
+    def level_size(self, pair: str, side: str, price):
+        return sum(self.books[pair][side][price].values())
+
+    def _tick(self, pair):
+        if isinstance(self.tick_size, dict):
+            return self.tick_size.get(pair)
+        return self.tick_size
+
+    @staticmethod
+    def _bucket(price, tick, side):
+        if tick is None:
+            return price
+        rounding = ROUND_FLOOR if side == BID else ROUND_CEILING
+        return (Decimal(price) / tick).to_integral_value(rounding=rounding) * tick
+
+    def _apply(self, feed, pair, delta) -> dict:
+        """
+        Apply a feed's delta and return the resulting delta to the consolidated book
+        """
+        tick = self._tick(pair)
+        raw = self.venue_books[pair].setdefault(feed, {BID: {}, ASK: {}})
+        buckets = self.venue_buckets[pair].setdefault(feed, {BID: defaultdict(int), ASK: defaultdict(int)})
+        book = self.books[pair]
+        ret = {BID: [], ASK: []}
+
+        for side in (BID, ASK):
+            # insertion ordered, so the emitted delta follows the order of the input
+            changed = {}
+            for price, size in delta[side]:
+                old = raw[side].pop(price, 0)
+                if size:
+                    raw[side][price] = size
+                if size == old:
+                    continue
+                bucket = self._bucket(price, tick, side)
+                buckets[side][bucket] += size - old
+                changed[bucket] = None
+
+            for bucket in changed:
+                venue_size = buckets[side][bucket]
+                level = book[side].get(bucket)
+                if venue_size:
+                    if level is None:
+                        level = book[side][bucket] = {}
+                    level[feed] = venue_size
+                else:
+                    del buckets[side][bucket]
+                    if level is not None:
+                        level.pop(feed, None)
+                        if not level:
+                            del book[side][bucket]
+                            level = None
+                ret[side].append((bucket, sum(level.values()) if level else 0))
+        return ret
+
+    async def _publish(self, pair, delta, timestamp):
+        if delta[BID] or delta[ASK]:
+            await super().__call__(pair, delta, timestamp)
+
+    async def __call__(self, *, feed: str, pair: str, book: dict, timestamp):
+        previous = self.venue_books[pair].get(feed, {BID: {}, ASK: {}})
+        delta = book_delta(previous, book)
+        await self._publish(pair, self._apply(feed, pair, delta), timestamp)
+
+    async def delta(self, *, feed: str, pair: str, delta: dict, timestamp):
+        """
+        BOOK_DELTA callback
+        """
+        await self._publish(pair, self._apply(feed, pair, delta), timestamp)
+
+    async def remove_feed(self, feed: str, pair: str, timestamp=None):
+        """
+        Remove a feed's contribution to the book (e.g. the feed has disconnected)
+        """
+        previous = self.venue_books[pair].get(feed)
+        if previous is None:
+            return
+        delta = {side: [(price, 0) for price in previous[side]] for side in (BID, ASK)}
+        await self._publish(pair, self._apply(feed, pair, delta), timestamp)
@@ -50,6 +50,9 @@ FUNDING = 'funding'
 INSTRUMENT = 'instrument'
 UNSUPPORTED = 'unsupported'
 POSITION = 'position'
+TRADES_BATCH = 'trades_batch'
+BOOK_DELTA_BATCH = 'book_delta_batch'
+BOOK_STATUS = 'book_status'
 
 
 L2_BOOK_SWAP = 'l2_book_swap'
@@ -78,6 +81,13 @@ FILL_OR_KILL = 'fill-or-kill'
 IMMEDIATE_OR_CANCEL = 'immediate-or-cancel'
 
 
+# dispatch modes for synchronous callbacks
+EXECUTOR = 'executor'
+INLINE = 'inline'
+THREAD = 'thread'
+PROCESS = 'process'
+
+
 OPEN = 'open'
 PENDING = 'open'
 FILLED = 'closed'
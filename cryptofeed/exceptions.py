@@ -10,6 +10,10 @@ class MissingSequenceNumber(Exception):
     pass
 
 
+class BadChecksum(Exception):
+    pass
+
+
 class MissingMessage(Exception):
     pass
 
@@ -32,3 +36,7 @@ class UnsupportedType(Exception):
 
 class ExhaustedRetries(Exception):
     pass
+
+
+class StaleBook(Exception):
+    pass
@@ -35,6 +35,7 @@ class Binance(Feed):
 
         self.rest_client = RestBinance()
         self.book_depth = depth
+        self.init_kwargs['depth'] = depth
         self.ws_endpoint = 'wss://stream.binance.com:9443'
         self.rest_endpoint = 'https://www.binance.com/api/v1'
         self.address = self._address()
@@ -70,7 +71,8 @@ class Binance(Feed):
         except:
             LOG.error("Failed to keepalive listen_key", exc_info=True)
 
-    async def _trade(self, msg):
+    @classmethod
+    def _parse_trade(cls, msg):
         """
         {
             "e": "aggTrade",  // Event type
@@ -86,17 +88,19 @@ class Binance(Feed):
             "M": true         // Ignore
         }
         """
-        price = Decimal(msg['p'])
-        amount = Decimal(msg['q'])
+        return msg['s'], msg['a'], SELL if msg['m'] else BUY, Decimal(msg['q']), Decimal(msg['p']), timestamp_normalize(cls.id, msg['E'])
+
+    async def _trade(self, symbol, order_id, side, amount, price, timestamp):
         await self.callback(TRADES, feed=self.id,
-                                     order_id=msg['a'],
-                                     pair=pair_exchange_to_std(msg['s']),
-                                     side=SELL if msg['m'] else BUY,
+                                     order_id=order_id,
+                                     pair=pair_exchange_to_std(symbol),
+                                     side=side,
                                      amount=amount,
                                      price=price,
-                                     timestamp=timestamp_normalize(self.id, msg['E']))
+                                     timestamp=timestamp)
 
-    async def _ticker(self, msg):
+    @classmethod
+    def _parse_ticker(cls, msg):
         """
         {
         "e": "24hrTicker",  // Event type
@@ -124,14 +128,14 @@ class Binance(Feed):
         "n": 18151          // Total number of trades
         }
         """
-        pair = pair_exchange_to_std(msg['s'])
-        bid = Decimal(msg['b'])
-        ask = Decimal(msg['a'])
+        return msg['s'], Decimal(msg['b']), Decimal(msg['a']), timestamp_normalize(cls.id, msg['E'])
+
+    async def _ticker(self, symbol, bid, ask, timestamp):
         await self.callback(TICKER, feed=self.id,
-                                     pair=pair,
+                                     pair=pair_exchange_to_std(symbol),
                                      bid=bid,
                                      ask=ask,
-                                     timestamp=timestamp_normalize(self.id, msg['E']))
+                                     timestamp=timestamp)
 
     async def _snapshot(self, pairs: list):
         urls = [f'{self.rest_endpoint}/depth?symbol={sym}&limit={self.book_depth}' for sym in pairs]
@@ -153,14 +157,14 @@ class Binance(Feed):
                     amount = Decimal(update[1])
                     self.l2_book[std_pair][side][price] = amount
 
-    def _check_update_id(self, pair: str, msg: dict):
+    def _check_update_id(self, pair: str, first: int, last: int):
         skip_update = False
         forced = False
 
         if pair in self.last_update_id:
-            if msg['u'] <= self.last_update_id[pair]:
+            if last <= self.last_update_id[pair]:
                 skip_update = True
-            elif msg['U'] <= self.last_update_id[pair]+1 <= msg['u']:
+            elif first <= self.last_update_id[pair]+1 <= last:
                 del self.last_update_id[pair]
                 forced = True
             else:
@@ -168,7 +172,8 @@ class Binance(Feed):
 
         return skip_update, forced
 
-    async def _book(self, msg: dict, pair: str, timestamp: float):
+    @classmethod
+    def _parse_book(cls, msg: dict, pair: str):
         """
         {
             "e": "depthUpdate", // Event type
@@ -190,19 +195,20 @@ class Binance(Feed):
             ]
         }
         """
-        skip_update, forced = self._check_update_id(pair, msg)
+        return (pair, msg['U'], msg['u'], timestamp_normalize(cls.id, msg['E']),
+                tuple((Decimal(price), Decimal(amount)) for price, amount in msg['b']),
+                tuple((Decimal(price), Decimal(amount)) for price, amount in msg['a']))
+
+    async def _book(self, pair: str, first: int, last: int, timestamp: float, bids: tuple, asks: tuple):
+        skip_update, forced = self._check_update_id(pair, first, last)
         if skip_update:
             return
 
         delta = {BID: [], ASK: []}
         pair = pair_exchange_to_std(pair)
-        timestamp = msg['E']
-
-        for s, side in (('b', BID), ('a', ASK)):
-            for update in msg[s]:
-                price = Decimal(update[0])
-                amount = Decimal(update[1])
 
+        for side, updates in ((BID, bids), (ASK, asks)):
+            for price, amount in updates:
                 if amount == 0:
                     if price in self.l2_book[pair][side]:
                         del self.l2_book[pair][side][price]
@@ -211,7 +217,7 @@ class Binance(Feed):
                     self.l2_book[pair][side][price] = amount
                     delta[side].append((price, amount))
 
-        await self.book_callback(self.l2_book[pair], L2_BOOK, pair, forced, delta, timestamp_normalize(self.id, timestamp))
+        await self.book_callback(self.l2_book[pair], L2_BOOK, pair, forced, delta, timestamp)
 
     async def _order(self, msg: dict):
         """
@@ -305,44 +311,61 @@ class Binance(Feed):
 
         return order
 
-    async def message_handler(self, msg: str, timestamp: float):
+    @classmethod
+    def parse(cls, msg):
+        """
+        Market data is normalized to (data type, tuple), user data (which is not wrapped
+        in a stream) is returned as (None, message)
+        """
         msg = json.loads(msg, parse_float=Decimal)
-        if self.use_private_channels:
-            if msg['e'] == 'outboundAccountInfo':
-                pass
-            elif msg['e'] == 'outboundAccountPosition':
-                pass
-            elif msg['e'] == 'balanceUpdate':
-                pass
-            elif msg['e'] == 'executionReport':
-                symbol = msg.get('s', '')
-                pairs = []
-                if self.config:
-                    channel = feed_to_exchange(self.id, ORDER)
-                    pairs = list(self.config[channel])
-                else:
-                    pairs = self.pairs
-
-                if symbol in pairs:
-                    await self._order(msg)
-
-            elif msg['e'] == 'listStatus':
-                pass        
-        else:
-            # Combined stream events are wrapped as follows: {"stream":"<streamName>","data":<rawPayload>}
-            # streamName is of format <symbol>@<channel>
-            pair, _ = msg['stream'].split('@', 1)
-            msg = msg['data']
-            pair = pair.upper()
-            
-            if msg['e'] == 'depthUpdate':
-                await self._book(msg, pair, timestamp)
-            elif msg['e'] == 'aggTrade':
-                await self._trade(msg)
-            elif msg['e'] == '24hrTicker':
-                await self._ticker(msg)
+        if 'stream' not in msg:
+            return None, msg
+        # Combined stream events are wrapped as follows: {"stream":"<streamName>","data":<rawPayload>}
+        # streamName is of format <symbol>@<channel>
+        pair, _ = msg['stream'].split('@', 1)
+        data = msg['data']
+        if data['e'] == 'depthUpdate':
+            return L2_BOOK, cls._parse_book(data, pair.upper())
+        elif data['e'] == 'aggTrade':
+            return TRADES, cls._parse_trade(data)
+        elif data['e'] == '24hrTicker':
+            return TICKER, cls._parse_ticker(data)
+        return None, data
+
+    async def _user_data(self, msg: dict):
+        if msg['e'] == 'outboundAccountInfo':
+            pass
+        elif msg['e'] == 'outboundAccountPosition':
+            pass
+        elif msg['e'] == 'balanceUpdate':
+            pass
+        elif msg['e'] == 'executionReport':
+            symbol = msg.get('s', '')
+            pairs = []
+            if self.config:
+                channel = feed_to_exchange(self.id, ORDER)
+                pairs = list(self.config[channel])
             else:
-                LOG.warning("%s: Unexpected message received: %s", self.id, msg)
+                pairs = self.pairs
+
+            if symbol in pairs:
+                await self._order(msg)
+
+        elif msg['e'] == 'listStatus':
+            pass
+
+    async def apply(self, msg: tuple, timestamp: float):
+        data_type, msg = msg
+        if data_type == L2_BOOK:
+            await self._book(*msg)
+        elif data_type == TRADES:
+            await self._trade(*msg)
+        elif data_type == TICKER:
+            await self._ticker(*msg)
+        elif self.use_private_channels:
+            await self._user_data(msg)
+        else:
+            LOG.warning("%s: Unexpected message received: %s", self.id, msg)
 
     async def subscribe(self, websocket):
         # Binance does not have a separate subscribe message, the
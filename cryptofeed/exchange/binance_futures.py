@@ -5,7 +5,6 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 import os
-import json
 import logging
 from decimal import Decimal
 
@@ -31,19 +30,20 @@ class BinanceFutures(Binance):
 
         self.rest_client = RestBinanceFutures()
         self.book_depth = depth
+        self.init_kwargs['depth'] = depth
         self.ws_endpoint = 'wss://fstream.binance.com'
         self.rest_endpoint = 'https://fapi.binance.com/fapi/v1'
         self.address = self._address()
         self._reset()
 
-    def _check_update_id(self, pair: str, msg: dict):
+    def _check_update_id(self, pair: str, first: int, last: int):
         skip_update = False
         forced = False
 
         if pair in self.last_update_id:
-            if msg['u'] < self.last_update_id[pair]:
+            if last < self.last_update_id[pair]:
                 skip_update = True
-            elif msg['U'] <= self.last_update_id[pair] <= msg['u']:
+            elif first <= self.last_update_id[pair] <= last:
                 del self.last_update_id[pair]
                 forced = True
             else:
@@ -111,38 +111,20 @@ class BinanceFutures(Binance):
 
         return parsed_order
 
-    async def message_handler(self, msg: str, timestamp: float):
-        msg = json.loads(msg, parse_float=Decimal)
-        if self.use_private_channels:
-            # NOTE: Implement each case if needed
-            if msg['e'] == 'listenKeyExpired':
-                LOG.warning('listen_key was expired')
-            elif msg['e'] == 'ACCOUNT_UPDATE':
-                pass
-            elif msg['e'] == 'ORDER_TRADE_UPDATE':
-                symbol = msg.get('o', {}).get('s', '')
-                pairs = []
-                if self.config:
-                    channel = feed_to_exchange(self.id, ORDER)
-                    pairs = list(self.config[channel])
-                else:
-                    pairs = self.pairs
-
-                if symbol in pairs:
-                    await self._order(msg)
-
-        else:
-            # Combined stream events are wrapped as follows: {"stream":"<streamName>","data":<rawPayload>}
-            # streamName is of format <symbol>@<channel>
-            pair, _ = msg['stream'].split('@', 1)
-            msg = msg['data']
-            pair = pair.upper()
-
-            if msg['e'] == 'depthUpdate':
-                await self._book(msg, pair, timestamp)
-            elif msg['e'] == 'aggTrade':
-                await self._trade(msg)
-            elif msg['e'] == '24hrTicker':
-                await self._ticker(msg)
+    async def _user_data(self, msg: dict):
+        # NOTE: Implement each case if needed
+        if msg['e'] == 'listenKeyExpired':
+            LOG.warning('listen_key was expired')
+        elif msg['e'] == 'ACCOUNT_UPDATE':
+            pass
+        elif msg['e'] == 'ORDER_TRADE_UPDATE':
+            symbol = msg.get('o', {}).get('s', '')
+            pairs = []
+            if self.config:
+                channel = feed_to_exchange(self.id, ORDER)
+                pairs = list(self.config[channel])
             else:
-                LOG.warning("%s: Unexpected message received: %s", self.id, msg)
+                pairs = self.pairs
+
+            if symbol in pairs:
+                await self._order(msg)
@@ -35,6 +35,7 @@ class BinanceMargin(Binance):
 
         self.rest_client = RestBinanceMargin()
         self.book_depth = depth
+        self.init_kwargs['depth'] = depth
         self.ws_endpoint = 'wss://stream.binance.com:9443'
         self.rest_endpoint = 'https://www.binance.com/api/v1'
         self.address = self._address()
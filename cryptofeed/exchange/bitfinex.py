@@ -6,15 +6,16 @@ associated with this software.
 '''
 import json
 import logging
+import zlib
 from decimal import Decimal
-from collections import defaultdict
+from itertools import islice, zip_longest
 
 from sortedcontainers import SortedDict as sd
 
-from cryptofeed.exceptions import MissingSequenceNumber
 from cryptofeed.feed import Feed
 from cryptofeed.defines import TICKER, TRADES, L3_BOOK, BUY, SELL, BID, ASK, L2_BOOK, FUNDING, BITFINEX
 from cryptofeed.standards import pair_exchange_to_std, timestamp_normalize
+from cryptofeed.util.book import L3Book
 
 
 LOG = logging.getLogger('feedhandler')
@@ -56,8 +57,10 @@ class Bitfinex(Feed):
            handler: the handler for this channel type
         '''
         self.channel_map = {}
-        self.order_map = defaultdict(dict)
-        self.seq_no = 0
+        # sequence numbers are per connection
+        self.sequence = {None: 0}
+        # channel id -> subscribe message, for book channels being resubscribed
+        self.resyncing = {}
 
     async def _ticker(self, msg: dict, timestamp: float):
         chan_id = msg[0]
@@ -174,6 +177,9 @@ class Bitfinex(Feed):
                     delta[side].append((price, 0))
         elif msg[1] == 'hb':
             pass
+        elif msg[1] == 'cs':
+            await self.check_checksum(pair, msg[2], lambda: self._book_checksum(pair))
+            return
         else:
             LOG.warning("%s: Unexpected book msg %s", self.id, msg)
 
@@ -183,18 +189,6 @@ class Bitfinex(Feed):
         """
         For L3 book updates
         """
-        def add_to_book(pair, side, price, order_id, amount):
-            if price in self.l3_book[pair][side]:
-                self.l3_book[pair][side][price][order_id] = amount
-            else:
-                self.l3_book[pair][side][price] = {order_id: amount}
-
-        def remove_from_book(pair, side, order_id):
-            price = self.order_map[pair][side][order_id]['price']
-            del self.l3_book[pair][side][price][order_id]
-            if len(self.l3_book[pair][side][price]) == 0:
-                del self.l3_book[pair][side][price]
-
         delta = {BID: [], ASK: []}
         forced = False
         chan_id = msg[0]
@@ -204,8 +198,7 @@ class Bitfinex(Feed):
         if isinstance(msg[1], list):
             if isinstance(msg[1][0], list):
                 # snapshot so clear orders
-                self.order_map[pair] = {BID: {}, ASK: {}}
-                self.l3_book[pair] = {BID: sd(), ASK: sd()}
+                book = self.l3_book[pair] = L3Book()
 
                 for update in msg[1]:
                     order_id, price, amount = update
@@ -218,8 +211,7 @@ class Bitfinex(Feed):
                         side = ASK
                         amount = abs(amount)
 
-                    self.order_map[pair][side][order_id] = {'price': price, 'amount': amount}
-                    add_to_book(pair, side, price, order_id, amount)
+                    book.add(order_id, side, price, amount)
                 forced = True
             else:
                 # book update
@@ -233,48 +225,104 @@ class Bitfinex(Feed):
                     side = ASK
                     amount = abs(amount)
 
+                book = self.l3_book[pair]
                 if price == 0:
-                    price = self.order_map[pair][side][order_id]['price']
-                    remove_from_book(pair, side, order_id)
-                    del self.order_map[pair][side][order_id]
+                    _, price, _ = book.remove(order_id)
                     delta[side].append((order_id, price, 0))
                 else:
-                    if order_id in self.order_map[pair][side]:
-                        del_price = self.order_map[pair][side][order_id]['price']
-                        delta[side].append((order_id, del_price, 0))
-                        # remove existing order before adding new one
-                        delta[side].append((order_id, price, amount))
-                        remove_from_book(pair, side, order_id)
+                    existing = book.order(order_id)
+                    if existing is not None and existing[:2] == (side, price):
+                        # size change, the order keeps its priority
+                        book.change(order_id, amount)
                     else:
-                        delta[side].append((order_id, price, amount))
-                    add_to_book(pair, side, price, order_id, amount)
-                    self.order_map[pair][side][order_id] = {'price': price, 'amount': amount}
+                        if existing is not None:
+                            # the order moved, it goes to the back of its new level
+                            book.remove(order_id)
+                            delta[existing[0]].append((order_id, existing[1], 0))
+                        book.add(order_id, side, price, amount)
+                    delta[side].append((order_id, price, amount))
 
         elif msg[1] == 'hb':
             return
+        elif msg[1] == 'cs':
+            await self.check_checksum(pair, msg[2], lambda: self._raw_book_checksum(pair))
+            return
         else:
             LOG.warning("%s: Unexpected book msg %s", self.id, msg)
             return
 
         await self.book_callback(self.l3_book[pair], L3_BOOK, pair, forced, delta, timestamp)
 
+    @staticmethod
+    def _crc32(fields) -> int:
+        # Bitfinex checksums are signed 32 bit integers
+        checksum = zlib.crc32(':'.join(fields).encode())
+        return checksum - (1 << 32) if checksum >= (1 << 31) else checksum
+
+    def _book_checksum(self, pair) -> int:
+        """
+        Checksum of the top 25 levels per side, interleaved best bid first:
+        bid price:bid amount:ask price:-ask amount:...
+        """
+        book = self.l2_book[pair]
+        fields = []
+        for bid, ask in zip_longest(islice(reversed(book[BID]), 25), islice(book[ASK], 25)):
+            if bid is not None:
+                fields.extend((str(bid), str(book[BID][bid])))
+            if ask is not None:
+                fields.extend((str(ask), str(-book[ASK][ask])))
+        return self._crc32(fields)
+
+    def _raw_book_checksum(self, pair) -> int:
+        """
+        Checksum of the top 25 orders per side, interleaved best bid first:
+        bid order id:bid amount:ask order id:-ask amount:...
+        """
+        book = self.l3_book[pair]
+
+        def orders(side, prices):
+            for price in prices:
+                yield from book[side][price].items()
+
+        fields = []
+        for bid, ask in zip_longest(islice(orders(BID, reversed(book[BID])), 25), islice(orders(ASK, book[ASK]), 25)):
+            if bid is not None:
+                fields.extend((str(bid[0]), str(bid[1])))
+            if ask is not None:
+                fields.extend((str(ask[0]), str(-ask[1])))
+        return self._crc32(fields)
+
+    async def resync(self, pair, error):
+        """
+        Resubscribe to the book channels of the pair. Sequence numbers are per
+        connection, so a gap (pair is None) requires a reconnect
+        """
+        if pair is None:
+            raise error
+        for chan_id, chan in list(self.channel_map.items()):
+            if chan['channel'] == 'book' and pair_exchange_to_std(chan['symbol']) == pair:
+                self.resyncing[chan_id] = self.channel_map.pop(chan_id)['subscription']
+                await self.websocket.send(json.dumps({'event': 'unsubscribe', 'chanId': chan_id}))
+
     async def message_handler(self, msg: str, timestamp: float):
         msg = json.loads(msg, parse_float=Decimal)
 
         if isinstance(msg, list):
             chan_id = msg[0]
             if chan_id in self.channel_map:
-                seq_no = msg[-1]
-                if self.seq_no + 1 != seq_no:
-                    LOG.warning("%s: missing sequence number. Received %d, expected %d", self.id, seq_no, self.seq_no + 1)
-                    raise MissingSequenceNumber
-                self.seq_no = seq_no
-
-                await self.channel_map[chan_id]['handler'](msg, timestamp)
+                if await self.check_sequence(None, msg[-1]):
+                    await self.channel_map[chan_id]['handler'](msg, timestamp)
+            elif chan_id in self.resyncing:
+                # updates sent before the unsubscribe was processed
+                await self.check_sequence(None, msg[-1])
             else:
                 LOG.warning("%s: Unexpected message on unregistered channel %s", self.id, msg)
         elif 'event' in msg and msg['event'] == 'error':
             LOG.error("%s: Error message from exchange: %s", self.id, msg['msg'])
+        elif 'event' in msg and msg['event'] == 'unsubscribed':
+            subscription = self.resyncing.pop(msg['chanId'], None)
+            if subscription:
+                await self.websocket.send(json.dumps(subscription))
         elif 'chanId' in msg and 'symbol' in msg:
             handler = None
             if msg['channel'] == 'ticker':
@@ -290,15 +338,20 @@ class Bitfinex(Feed):
                 LOG.warning('%s: Invalid message type %s', self.id, msg)
                 return
 
+            subscription = {'event': 'subscribe', 'channel': msg['channel'], 'symbol': msg['symbol']}
+            if msg['channel'] == 'book':
+                subscription.update({key: msg[key] for key in ('prec', 'freq', 'len') if key in msg})
             self.channel_map[msg['chanId']] = {'symbol': msg['symbol'],
                                                'channel': msg['channel'],
-                                               'handler': handler}
+                                               'handler': handler,
+                                               'subscription': subscription}
 
     async def subscribe(self, websocket):
+        self.websocket = websocket
         self.__reset()
         await websocket.send(json.dumps({
             'event': "conf",
-            'flags': SEQ_ALL
+            'flags': SEQ_ALL | CHECKSUM if self.checksum_sample else SEQ_ALL
         }))
 
         for channel in self.channels if not self.config else self.config:
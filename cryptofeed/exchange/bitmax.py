@@ -6,6 +6,7 @@ associated with this software.
 '''
 import json
 import logging
+from collections import defaultdict
 from decimal import Decimal
 
 from sortedcontainers import SortedDict as sd
@@ -29,14 +30,37 @@ class Bitmax(Feed):
             super().__init__('wss://bitmax.io/api/public/', pairs=None, channels=None, callbacks=callbacks, **kwargs)
             self.address += pair_std_to_exchange(self.pair, self.id).replace('/', '-')
             self.pairs = pairs
+            self.init_kwargs['pairs'] = pairs
         else:
+            # only split into single pair feeds (see `shard`), which do the initialization
             self.pairs = pairs
             self.config = kwargs.get('config', None)
             self.callbacks = callbacks
+            self.init_kwargs = dict(kwargs, pairs=pairs, callbacks=callbacks)
 
     def __reset(self):
         self.l2_book = {self.pair: {BID: sd(), ASK: sd()}}
 
+    def shard(self, count=None) -> list:
+        """
+        Bitmax needs a separate websocket per symbol, and each connection receives all
+        data for that symbol, so the feed is always split into one feed per pair
+        """
+        if self.pairs and len(self.pairs) == 1:
+            return [self]
+        kwargs = self.copy_kwargs()
+        config = kwargs.pop('config', None)
+        kwargs.pop('pairs', None)
+        callbacks = kwargs.pop('callbacks', None) or {}
+
+        if config:
+            channels = defaultdict(list)
+            for cb, symbols in config.items():
+                for symbol in symbols:
+                    channels[symbol].append(cb)
+            return [Bitmax(pairs=[symbol], callbacks={cb: callbacks[cb] for cb in cbs}, **kwargs) for symbol, cbs in channels.items()]
+        return [Bitmax(pairs=[pair], callbacks=callbacks, **kwargs) for pair in self.pairs or []]
+
     async def subscribe(self, websocket):
         self.websocket = websocket
         self.__reset()
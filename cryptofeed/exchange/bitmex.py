@@ -106,7 +106,8 @@ class Bitmex(Feed):
 
         return order
 
-    async def _trade(self, msg):
+    @classmethod
+    def _parse_trades(cls, msg):
         """
         trade msg example
 
@@ -123,17 +124,32 @@ class Bitmex(Feed):
             'foreignNotional': 40
         }
         """
-        for data in msg['data']:
-            ts = timestamp_normalize(self.id, data['timestamp'])
+        return tuple((data['symbol'], BUY if data['side'] == 'Buy' else SELL, Decimal(data['size']), Decimal(data['price']),
+                      data['trdMatchID'], timestamp_normalize(cls.id, data['timestamp'])) for data in msg['data'])
+
+    async def _trade(self, trades):
+        for pair, side, amount, price, order_id, timestamp in trades:
             await self.callback(TRADES, feed=self.id,
-                                         pair=data['symbol'],
-                                         side=BUY if data['side'] == 'Buy' else SELL,
-                                         amount=Decimal(data['size']),
-                                         price=Decimal(data['price']),
-                                         order_id=data['trdMatchID'],
-                                         timestamp=ts)
-
-    async def _book(self, msg: dict, timestamp: float):
+                                         pair=pair,
+                                         side=side,
+                                         amount=amount,
+                                         price=price,
+                                         order_id=order_id,
+                                         timestamp=timestamp)
+
+    @staticmethod
+    def _parse_book(msg):
+        """
+        (action, pair, ((side, order id, price, size), ...)), price is None for
+        updates and deletes, size is None for deletes
+        """
+        action = msg['action']
+        entries = tuple((BID if data['side'] == 'Buy' else ASK, data['id'],
+                         Decimal(data['price']) if 'price' in data and action in ('partial', 'insert') else None,
+                         Decimal(data['size']) if 'size' in data else None) for data in msg['data'])
+        return action, msg['data'][0]['symbol'] if msg['data'] else None, entries
+
+    async def _book(self, action, pair, entries, timestamp: float):
         """
         the Full bitmex book
         """
@@ -143,68 +159,52 @@ class Bitmex(Feed):
         if not self.partial_received:
             # per bitmex documentation messages received before partial
             # should be discarded
-            if msg['action'] != 'partial':
+            if action != 'partial':
                 return
             self.partial_received = True
             forced = True
+        if pair is None:
+            return
 
-        pair = msg['data'][0]['symbol']
-
-        if msg['action'] == 'partial':
-            for data in msg['data']:
-                side = BID if data['side'] == 'Buy' else ASK
-                price = Decimal(data['price'])
-                size = Decimal(data['size'])
-                order_id = data['id']
-
+        if action == 'partial':
+            for side, order_id, price, size in entries:
                 self.l2_book[pair][side][price] = size
                 self.order_id[pair][side][order_id] = price
-        elif msg['action'] == 'insert':
-            for data in msg['data']:
-                side = BID if data['side'] == 'Buy' else ASK
-                price = Decimal(data['price'])
-                size = Decimal(data['size'])
-                order_id = data['id']
-
+        elif action == 'insert':
+            for side, order_id, price, size in entries:
                 self.l2_book[pair][side][price] = size
                 self.order_id[pair][side][order_id] = price
                 delta[side].append((price, size))
-        elif msg['action'] == 'update':
-            for data in msg['data']:
-                side = BID if data['side'] == 'Buy' else ASK
-                update_size = Decimal(data['size'])
-                order_id = data['id']
-
+        elif action == 'update':
+            for side, order_id, _, update_size in entries:
                 price = self.order_id[pair][side][order_id]
 
                 self.l2_book[pair][side][price] = update_size
-                self.order_id[pair][side][order_id] = price
                 delta[side].append((price, update_size))
-        elif msg['action'] == 'delete':
-            for data in msg['data']:
-                side = BID if data['side'] == 'Buy' else ASK
-                order_id = data['id']
-
+        elif action == 'delete':
+            for side, order_id, _, _ in entries:
                 delete_price = self.order_id[pair][side][order_id]
                 del self.order_id[pair][side][order_id]
                 del self.l2_book[pair][side][delete_price]
                 delta[side].append((delete_price, 0))
-
         else:
-            LOG.warning("%s: Unexpected l2 Book message %s", self.id, msg)
+            LOG.warning("%s: Unexpected l2 Book message %s", self.id, action)
             return
 
         await self.book_callback(self.l2_book[pair], L2_BOOK, pair, forced, delta, timestamp)
 
-    async def _ticker(self, msg):
-        for data in msg['data']:
-            await self.callback(TICKER, feed=self.id,
-                            pair=data['symbol'],
-                            bid=Decimal(data['bidPrice']),
-                            ask=Decimal(data['askPrice']),
-                            timestamp=timestamp_normalize(self.id, data['timestamp']))
-
+    @classmethod
+    def _parse_ticker(cls, msg):
+        return tuple((data['symbol'], Decimal(data['bidPrice']), Decimal(data['askPrice']), timestamp_normalize(cls.id, data['timestamp']))
+                     for data in msg['data'])
 
+    async def _ticker(self, quotes):
+        for pair, bid, ask, timestamp in quotes:
+            await self.callback(TICKER, feed=self.id,
+                            pair=pair,
+                            bid=bid,
+                            ask=ask,
+                            timestamp=timestamp)
 
     async def _funding(self, msg):
         """
@@ -264,9 +264,31 @@ class Bitmex(Feed):
         for data in msg['data']:
             await self.callback(POSITION, feed=self.id, pair=data['symbol'], **data)
 
-    async def message_handler(self, msg: str, timestamp: float):
+    @classmethod
+    def parse(cls, msg):
+        """
+        Trades, quotes and book updates are normalized to (data type, tuple), other
+        messages are returned as (None, message)
+        """
         msg = json.loads(msg, parse_float=Decimal)
-        if 'info' in msg:
+        table = msg.get('table')
+        if table == 'trade':
+            return TRADES, cls._parse_trades(msg)
+        elif table == 'orderBookL2':
+            return L2_BOOK, cls._parse_book(msg)
+        elif table == 'quote':
+            return TICKER, cls._parse_ticker(msg)
+        return None, msg
+
+    async def apply(self, msg: tuple, timestamp: float):
+        data_type, msg = msg
+        if data_type == TRADES:
+            await self._trade(msg)
+        elif data_type == L2_BOOK:
+            await self._book(*msg, timestamp)
+        elif data_type == TICKER:
+            await self._ticker(msg)
+        elif 'info' in msg:
             LOG.info("%s - info message: %s", self.id, msg)
         elif 'request' in msg:
             LOG.info("%s - request message: %s", self.id, msg)
@@ -276,16 +298,10 @@ class Bitmex(Feed):
         elif 'error' in msg:
             LOG.error("%s: Error message from exchange: %s", self.id, msg)
         else:
-            if msg['table'] == 'trade':
-                await self._trade(msg)
-            elif msg['table'] == 'orderBookL2':
-                await self._book(msg, timestamp)
-            elif msg['table'] == 'funding':
+            if msg['table'] == 'funding':
                 await self._funding(msg)
             elif msg['table'] == 'instrument':
                 await self._instrument(msg)
-            elif msg['table'] == 'quote':
-                await self._ticker(msg)
             elif msg['table'] == 'order':
                 await self._order(msg)
             elif msg['table'] == 'position':
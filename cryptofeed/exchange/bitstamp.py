@@ -15,6 +15,7 @@ from sortedcontainers import SortedDict as sd
 from cryptofeed.feed import Feed
 from cryptofeed.defines import BUY, SELL, BID, ASK, TRADES, L2_BOOK, L3_BOOK, BITSTAMP
 from cryptofeed.standards import pair_exchange_to_std, feed_to_exchange, timestamp_normalize
+from cryptofeed.util.book import L3Book
 
 
 LOG = logging.getLogger('feedhandler')
@@ -69,12 +70,10 @@ class Bitstamp(Feed):
         timestamp = int(data['microtimestamp'])
         pair = pair_exchange_to_std(chan.split('_')[-1])
 
-        book = {BID: sd(), ASK: sd()}
+        book = L3Book()
         for side in (BID, ASK):
             for price, size, order_id in data[side + 's']:
-                price = Decimal(price)
-                size = Decimal(size)
-                book[side].get(price, sd())[order_id] = size
+                book.add(order_id, side, Decimal(price), Decimal(size))
         self.l3_book[pair] = book
         await self.book_callback(self.l3_book[pair], L3_BOOK, pair, False, False, timestamp_normalize(self.id, timestamp))
 
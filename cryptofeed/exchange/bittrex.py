@@ -17,6 +17,7 @@ LOG = logging.getLogger('feedhandler')
 
 class Bittrex(Feed):
     id = BITTREX
+    compressed = True
 
     def __init__(self, pairs=None, channels=None, callbacks=None, **kwargs):
         super().__init__('wss://socket.bittrex.com/signalr', pairs=pairs, channels=channels, callbacks=callbacks, **kwargs)
@@ -75,24 +76,39 @@ class Bittrex(Feed):
                                             price=trade['R'],
                                             timestamp=timestamp_normalize(self.id, trade['T']))
 
-    async def message_handler(self, msg: str, timestamp: float):
+    @staticmethod
+    def _inflate(data: str) -> bytes:
+        return zlib.decompress(base64.b64decode(data), -zlib.MAX_WBITS)
+
+    @staticmethod
+    def decode(msg):
+        # book, trade and ticker payloads are base64 encoded and DEFLATE compressed
         msg = json.loads(msg)
+        if 'M' in msg and len(msg['M']) > 0:
+            for update in msg['M']:
+                if update['M'] in ('uE', 'uS'):
+                    update['A'] = [Bittrex._inflate(message) for message in update['A']]
+        elif 'R' in msg and isinstance(msg['R'], str):
+            msg['R'] = Bittrex._inflate(msg['R'])
+        return msg
+
+    async def message_handler(self, msg: dict, timestamp: float):
         if 'M' in msg and len(msg['M']) > 0:
             for update in msg['M']:
                 if update['M'] == 'uE':
                     # Book deltas + Trades
                     for message in update['A']:
-                        data = json.loads(zlib.decompress(base64.b64decode(message), -zlib.MAX_WBITS).decode(), parse_float=Decimal)
+                        data = json.loads(message, parse_float=Decimal)
                         await self.book(data, timestamp)
                         if 'f' in data and data['f']:
                             await self.trades(data['M'], data['f'])
                 if update['M'] == 'uS':
                     # Tickers
                     for message in update['A']:
-                        data = json.loads(zlib.decompress(base64.b64decode(message), -zlib.MAX_WBITS).decode(), parse_float=Decimal)
+                        data = json.loads(message, parse_float=Decimal)
                         await self.ticker(data)
-        elif 'R' in msg and isinstance(msg['R'], str):
-            data = json.loads(zlib.decompress(base64.b64decode(msg['R']), -zlib.MAX_WBITS).decode(), parse_float=Decimal)
+        elif 'R' in msg and isinstance(msg['R'], bytes):
+            data = json.loads(msg['R'], parse_float=Decimal)
             await self._snapshot(data, timestamp)
         elif 'E' in msg:
             LOG.error("%s: Error from exchange %s", self.id, msg)
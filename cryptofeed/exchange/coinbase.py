@@ -15,7 +15,8 @@ from sortedcontainers import SortedDict as sd
 
 from cryptofeed.feed import Feed
 from cryptofeed.defines import L2_BOOK, L3_BOOK, BUY, SELL, BID, ASK, TRADES, TICKER, COINBASE
-from cryptofeed.standards import timestamp_normalize, pair_exchange_to_std
+from cryptofeed.standards import timestamp_normalize, pair_exchange_to_std, pair_std_to_exchange
+from cryptofeed.util.book import L3Book
 
 
 LOG = logging.getLogger('feedhandler')
@@ -29,8 +30,7 @@ class Coinbase(Feed):
         self.__reset()
 
     def __reset(self):
-        self.order_map = {}
-        self.seq_no = {}
+        self.sequence = {}
         self.l3_book = {}
         self.l2_book = {}
 
@@ -99,17 +99,14 @@ class Coinbase(Feed):
             maker_order_id = msg['maker_order_id']
             timestamp = timestamp_normalize(self.id, msg['time'])
 
-            _, new_size = self.order_map[maker_order_id]
+            book = self.l3_book[pair]
+            _, _, new_size = book.order(maker_order_id)
             new_size -= size
             if new_size <= 0:
-                del self.order_map[maker_order_id]
+                book.remove(maker_order_id)
                 delta[side].append((maker_order_id, price, 0))
-                del self.l3_book[pair][side][price][maker_order_id]
-                if len(self.l3_book[pair][side][price]) == 0:
-                    del self.l3_book[pair][side][price]
             else:
-                self.order_map[maker_order_id] = (price, new_size)
-                self.l3_book[pair][side][price][maker_order_id] = new_size
+                book.change(maker_order_id, new_size)
                 delta[side].append((maker_order_id, price, new_size))
 
             await self.book_callback(self.l3_book[pair], L3_BOOK, pair, False, delta, timestamp)
@@ -159,7 +156,6 @@ class Coinbase(Feed):
         await self.book_callback(self.l2_book[pair], L2_BOOK, pair, False, delta, timestamp)
 
     async def _book_snapshot(self, pairs: list):
-        self.__reset()
         # Coinbase needs some time to send messages to us
         # before we request the snapshot. If we don't sleep
         # the snapshot seq no could be much earlier than
@@ -178,17 +174,11 @@ class Coinbase(Feed):
         for res, pair in zip(results, pairs):
             orders = res.json()
             npair = pair_exchange_to_std(pair)
-            self.l3_book[npair] = {BID: sd(), ASK: sd()}
-            self.seq_no[npair] = orders['sequence']
+            book = self.l3_book[npair] = L3Book()
+            self.sequence[npair] = orders['sequence']
             for side in (BID, ASK):
                 for price, size, order_id in orders[side + 's']:
-                    price = Decimal(price)
-                    size = Decimal(size)
-                    if price in self.l3_book[npair][side]:
-                        self.l3_book[npair][side][price][order_id] = size
-                    else:
-                        self.l3_book[npair][side][price] = {order_id: size}
-                    self.order_map[order_id] = (price, size)
+                    book.add(order_id, side, Decimal(price), Decimal(size))
             await self.book_callback(self.l3_book[npair], L3_BOOK, npair, True, None, timestamp=timestamp)
 
     async def _open(self, msg):
@@ -200,11 +190,7 @@ class Coinbase(Feed):
         order_id = msg['order_id']
         timestamp = timestamp_normalize(self.id, msg['time'])
 
-        if price in self.l3_book[pair][side]:
-            self.l3_book[pair][side][price][order_id] = size
-        else:
-            self.l3_book[pair][side][price] = {order_id: size}
-        self.order_map[order_id] = (price, size)
+        self.l3_book[pair].add(order_id, side, price, size)
 
         delta[side].append((order_id, price, size))
 
@@ -224,19 +210,15 @@ class Coinbase(Feed):
             return
 
         order_id = msg['order_id']
-        if order_id not in self.order_map:
+        pair = pair_exchange_to_std(msg['product_id'])
+        if self.l3_book[pair].remove(order_id) is None:
             return
 
         price = Decimal(msg['price'])
         side = ASK if msg['side'] == 'sell' else BID
-        pair = pair_exchange_to_std(msg['product_id'])
         timestamp = timestamp_normalize(self.id, msg['time'])
 
-        del self.l3_book[pair][side][price][order_id]
-        if len(self.l3_book[pair][side][price]) == 0:
-            del self.l3_book[pair][side][price]
         delta[side].append((order_id, price, 0))
-        del self.order_map[order_id]
 
         await self.book_callback(self.l3_book[pair], L3_BOOK, pair, False, delta, timestamp)
 
@@ -252,27 +234,47 @@ class Coinbase(Feed):
         new_size = Decimal(msg['new_size'])
         pair = pair_exchange_to_std(msg['product_id'])
 
-        self.l3_book[pair][side][price][order_id] = new_size
-        self.order_map[order_id] = (price, new_size)
+        if self.l3_book[pair].change(order_id, new_size) is None:
+            # change messages are also sent for received orders that are not on the book
+            return
 
         delta[side].append((order_id, price, new_size))
 
-        await self.book_callback(self.l3_book, L3_BOOK, pair, False, delta, timestamp)
+        await self.book_callback(self.l3_book[pair], L3_BOOK, pair, False, delta, timestamp)
+
+    async def resync(self, pair, error):
+        LOG.warning("%s: Requesting book snapshot for %s", self.id, pair)
+        await self._book_snapshot([pair_std_to_exchange(pair, self.id)])
+
+    def message_key(self, msg):
+        data = json.loads(msg)
+        if 'sequence' in data:
+            # ticker, heartbeat and full channel messages carry the product's sequence number
+            return data.get('product_id'), data['sequence'], data['type']
+        if data.get('type') == 'l2update':
+            # level 2 updates have no sequence number, they are ordered by time
+            return ('l2update', data['product_id']), self._time_position(data['time']), msg
+        if data.get('type') == 'snapshot':
+            # level 2 snapshots are sent on subscribing, only the first connection's is applied
+            return None, None, ('snapshot', data['product_id'])
+        return None, None, msg
+
+    @staticmethod
+    def _time_position(timestamp: str) -> str:
+        """
+        ISO 8601 time with the fraction padded, so times compare in order as strings
+        """
+        timestamp = timestamp.rstrip('Z')
+        head, _, fraction = timestamp.partition('.')
+        return f"{head}.{fraction:0<9}"
 
     async def message_handler(self, msg: str, timestamp: float):
         msg = json.loads(msg, parse_float=Decimal)
 
         if 'product_id' in msg and 'sequence' in msg and ('full' in self.channels or ('full' in self.config and msg['product_id'] in self.config['full'])):
             pair = pair_exchange_to_std(msg['product_id'])
-            if msg['sequence'] <= self.seq_no[pair]:
+            if not await self.check_sequence(pair, msg['sequence']):
                 return
-            elif ('full' in self.channels or 'full' in self.config) and msg['sequence'] != self.seq_no[pair] + 1:
-                LOG.warning("%s: Missing sequence number detected for %s", self.id, pair)
-                LOG.warning("%s: Requesting book snapshot", self.id)
-                await self._book_snapshot(self.pairs or self.book_pairs)
-                return
-
-            self.seq_no[pair] = msg['sequence']
 
         if 'type' in msg:
             if msg['type'] == 'ticker':
@@ -6,14 +6,16 @@ associated with this software.
 '''
 import json
 import logging
+import zlib
 from decimal import Decimal
+from itertools import zip_longest, islice
 
 from sortedcontainers import SortedDict as sd
 
 from cryptofeed.feed import Feed
 from cryptofeed.defines import FTX as FTX_id
 from cryptofeed.defines import TRADES, BUY, SELL, BID, ASK, TICKER, L2_BOOK
-from cryptofeed.standards import pair_exchange_to_std, timestamp_normalize
+from cryptofeed.standards import pair_exchange_to_std, pair_std_to_exchange, timestamp_normalize
 
 
 LOG = logging.getLogger('feedhandler')
@@ -24,9 +26,12 @@ class FTX(Feed):
 
     def __init__(self, pairs=None, channels=None, callbacks=None, **kwargs):
         super().__init__('wss://ftexchange.com/ws/', pairs=pairs, channels=channels, callbacks=callbacks, **kwargs)
+        self.__reset()
 
     def __reset(self):
         self.l2_book = {}
+        # pairs waiting for a new snapshot after a checksum mismatch
+        self.resyncing = set()
 
     async def subscribe(self, websocket):
         self.websocket = websocket
@@ -41,6 +46,39 @@ class FTX(Feed):
                     }
                 ))
 
+    async def resync(self, pair, error):
+        """
+        Resubscribe to the orderbook channel of the pair, updates are ignored
+        until the new snapshot arrives
+        """
+        self.resyncing.add(pair)
+        market = pair_std_to_exchange(pair, self.id)
+        for op in ('unsubscribe', 'subscribe'):
+            await self.websocket.send(json.dumps({"channel": "orderbook", "market": market, "op": op}))
+
+    @staticmethod
+    def _format(value) -> str:
+        # checksums are calculated on the float representation of the values
+        return str(float(value))
+
+    def _checksum(self, pair) -> int:
+        """
+        CRC32 of the top 100 levels, interleaved best bid first:
+        bid price:bid size:ask price:ask size:...
+        """
+        book = self.l2_book[pair]
+        bids = islice(reversed(book[BID]), 100)
+        asks = islice(book[ASK], 100)
+        fields = []
+        for bid, ask in zip_longest(bids, asks):
+            if bid is not None:
+                fields.append(self._format(bid))
+                fields.append(self._format(book[BID][bid]))
+            if ask is not None:
+                fields.append(self._format(ask))
+                fields.append(self._format(book[ASK][ask]))
+        return zlib.crc32(':'.join(fields).encode())
+
     async def _trade(self, msg):
         """
         example message:
@@ -82,9 +120,10 @@ class FTX(Feed):
         {"channel": "orderbook", "market": "BTC/USD", "type": "update", "data": {"time": 1564834587.1299787,
         "checksum": 3115602423, "bids": [], "asks": [[10719.0, 14.7461]], "action": "update"}}
         """
+        pair = pair_exchange_to_std(msg['market'])
         if msg['type'] == 'partial':
             # snapshot
-            pair = pair_exchange_to_std(msg['market'])
+            self.resyncing.discard(pair)
             self.l2_book[pair] = {
                 BID: sd({
                     Decimal(price) : Decimal(amount) for price, amount in msg['data']['bids']
@@ -93,11 +132,12 @@ class FTX(Feed):
                     Decimal(price) : Decimal(amount) for price, amount in msg['data']['asks']
                 })
             }
+            if not await self.check_checksum(pair, msg['data']['checksum'], lambda: self._checksum(pair)):
+                return
             await self.book_callback(self.l2_book[pair], L2_BOOK, pair, True, None, float(msg['data']['time']))
-        else:
+        elif pair not in self.resyncing:
             # update
             delta = {BID: [], ASK: []}
-            pair = pair_exchange_to_std(msg['market'])
             for side in ('bids', 'asks'):
                 s = BID if side == 'bids' else ASK
                 for price, amount in msg['data'][side]:
@@ -109,6 +149,8 @@ class FTX(Feed):
                     else:
                         delta[s].append((price, amount))
                         self.l2_book[pair][s][price] = amount
+            if not await self.check_checksum(pair, msg['data']['checksum'], lambda: self._checksum(pair)):
+                return
             await self.book_callback(self.l2_book[pair], L2_BOOK, pair, False, delta, float(msg['data']['time']))
 
     async def message_handler(self, msg: str, timestamp: float):
@@ -40,6 +40,7 @@ LOG = logging.getLogger('feedhandler')
 
 class HuobiDM(Feed):
     id = HUOBI_DM
+    compressed = True
 
     def __init__(self, pairs=None, channels=None, callbacks=None, config=None, **kwargs):
         super().__init__('wss://www.hbdm.com/ws', pairs=pairs, channels=channels, callbacks=callbacks, config=config, **kwargs)
@@ -104,9 +105,12 @@ class HuobiDM(Feed):
                 timestamp=timestamp_normalize(self.id, trade['ts'])
             )
 
+    @staticmethod
+    def decode(msg):
+        # gzip compression
+        return zlib.decompress(msg, 16+zlib.MAX_WBITS)
+
     async def message_handler(self, msg: str, timestamp: float):
-        # unzip message
-        msg = zlib.decompress(msg, 16+zlib.MAX_WBITS)
         msg = json.loads(msg, parse_float=Decimal)
 
         # Huobi sends a ping evert 5 seconds and will disconnect us if we do not respond to it
@@ -115,23 +119,30 @@ class HuobiDM(Feed):
         elif 'status' in msg and msg['status'] == 'ok':
             return
         elif 'ch' in msg:
-            if 'trade' in msg['ch']:
-                await self._trade(msg)
-            elif 'depth' in msg['ch']:
-                await self._book(msg)
-            else:
+            handler = self.handlers.get(msg['ch'])
+            if handler is None:
                 LOG.warning("%s: Invalid message type %s", self.id, msg)
+            else:
+                await handler(msg)
         else:
             LOG.warning("%s: Invalid message type %s", self.id, msg)
 
+    def _add_handler(self, ch: str, chan: str):
+        if 'trade' in chan:
+            self.handlers[ch] = self._trade
+        elif 'depth' in chan:
+            self.handlers[ch] = self._book
+
     async def subscribe(self, websocket):
         self.websocket = websocket
         self.__reset()
+        self.handlers = {}
         client_id = 0
         for chan in self.channels if self.channels else self.config:
             for pair in self.pairs if self.pairs else self.config[chan]:
                 client_id += 1
                 pair = pair_exchange_to_std(pair)
+                self._add_handler(f"market.{pair}.{chan}", chan)
                 await websocket.send(json.dumps(
                     {
                         "sub": f"market.{pair}.{chan}",
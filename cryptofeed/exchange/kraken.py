@@ -24,6 +24,7 @@ class Kraken(Feed):
     def __init__(self, pairs=None, channels=None, callbacks=None, depth=1000, **kwargs):
         super().__init__('wss://ws.kraken.com', pairs=pairs, channels=channels, callbacks=callbacks, **kwargs)
         self.book_depth = depth
+        self.init_kwargs['depth'] = depth
 
     def __reset(self):
         self.l2_book = {}
@@ -6,7 +6,6 @@ associated with this software.
 '''
 import asyncio
 import json
-import re
 import logging
 from decimal import Decimal
 import os
@@ -26,6 +25,7 @@ LOG = logging.getLogger('feedhandler')
 
 class OKCoin(Feed):
     id = OKCOIN
+    compressed = True
     table_prefixs = ['spot']
 
     def __init__(self, pairs=None, channels=None, callbacks=None, **kwargs):
@@ -45,6 +45,8 @@ class OKCoin(Feed):
             # wait for login
             await asyncio.sleep(0.5)
         self.__reset()
+        self.handlers = {f"{prefix}/{name}": handler for prefix in self.table_prefixs
+                         for name, handler in (('ticker', self._ticker), ('trade', self._trade), ('depth', self._book), ('order', self._order))}
         if self.config:
             for chan in self.config:
                 args = [f"{chan}:{pair}" for pair in self.config[chan]]
@@ -59,67 +61,82 @@ class OKCoin(Feed):
                                     "args": chans
                                 }))
 
-    async def _ticker(self, msg):
+    @classmethod
+    def _parse_ticker(cls, msg):
         """
         {'table': 'spot/ticker', 'data': [{'instrument_id': 'BTC-USD', 'last': '3977.74', 'best_bid': '3977.08', 'best_ask': '3978.73', 'open_24h': '3978.21', 'high_24h': '3995.43', 'low_24h': '3961.02', 'base_volume_24h': '248.245', 'quote_volume_24h': '988112.225861', 'timestamp': '2019-03-22T22:26:34.019Z'}]}
         """
-        for update in msg['data']:
+        return tuple((update['instrument_id'], Decimal(update['best_bid']), Decimal(update['best_ask']), timestamp_normalize(cls.id, update['timestamp']))
+                     for update in msg['data'])
+
+    async def _ticker(self, tickers):
+        for pair, bid, ask, timestamp in tickers:
             await self.callback(TICKER, feed=self.id,
-                                         pair=update['instrument_id'],
-                                         bid=Decimal(update['best_bid']),
-                                         ask=Decimal(update['best_ask']),
-                                         timestamp=timestamp_normalize(self.id, update['timestamp']))
+                                         pair=pair,
+                                         bid=bid,
+                                         ask=ask,
+                                         timestamp=timestamp)
 
-    async def _trade(self, msg):
+    @classmethod
+    def _parse_trades(cls, msg):
         """
         {'table': 'spot/trade', 'data': [{'instrument_id': 'BTC-USD', 'price': '3977.44', 'side': 'buy', 'size': '0.0096', 'timestamp': '2019-03-22T22:45:44.578Z', 'trade_id': '486519521'}]}
         """
-        for trade in msg['data']:
-            if msg['table'] == 'futures/trade':
-                amount_sym = 'qty'
-            else:
-                amount_sym = 'size'
+        if msg['table'] == 'futures/trade':
+            amount_sym = 'qty'
+        else:
+            amount_sym = 'size'
+        return tuple((trade['instrument_id'], trade['trade_id'], BUY if trade['side'] == 'buy' else SELL,
+                      Decimal(trade[amount_sym]), Decimal(trade['price']), timestamp_normalize(cls.id, trade['timestamp']))
+                     for trade in msg['data'])
+
+    async def _trade(self, trades):
+        for symbol, order_id, side, amount, price, timestamp in trades:
             await self.callback(TRADES,
                 feed=self.id,
-                pair=pair_exchange_to_std(trade['instrument_id']),
-                order_id=trade['trade_id'],
-                side=BUY if trade['side'] == 'buy' else SELL,
-                amount=Decimal(trade[amount_sym]),
-                price=Decimal(trade['price']),
-                timestamp=timestamp_normalize(self.id, trade['timestamp'])
+                pair=pair_exchange_to_std(symbol),
+                order_id=order_id,
+                side=side,
+                amount=amount,
+                price=price,
+                timestamp=timestamp
             )
 
+    @classmethod
+    def _parse_book(cls, msg):
+        """
+        (action, ((instrument, timestamp, ((bid price, amount), ...), ((ask price, amount), ...)), ...))
+        """
+        return msg['action'], tuple((update['instrument_id'], timestamp_normalize(cls.id, update['timestamp']),
+                                     tuple((Decimal(price), Decimal(amount)) for price, amount, *_ in update['bids']),
+                                     tuple((Decimal(price), Decimal(amount)) for price, amount, *_ in update['asks']))
+                                    for update in msg['data'])
+
     async def _book(self, msg):
-        if msg['action'] == 'partial':
+        action, updates = msg
+        if action == 'partial':
             # snapshot
-            for update in msg['data']:
-                pair = pair_exchange_to_std(update['instrument_id'])
+            for symbol, timestamp, bids, asks in updates:
+                pair = pair_exchange_to_std(symbol)
                 self.l2_book[pair] = {
-                    BID: sd({
-                        Decimal(price) : Decimal(amount) for price, amount, *_ in update['bids']
-                    }),
-                    ASK: sd({
-                        Decimal(price) : Decimal(amount) for price, amount, *_ in update['asks']
-                    })
+                    BID: sd(bids),
+                    ASK: sd(asks)
                 }
-                await self.book_callback(self.l2_book[pair], L2_BOOK, pair, True, None, timestamp_normalize(self.id, update['timestamp']))
+                await self.book_callback(self.l2_book[pair], L2_BOOK, pair, True, None, timestamp)
         else:
             # update
-            for update in msg['data']:
+            for symbol, timestamp, bids, asks in updates:
                 delta = {BID: [], ASK: []}
-                pair = pair_exchange_to_std(update['instrument_id'])
-                for side in ('bids', 'asks'):
-                    s = BID if side == 'bids' else ASK
-                    for price, amount, *_ in update[side]:
-                        price = Decimal(price)
-                        amount = Decimal(amount)
+                pair = pair_exchange_to_std(symbol)
+                for s, levels in ((BID, bids), (ASK, asks)):
+                    for price, amount in levels:
                         if amount == 0:
                             delta[s].append((price, 0))
                             del self.l2_book[pair][s][price]
                         else:
                             delta[s].append((price, amount))
                             self.l2_book[pair][s][price] = amount
-                await self.book_callback(self.l2_book[pair], L2_BOOK, pair, False, delta, timestamp_normalize(self.id, update['timestamp']))
+                await self.book_callback(self.l2_book[pair], L2_BOOK, pair, False, delta, timestamp)
 
     async def _order(self, msg):
         for data in msg['data']:
@@ -157,12 +174,39 @@ class OKCoin(Feed):
         ret = states.get(state, None)
         return ret
 
-    async def message_handler(self, msg: str, timestamp: float):
+    @staticmethod
+    def decode(msg):
         # DEFLATE compression, no header
-        msg = zlib.decompress(msg, -15)
-        msg = json.loads(msg, parse_float=Decimal)
+        return zlib.decompress(msg, -15)
 
-        if 'event' in msg:
+    @classmethod
+    def parse(cls, msg):
+        """
+        Tickers, trades and book updates are normalized to (table, tuple), other
+        messages are returned as (table or None, message)
+        """
+        msg = json.loads(msg, parse_float=Decimal)
+        if 'event' in msg or 'table' not in msg:
+            return None, msg
+        table = msg['table']
+        kind = table.rpartition('/')[2]
+        if kind == 'ticker':
+            return table, cls._parse_ticker(msg)
+        elif kind == 'trade':
+            return table, cls._parse_trades(msg)
+        elif kind == 'depth':
+            return table, cls._parse_book(msg)
+        return table, msg
+
+    async def apply(self, msg: tuple, timestamp: float):
+        table, msg = msg
+        if table is not None:
+            handler = self.handlers.get(table)
+            if handler is None:
+                LOG.warning("%s: Unhandled message %s", self.id, msg)
+            else:
+                await handler(msg)
+        elif 'event' in msg:
             if msg['event'] == 'error':
                 LOG.error("%s: Error: %s", self.id, msg)
             elif msg['event'] == 'subscribe':
@@ -171,17 +215,6 @@ class OKCoin(Feed):
                 self.logged_in = True
             else:
                 LOG.warning("%s: Unhandled event %s", self.id, msg)
-        elif 'table' in msg:
-            if re.match(f'^({"|".join(self.table_prefixs)})/ticker$', msg['table']):
-                await self._ticker(msg)
-            elif re.match(f'^({"|".join(self.table_prefixs)})/trade$', msg['table']):
-                await self._trade(msg)
-            elif re.match(f'^({"|".join(self.table_prefixs)})/depth$', msg['table']):
-                await self._book(msg)
-            elif re.match(f'^({"|".join(self.table_prefixs)})/order$', msg['table']):
-                await self._order(msg)
-            else:
-                LOG.warning("%s: Unhandled message %s", self.id, msg)
         else:
             LOG.warning("%s: Unhandled message %s", self.id, msg)
 
@@ -3,32 +3,58 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 
 Please see the LICENSE file for the terms and conditions
 associated with this software.
+
+
+Exchange classes are imported lazily, on first attribute access, so that
+`import cryptofeed` does not load every exchange module (and their
+dependencies). `from cryptofeed.exchanges import Coinbase` works as before
+and only imports the Coinbase module.
 '''
-from cryptofeed.exchange.binance import Binance
-from cryptofeed.exchange.binance_margin import BinanceMargin
-from cryptofeed.exchange.binance_us import BinanceUS
-from cryptofeed.exchange.binance_jersey import BinanceJersey
-from cryptofeed.exchange.binance_futures import BinanceFutures
-from cryptofeed.exchange.bitfinex import Bitfinex
-from cryptofeed.exchange.bitstamp import Bitstamp
-from cryptofeed.exchange.coinbase import Coinbase
-from cryptofeed.exchange.gemini import Gemini
-from cryptofeed.exchange.hitbtc import HitBTC
-from cryptofeed.exchange.poloniex import Poloniex
-from cryptofeed.exchange.bitmex import Bitmex
-from cryptofeed.exchange.kraken import Kraken
-from cryptofeed.exchange.kraken_futures import KrakenFutures
-from cryptofeed.exchange.exx import EXX
-from cryptofeed.exchange.huobi import Huobi
-from cryptofeed.exchange.huobi_us import HuobiUS
-from cryptofeed.exchange.huobi_dm import HuobiDM
-from cryptofeed.exchange.okcoin import OKCoin
-from cryptofeed.exchange.okex import OKEx
-from cryptofeed.exchange.okex_swap import OKExSwap
-from cryptofeed.exchange.coinbene import Coinbene
-from cryptofeed.exchange.deribit import Deribit
-from cryptofeed.exchange.bybit import Bybit
-from cryptofeed.exchange.ftx import FTX
-from cryptofeed.exchange.bittrex import Bittrex
-from cryptofeed.exchange.bitcoincom import BitcoinCom
-from cryptofeed.exchange.bitmax import Bitmax
+import importlib
+
+
+_EXCHANGE_MODULES = {
+    'Binance': 'cryptofeed.exchange.binance',
+    'BinanceMargin': 'cryptofeed.exchange.binance_margin',
+    'BinanceUS': 'cryptofeed.exchange.binance_us',
+    'BinanceJersey': 'cryptofeed.exchange.binance_jersey',
+    'BinanceFutures': 'cryptofeed.exchange.binance_futures',
+    'Bitfinex': 'cryptofeed.exchange.bitfinex',
+    'Bitstamp': 'cryptofeed.exchange.bitstamp',
+    'Coinbase': 'cryptofeed.exchange.coinbase',
+    'Gemini': 'cryptofeed.exchange.gemini',
+    'HitBTC': 'cryptofeed.exchange.hitbtc',
+    'Poloniex': 'cryptofeed.exchange.poloniex',
+    'Bitmex': 'cryptofeed.exchange.bitmex',
+    'Kraken': 'cryptofeed.exchange.kraken',
+    'KrakenFutures': 'cryptofeed.exchange.kraken_futures',
+    'EXX': 'cryptofeed.exchange.exx',
+    'Huobi': 'cryptofeed.exchange.huobi',
+    'HuobiUS': 'cryptofeed.exchange.huobi_us',
+    'HuobiDM': 'cryptofeed.exchange.huobi_dm',
+    'OKCoin': 'cryptofeed.exchange.okcoin',
+    'OKEx': 'cryptofeed.exchange.okex',
+    'OKExSwap': 'cryptofeed.exchange.okex_swap',
+    'Coinbene': 'cryptofeed.exchange.coinbene',
+    'Deribit': 'cryptofeed.exchange.deribit',
+    'Bybit': 'cryptofeed.exchange.bybit',
+    'FTX': 'cryptofeed.exchange.ftx',
+    'Bittrex': 'cryptofeed.exchange.bittrex',
+    'BitcoinCom': 'cryptofeed.exchange.bitcoincom',
+    'Bitmax': 'cryptofeed.exchange.bitmax'
+}
+
+__all__ = list(_EXCHANGE_MODULES)
+
+
+def __getattr__(name):
+    if name not in _EXCHANGE_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    cls = getattr(importlib.import_module(_EXCHANGE_MODULES[name]), name)
+    # cache on the module so subsequent lookups bypass __getattr__
+    globals()[name] = cls
+    return cls
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
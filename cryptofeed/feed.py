@@ -4,20 +4,54 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import logging
+import time
 import uuid
 from collections import defaultdict
 
 from cryptofeed.callback import Callback
+from cryptofeed.exceptions import MissingSequenceNumber, BadChecksum
 from cryptofeed.standards import pair_std_to_exchange, feed_to_exchange, load_exchange_pair_mapping
 from cryptofeed.defines import (TRADES, TICKER, L2_BOOK, L2_BOOK_SWAP, L3_BOOK, ORDER, ORDER_SWAP,
-                                VOLUME, FUNDING, POSITION, BOOK_DELTA, INSTRUMENT, BID, ASK)
-from cryptofeed.util.book import book_delta, depth
+                                VOLUME, FUNDING, POSITION, BOOK_DELTA, INSTRUMENT, BID, ASK,
+                                TRADES_BATCH, BOOK_DELTA_BATCH, BOOK_STATUS)
+from cryptofeed.util.book import book_delta, depth, BookView
+from cryptofeed.util.profiler import BOOK, CALLBACK, BACKEND
+
+
+# batch callback type -> the data type it collects
+_BATCH_TYPES = {TRADES_BATCH: TRADES, BOOK_DELTA_BATCH: BOOK_DELTA}
+
+
+LOG = logging.getLogger('feedhandler')
 
 
 class Feed:
     id = 'NotImplemented'
+    # frames are compressed / encoded and must be passed through `decode`
+    compressed = False
 
-    def __init__(self, address, pairs=None, channels=None, config=None, callbacks=None, max_depth=None, book_interval=1000, use_private_channels=False):
+    def __init__(self, address, pairs=None, channels=None, config=None, callbacks=None, max_depth=None, book_interval=1000, use_private_channels=False, book_view=False, checksum_sample=1, retain_books=False):
+        """
+        book_view: bool
+            deliver full book updates as read-only views of the live book (see
+            cryptofeed.util.book.BookView) rather than the book itself. Views are
+            only valid until the callback returns
+        checksum_sample: int
+            verify the book checksum, on exchanges that provide one, on every
+            Nth update of a pair. 0 disables checksum verification
+        retain_books: bool
+            on reconnect, keep the books of the previous connection, listed in
+            stale_books, until the exchange sends new snapshots, rather than discarding them.
+            BOOK_STATUS callbacks are invoked when a book becomes stale and when a
+            snapshot replaces it. Exchanges that reset their books or fetch the snapshots
+            while subscribing (e.g. Binance, Bitmax, Bitstamp, Coinbase, Deribit) replace
+            the books before any message is handled, so no book is retained for them
+        """
+        # constructor arguments, so the feed can be recreated with a subset of its pairs (see `shard`)
+        self.init_kwargs = dict(pairs=pairs, channels=channels, config=config, callbacks=callbacks, max_depth=max_depth,
+                                book_interval=book_interval, use_private_channels=use_private_channels, book_view=book_view,
+                                checksum_sample=checksum_sample, retain_books=retain_books)
         self.hash = str(uuid.uuid4())
         self.uuid = self.id + self.hash
         self.use_private_channels = use_private_channels
@@ -32,6 +66,34 @@ class Feed:
         self.channels = []
         self.max_depth = max_depth
         self.previous_book = defaultdict(dict)
+        self.book_view = book_view
+        # channel id / table name -> message handler, built by the exchange when subscribing
+        self.handlers = {}
+        # data type -> updates collected from the message currently being handled
+        self.batches = {}
+        self.checksum_sample = checksum_sample
+        # pair (or None for connection wide sequence numbers) -> last sequence number
+        self.sequence = {}
+        # integrity counters, per pair
+        self.gaps = defaultdict(int)
+        self.checksum_checks = defaultdict(int)
+        self.checksum_errors = defaultdict(int)
+        self.checksum_updates = defaultdict(int)
+        self.retain_books = retain_books
+        # pair -> book kept from the previous connection, until a new snapshot replaces it
+        self.stale_books = {}
+        # (data type, pair) -> time of the last update, for the data types being watched
+        self.activity = None
+        self.activity_types = ()
+        self.on_activity = None
+        # frames passed through `decode`, and the time (seconds) spent decoding them
+        self.decoded = 0
+        self.decode_time = 0.0
+        # frames parsed in worker processes, and the time (seconds) spent decoding and parsing them
+        self.parsed = 0
+        self.parse_time = 0.0
+        # cryptofeed.util.profiler.Profiler, set by the feedhandler when profiling
+        self.profiler = None
         load_exchange_pair_mapping(self.id)
 
         if config is not None and (pairs is not None or channels is not None):
@@ -56,7 +118,8 @@ class Feed:
                           VOLUME: Callback(None),
                           FUNDING: Callback(None),
                           POSITION: Callback(None),
-                          INSTRUMENT: Callback(None)}
+                          INSTRUMENT: Callback(None),
+                          BOOK_STATUS: Callback(None)}
 
         if callbacks:
             for cb_type, cb_func in callbacks.items():
@@ -64,11 +127,54 @@ class Feed:
                 self.callbacks[cb_type] = cb_func
                 if cb_type == BOOK_DELTA:
                     self.do_deltas = True
+                elif cb_type in _BATCH_TYPES:
+                    self.batches[_BATCH_TYPES[cb_type]] = []
+                    if cb_type == BOOK_DELTA_BATCH:
+                        self.do_deltas = True
+
+            if BOOK_DELTA_BATCH in self.callbacks and BOOK_DELTA not in self.callbacks:
+                self.callbacks[BOOK_DELTA] = Callback(None)
 
         for key, callback in self.callbacks.items():
             if not isinstance(callback, list):
                 self.callbacks[key] = [callback]
 
+    def copy_kwargs(self) -> dict:
+        """
+        Keyword arguments recreating the feed with type(self)(**kwargs). Exchanges whose
+        constructor takes arguments of its own (e.g. the book depth) add them
+        """
+        return dict(self.init_kwargs)
+
+    def shard(self, count: int) -> list:
+        """
+        Split the feed into (up to) `count` feeds of the same type, each subscribed to a
+        subset of the pairs, so the subscriptions are spread over several connections.
+        Pairs are assigned round robin, all channels of a pair (and so its book) belong to
+        the same shard, and the shards share the callbacks, so consumers see a single feed
+        """
+        kwargs = self.copy_kwargs()
+        config = kwargs.get('config')
+        if config:
+            pairs = list(dict.fromkeys(pair for chan_pairs in config.values() for pair in chan_pairs))
+        else:
+            pairs = list(kwargs.get('pairs') or [])
+        count = min(count, len(pairs))
+        if count <= 1:
+            return [self]
+
+        ret = []
+        for i in range(count):
+            subset = pairs[i::count]
+            if config:
+                subset = set(subset)
+                shard_config = {chan: [pair for pair in chan_pairs if pair in subset] for chan, chan_pairs in config.items()}
+                kwargs['config'] = {chan: chan_pairs for chan, chan_pairs in shard_config.items() if chan_pairs}
+            else:
+                kwargs['pairs'] = subset
+            ret.append(type(self)(**kwargs))
+        return ret
+
     @staticmethod
     def generalize_callback_key(callback_type):
         """
@@ -102,6 +208,22 @@ class Feed:
 
         For 1, need to handle separate cases where a full book is returned vs a delta
         """
+        if self.profiler is not None and self.profiler.sampling():
+            with self.profiler.stage(self.id, book_type, BOOK):
+                return await self._book_callback(book, book_type, pair, forced, delta, timestamp)
+        return await self._book_callback(book, book_type, pair, forced, delta, timestamp)
+
+    async def _book_callback(self, book, book_type, pair, forced, delta, timestamp):
+        if self.activity is not None and book_type in self.activity_types:
+            self._record_activity(book_type, pair)
+
+        if self.stale_books and pair in self.stale_books:
+            if self.stale_books[pair] is book:
+                # updates applied to the book of the previous connection, wait for the snapshot
+                return
+            del self.stale_books[pair]
+            await self.callback(BOOK_STATUS, feed=self.id, pair=pair, stale=False, timestamp=timestamp)
+
         if self.do_deltas:
             if not forced and self.updates[pair] < self.book_update_interval:
                 if self.max_depth:
@@ -119,16 +241,100 @@ class Feed:
             changed, book = await self.apply_depth(book, False, pair)
             if not changed:
                 return
-        if book_type == L2_BOOK:
-            await self.callback(L2_BOOK, feed=self.id, pair=pair, book=book, timestamp=timestamp)
-        else:
-            await self.callback(L3_BOOK, feed=self.id, pair=pair, book=book, timestamp=timestamp)
+        if self.book_view:
+            book = BookView(book)
+        try:
+            if book_type == L2_BOOK:
+                await self.callback(L2_BOOK, feed=self.id, pair=pair, book=book, timestamp=timestamp)
+            else:
+                await self.callback(L3_BOOK, feed=self.id, pair=pair, book=book, timestamp=timestamp)
+        finally:
+            if self.book_view:
+                # the exchange changes the book in place on its next message, before this
+                # function is called again, so views are invalidated once the callbacks
+                # return, or raise
+                book.invalidate()
         self.updates[pair] = 0
 
     async def callback(self, data_type, **kwargs):
+        if self.activity is not None and data_type in self.activity_types:
+            self._record_activity(data_type, kwargs.get('pair'))
+        if data_type in self.batches:
+            self.batches[data_type].append(kwargs)
+        if self.profiler is not None and self.profiler.sampling():
+            for cb in self.callbacks[data_type]:
+                with self.profiler.stage(self.id, data_type, BACKEND if type(cb).__module__.startswith('cryptofeed.backends') else CALLBACK):
+                    await cb(**kwargs)
+            return
         for cb in self.callbacks[data_type]:
             await cb(**kwargs)
 
+    async def flush_batches(self):
+        """
+        Deliver the updates collected while handling a single exchange
+        message to the batch callbacks (TRADES_BATCH, BOOK_DELTA_BATCH).
+        Called by the feedhandler once the message has been processed
+        """
+        for batch_type, data_type in _BATCH_TYPES.items():
+            updates = self.batches.get(data_type)
+            if updates:
+                self.batches[data_type] = []
+                for cb in self.callbacks[batch_type]:
+                    await cb(feed=self.id, updates=updates)
+
+    def clear_batches(self):
+        """
+        Discard the updates collected from a message whose handling failed
+        """
+        for data_type in self.batches:
+            self.batches[data_type] = []
+
+    async def check_sequence(self, pair, seq_no: int) -> bool:
+        """
+        Verify that seq_no follows the last sequence number seen for the pair. Returns
+        False if the update should be discarded: it was already seen, or a gap was
+        detected, in which case the gap is counted and the pair resynced
+        """
+        last = self.sequence.get(pair)
+        if last is not None:
+            if seq_no <= last:
+                return False
+            if seq_no != last + 1:
+                self.gaps[pair] += 1
+                LOG.warning("%s: missing sequence number for %s. Received %d, expected %d", self.id, pair, seq_no, last + 1)
+                await self.resync(pair, MissingSequenceNumber(pair))
+                return False
+        self.sequence[pair] = seq_no
+        return True
+
+    async def check_checksum(self, pair, checksum, calculate) -> bool:
+        """
+        Verify a checksum sent by the exchange against calculate(), the checksum of
+        the local book. Only one in checksum_sample updates is verified, to bound
+        the cost. On a mismatch the error is counted and the pair resynced, and
+        False is returned
+        """
+        if not self.checksum_sample:
+            return True
+        self.checksum_updates[pair] += 1
+        if self.checksum_updates[pair] % self.checksum_sample:
+            return True
+        self.checksum_checks[pair] += 1
+        if calculate() == checksum:
+            return True
+        self.checksum_errors[pair] += 1
+        LOG.warning("%s: checksum mismatch for %s", self.id, pair)
+        await self.resync(pair, BadChecksum(pair))
+        return False
+
+    async def resync(self, pair, error: Exception):
+        """
+        Rebuild the book of a pair after a sequence gap or checksum mismatch. By default
+        the error is raised, and the feedhandler reconnects and resubscribes to
+        everything. Exchanges that can resync a single pair override this
+        """
+        raise error
+
     async def apply_depth(self, book: dict, do_delta: bool, pair: str):
         ret = depth(book, self.max_depth)
         if not do_delta:
@@ -141,9 +347,91 @@ class Feed:
         self.previous_book[pair] = ret
         return delta, ret
 
-    async def message_handler(self, msg: str, timestamp: float):
+    def watch_activity(self, activity: dict, data_types: set, on_activity):
+        """
+        Record the time of the last update of each (data type, pair) of the given data
+        types in activity. on_activity is called with the (data type, pair) key on its
+        first update
+        """
+        self.activity = activity
+        self.activity_types = data_types
+        self.on_activity = on_activity
+
+    def _record_activity(self, data_type, pair):
+        key = (data_type, pair)
+        if key not in self.activity:
+            self.on_activity(key)
+        self.activity[key] = time.time()
+
+    def retained_books(self):
+        """
+        The current books, to be restored with `restore_books` once the feed has
+        resubscribed, if retain_books is set
+        """
+        if not self.retain_books:
+            return None
+        return dict(self.l2_book), dict(self.l3_book)
+
+    async def restore_books(self, books):
+        """
+        Put back the books of the previous connection that have not been replaced
+        yet, flagged as stale
+        """
+        l2_book, l3_book = books
+        for current, previous in ((self.l2_book, l2_book), (self.l3_book, l3_book)):
+            for pair, book in previous.items():
+                if pair not in current:
+                    current[pair] = book
+                    self.stale_books[pair] = book
+                    await self.callback(BOOK_STATUS, feed=self.id, pair=pair, stale=True, timestamp=time.time())
+
+    def message_key(self, msg):
+        """
+        (stream, position, key) identifying a (decoded) message, the same for its
+        copies received on redundant connections. Connection specific values (channel
+        ids, per connection sequence numbers) must not be part of it.
+
+        position orders the messages of a stream (e.g. the sequence number of a pair's
+        channel), messages at or before the last position handled are dropped, key
+        distinguishes messages at the same position. Messages without an order are
+        returned as (None, None, key) and are only recognized among the recent
+        messages, so streams that can lag should have a position.
+
+        Only feeds implementing this support redundant connections (see `FeedHandler.add_feed`)
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def decode(msg):
+        """
+        Decompress / decode a frame of a compressed feed, before it is passed to
+        message_handler. Must only depend on the frame, as the feedhandler may
+        run it in a worker thread (see decode_threads on FeedHandler)
+        """
+        return msg
+
+    @classmethod
+    def parse(cls, msg):
+        """
+        Parse a (decoded) frame. Exchanges implementing `parse` and `apply` split
+        their message handling into a pure step, which only depends on the frame and
+        may run in a worker process (see parse_processes on FeedHandler), and a
+        stateful step that maintains the books and invokes the callbacks. `parse`
+        does the decoding and normalization (prices, sizes, sides, timestamps) and
+        returns compact tuples, exchange symbols are mapped to standard pairs in
+        `apply` as the pair mapping is only loaded in the parent process
+        """
+        raise NotImplementedError
+
+    async def apply(self, msg, timestamp: float):
+        """
+        Handle a message returned by `parse`
+        """
         raise NotImplementedError
 
+    async def message_handler(self, msg: str, timestamp: float):
+        await self.apply(self.parse(msg), timestamp)
+
 
 class RestFeed(Feed):
     async def message_handler(self):
@@ -5,86 +5,317 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 import asyncio
-from time import time as time
+from time import time as time, perf_counter
 from socket import error as socket_error
-import zlib
-from collections import defaultdict
-from copy import deepcopy
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 
 import websockets
 from websockets import ConnectionClosed
 
-from cryptofeed.defines import L2_BOOK
+from cryptofeed.defines import L2_BOOK, BOOK_DELTA
 from cryptofeed.log import get_logger
 from cryptofeed.defines import (DERIBIT, BINANCE, GEMINI, HITBTC, BITFINEX, BITMEX, BITSTAMP, POLONIEX,
                                 COINBASE, KRAKEN, KRAKEN_FUTURES, HUOBI, HUOBI_US, HUOBI_DM,
                                 OKCOIN, OKEX, OKEX_SWAP, COINBENE, BYBIT, BITTREX, BITCOINCOM,
-                                BINANCE_US, BITMAX, BINANCE_JERSEY, BINANCE_FUTURES)
-from cryptofeed.defines import EXX as EXX_str
-from cryptofeed.defines import FTX as FTX_str
-from cryptofeed.exchanges import *
+                                BINANCE_US, BITMAX, BINANCE_JERSEY, BINANCE_FUTURES, BINANCE_MARGIN, EXX, FTX)
+from cryptofeed import exchanges
 from cryptofeed.nbbo import NBBO
-from cryptofeed.feed import RestFeed
+from cryptofeed.consolidated import ConsolidatedBook
+from cryptofeed.feed import Feed, RestFeed
 from cryptofeed.exceptions import ExhaustedRetries
+from cryptofeed.util.backoff import Backoff
+from cryptofeed.util.profiler import DECODE, WORKER
+from cryptofeed.util.watchdog import Watchdog
 import logging
 
 
 LOG = get_logger('feedhandler', 'feedhandler.log', logging.INFO)
 
 
-# Maps string name to class name for use with config
+# Maps string name to class name for use with config. Classes are resolved
+# lazily (see `_exchange_class`) so only the exchanges in use are imported
 _EXCHANGES = {
-    BINANCE: Binance,
-    BINANCE_US: BinanceUS,
-    BINANCE_JERSEY: BinanceJersey,
-    BINANCE_FUTURES: BinanceFutures,
-    COINBASE: Coinbase,
-    GEMINI: Gemini,
-    HITBTC: HitBTC,
-    POLONIEX: Poloniex,
-    BITFINEX: Bitfinex,
-    BITMEX: Bitmex,
-    BITSTAMP: Bitstamp,
-    KRAKEN: Kraken,
-    KRAKEN_FUTURES: KrakenFutures,
-    HUOBI: Huobi,
-    HUOBI_US: HuobiUS,
-    HUOBI_DM: HuobiDM,
-    OKCOIN: OKCoin,
-    OKEX: OKEx,
-    OKEX_SWAP: OKExSwap,
-    COINBENE: Coinbene,
-    DERIBIT: Deribit,
-    EXX_str: EXX,
-    BYBIT: Bybit,
-    FTX_str: FTX,
-    BITTREX: Bittrex,
-    BITCOINCOM: BitcoinCom,
-    BITMAX: Bitmax
+    BINANCE: 'Binance',
+    BINANCE_US: 'BinanceUS',
+    BINANCE_JERSEY: 'BinanceJersey',
+    BINANCE_FUTURES: 'BinanceFutures',
+    BINANCE_MARGIN: 'BinanceMargin',
+    COINBASE: 'Coinbase',
+    GEMINI: 'Gemini',
+    HITBTC: 'HitBTC',
+    POLONIEX: 'Poloniex',
+    BITFINEX: 'Bitfinex',
+    BITMEX: 'Bitmex',
+    BITSTAMP: 'Bitstamp',
+    KRAKEN: 'Kraken',
+    KRAKEN_FUTURES: 'KrakenFutures',
+    HUOBI: 'Huobi',
+    HUOBI_US: 'HuobiUS',
+    HUOBI_DM: 'HuobiDM',
+    OKCOIN: 'OKCoin',
+    OKEX: 'OKEx',
+    OKEX_SWAP: 'OKExSwap',
+    COINBENE: 'Coinbene',
+    DERIBIT: 'Deribit',
+    EXX: 'EXX',
+    BYBIT: 'Bybit',
+    FTX: 'FTX',
+    BITTREX: 'Bittrex',
+    BITCOINCOM: 'BitcoinCom',
+    BITMAX: 'Bitmax'
 }
 
 
+def _exchange_class(name: str):
+    return getattr(exchanges, _EXCHANGES[name])
+
+
+def _loop_policy(policy):
+    if policy == 'uvloop':
+        import uvloop
+        return uvloop.EventLoopPolicy()
+    if policy == 'asyncio':
+        return asyncio.DefaultEventLoopPolicy()
+    if isinstance(policy, asyncio.AbstractEventLoopPolicy):
+        return policy
+    raise ValueError(f"Invalid event loop policy {policy}")
+
+
+class _RecordingWebsocket:
+    """
+    Passes messages through to the websocket, keeping a copy so the subscription
+    can be replayed on standby connections
+    """
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+        await self.websocket.send(message)
+
+    def __getattr__(self, name):
+        return getattr(self.websocket, name)
+
+
+class _Redundant:
+    """
+    State shared by the redundant connections of a feed
+    """
+    # number of recent message keys kept for duplicate detection, for messages without a position
+    window = 10000
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.lock = asyncio.Lock()
+        self.subscription = None
+        self.alive = 0
+        self.seen = set()
+        self.order = deque()
+        # stream -> (highest position handled, keys of the messages handled at that position)
+        self.positions = {}
+        # messages first received on each connection
+        self.wins = [0] * len(addresses)
+        self.duplicates = 0
+
+    def duplicate(self, key) -> bool:
+        """
+        Return True if the message has already been handled from another connection
+        (key as returned by `Feed.message_key`). Positioned messages at or before the
+        last position handled in their stream are duplicates, however far behind the
+        connection delivering them is
+        """
+        stream, position, key = key
+        if stream is None:
+            duplicate = key in self.seen
+        else:
+            last = self.positions.get(stream)
+            duplicate = last is not None and (position < last[0] or (position == last[0] and key in last[1]))
+        if duplicate:
+            self.duplicates += 1
+        return duplicate
+
+    def handled(self, key):
+        stream, position, key = key
+        if stream is None:
+            self.seen.add(key)
+            self.order.append(key)
+            if len(self.order) > self.window:
+                self.seen.discard(self.order.popleft())
+            return
+        last = self.positions.get(stream)
+        if last is None or position > last[0]:
+            self.positions[stream] = (position, {key})
+        else:
+            last[1].add(key)
+
+    def reset(self):
+        """
+        Forget the handled messages, when the feed subscribes afresh
+        """
+        self.seen.clear()
+        self.order.clear()
+        self.positions.clear()
+
+
+def _decode(feed, message):
+    start = perf_counter()
+    message = feed.decode(message)
+    return message, perf_counter() - start
+
+
+def _parse(feed_class, message):
+    # runs in the parser processes, only the class of the feed is sent to them
+    start = perf_counter()
+    if feed_class.compressed:
+        message = feed_class.decode(message)
+    message = feed_class.parse(message)
+    return message, perf_counter() - start
+
+
+async def _handle(feed, handler, message, timestamp):
+    """
+    Handle a message, then deliver the batches collected from it. The batches of a
+    message whose handler raises are discarded, so they are not mixed with the next
+    """
+    try:
+        await handler(message, timestamp)
+    except BaseException:
+        feed.clear_batches()
+        raise
+    if feed.batches:
+        await feed.flush_batches()
+
+
+def _record_decode(feed, elapsed):
+    feed.decoded += 1
+    feed.decode_time += elapsed
+    if feed.profiler is not None and feed.profiler.sample_next():
+        # decompression is CPU bound, wall time is also the CPU time of the worker
+        feed.profiler.add((feed.id, None, DECODE), elapsed, elapsed)
+
+
+def _record_parse(feed, elapsed):
+    feed.parsed += 1
+    feed.parse_time += elapsed
+    if feed.profiler is not None and feed.profiler.sample_next():
+        feed.profiler.add((feed.id, None, WORKER), elapsed, elapsed)
+
+
+class _Pipeline:
+    """
+    The frames of a connection passed through `stage` (a function returning the result
+    and the time it took, which is passed to `record`), with their receipt times.
+    With an executor, frames are processed by its workers while the preceding frames
+    are being handled, at most `depth` ahead, and are still delivered in the order
+    they were received
+    """
+    def __init__(self, websocket, stage, received, record, executor=None, depth=1):
+        self.websocket = websocket
+        self.stage = stage
+        self.received = received
+        self.record = record
+        self.executor = executor
+        self.frames = None
+        self.pending = asyncio.Queue(maxsize=depth) if executor else None
+        self.reader = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.executor is None:
+            if self.frames is None:
+                self.frames = self.websocket.__aiter__()
+            message = await self.frames.__anext__()
+            timestamp = await self.received(message)
+            message, elapsed = self.stage(message)
+        else:
+            if self.reader is None:
+                self.reader = asyncio.ensure_future(self._read())
+            result, timestamp = await self.pending.get()
+            if isinstance(result, BaseException):
+                raise result
+            message, elapsed = await result
+        self.record(elapsed)
+        return message, timestamp
+
+    async def _read(self):
+        loop = asyncio.get_event_loop()
+        try:
+            async for message in self.websocket:
+                timestamp = await self.received(message)
+                await self.pending.put((loop.run_in_executor(self.executor, self.stage, message), timestamp))
+        except Exception as e:
+            await self.pending.put((e, None))
+        else:
+            await self.pending.put((StopAsyncIteration(), None))
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+
+
 class FeedHandler:
-    def __init__(self, retries=10, timeout_interval=10, log_messages_on_error=False, raw_message_capture=None):
+    def __init__(self, retries=10, timeout_interval=10, log_messages_on_error=False, raw_message_capture=None, max_retry_delay=30, decode_threads=0, parse_processes=0, loop_policy=None, profiler=None):
         """
         retries: int
             number of times the connection will be retried (in the event of a disconnect or other failure)
+        max_retry_delay: int
+            maximum number of seconds between retries. Retries back off exponentially,
+            with random jitter, up to this delay (see `cryptofeed.util.backoff.Backoff`)
         timeout_interval: int
-            number of seconds between checks to see if a feed has timed out
+            number of seconds between checks of the validity of Binance listen keys.
+            Timed out feeds are detected by a watchdog as soon as their timeout expires
         log_messages_on_error: boolean
             if true, log the message from the exchange on exceptions
         raw_message_capture: callback
             if defined, callback to save/process/handle raw message (primarily for debugging purposes)
+        decode_threads: int
+            number of worker threads decompressing the frames of compressed feeds (Huobi,
+            HuobiDM, OKCoin, OKEx, Bittrex), so large frames do not stall the event loop
+            (zlib releases the GIL). Frames are still handled in the order received.
+            0 decompresses on the event loop. Time spent is reported in the feed's
+            decoded / decode_time counters
+        parse_processes: int
+            number of worker processes parsing the messages of the feeds that split their
+            message handling into `Feed.parse` and `Feed.apply` (Binance, Bitmex, OKCoin,
+            OKEx). Workers decode and normalize the messages, which are reassembled in the
+            order received, and books and callbacks are handled on the event loop. 0 parses on the event loop. Time spent in the
+            workers is reported in the feed's parsed / parse_time counters
+        loop_policy: str or asyncio.AbstractEventLoopPolicy
+            event loop policy set by `run`: 'uvloop' (requires the uvloop package, see
+            the uvloop extra), 'asyncio' or a policy object. By default the current
+            policy is used. tools/loop_benchmark.py compares loop implementations
+        profiler: cryptofeed.util.profiler.Profiler
+            if defined, attributes the wall and CPU time of message handling to
+            (feed, channel, stage), reports event loop blocks with the stack of the
+            blocking code, and logs periodic reports. Off by default, see `Profiler`
         """
         self.feeds = []
         self.retries = retries
         self.timeout = {}
         self.last_msg = {}
         self.timeout_interval = timeout_interval
+        self.watchdog = Watchdog()
+        # feed uuid -> {data type: timeout}
+        self.channel_timeouts = {}
         self.log_messages_on_error = log_messages_on_error
         self.raw_message_capture = raw_message_capture
+        self.max_retry_delay = max_retry_delay
+        self.tasks = []
+        # feed uuid -> state of its redundant connections
+        self.redundant = {}
+        self.decode_threads = decode_threads
+        self.decoder = ThreadPoolExecutor(decode_threads, thread_name_prefix='decode') if decode_threads else None
+        self.parse_processes = parse_processes
+        self.parser = ProcessPoolExecutor(parse_processes) if parse_processes else None
+        self.loop_policy = _loop_policy(loop_policy) if loop_policy is not None else None
+        self.profiler = profiler
 
-    def add_feed(self, feed, timeout=120, **kwargs):
+    def add_feed(self, feed, timeout=120, shards=1, redundancy=1, addresses=None, channel_timeouts=None, address=None, **kwargs):
         """
         feed: str or class
             the feed (exchange) to add to the handler
@@ -92,30 +323,55 @@ class FeedHandler:
             number of seconds without a message before the feed is considered
             to be timed out. The connection will be closed, and if retries
             have not been exhausted, the connection will be restablished
+        channel_timeouts: dict
+            timeouts per data type, e.g. {L2_BOOK: 2, TRADES: 600}. The connection is
+            restarted when a pair that has received updates of the data type receives
+            none for the timeout. Not applied to redundant connections
+        shards: int
+            number of websocket connections the feed's pairs are split over
+            (see `Feed.shard`). Bitmax feeds are always split, one connection per pair
+        redundancy: int
+            number of identical connections opened for the feed. Every message is
+            handled once, from whichever connection delivers it first (see
+            `Feed.message_key`), so a slow or stalled connection does not delay the data
+        addresses: list str
+            websocket addresses for the redundant connections (e.g. alternative
+            endpoints), defaults to the feed's address for each connection.
+            Redundant connections require the feed to implement `Feed.message_key`
+        address: str
+            websocket address connected to instead of the exchange's, e.g. a local
+            exchange simulator (see `cryptofeed.util.simulator`)
         kwargs: dict
             if a string is used for the feed, kwargs will be passed to the
             newly instantiated object
         """
         if isinstance(feed, str):
             if feed in _EXCHANGES:
-                if feed == BITMAX:
-                    self._do_bitmax_subscribe(feed, timeout, **kwargs)
-                else:
-                    self.feeds.append(_EXCHANGES[feed](**kwargs))
-                    feed = self.feeds[-1]
-                    self.last_msg[feed.uuid] = None
-                    self.timeout[feed.uuid] = timeout
+                feed = _exchange_class(feed)(**kwargs)
             else:
                 raise ValueError("Invalid feed specified")
-        else:
-            if isinstance(feed, Bitmax):
-                self._do_bitmax_subscribe(feed, timeout)
-            else:
-                self.feeds.append(feed)
-                self.last_msg[feed.uuid] = None
-                self.timeout[feed.uuid] = timeout
 
-    def add_nbbo(self, feeds, pairs, callback, timeout=120):
+        if addresses:
+            redundancy = len(addresses)
+        if redundancy > 1 and feed.use_private_channels:
+            raise ValueError("Redundant connections are not supported with private channels")
+        if redundancy > 1 and type(feed).message_key is Feed.message_key:
+            raise ValueError(f"Redundant connections are not supported by {feed.id}, its messages cannot be matched across connections")
+
+        feeds = feed.shard(shards) if shards > 1 or feed.id == BITMAX else [feed]
+        for feed in feeds:
+            if address:
+                feed.address = address
+            feed.profiler = self.profiler
+            self.feeds.append(feed)
+            self.last_msg[feed.uuid] = None
+            self.timeout[feed.uuid] = timeout
+            if channel_timeouts:
+                self.channel_timeouts[feed.uuid] = channel_timeouts
+            if redundancy > 1:
+                self.redundant[feed.uuid] = _Redundant(addresses or [feed.address] * redundancy)
+
+    def add_nbbo(self, feeds, pairs, callback, timeout=120, depth=None, depth_callback=None, deltas=False):
         """
         feeds: list of feed classes
             list of feeds (exchanges) that comprises the NBBO
@@ -126,24 +382,64 @@ class FeedHandler:
         timeout: int
             seconds without a message before a connection will be considered dead and reestablished.
             See `add_feed`
+        depth: int
+            number of levels per side in the consolidated book supplied to depth_callback
+        depth_callback: function pointer
+            if defined, invoked with the consolidated top `depth` levels across feeds when they change
+        deltas: bool
+            subscribe to book deltas and update the NBBO incrementally, rather than from full books
+        """
+        cb = NBBO(callback, pairs, depth=depth, depth_callback=depth_callback, deltas=deltas)
+        callbacks = {L2_BOOK: cb}
+        if deltas:
+            callbacks[BOOK_DELTA] = cb.delta
+        for feed in feeds:
+            self.add_feed(feed(channels=[L2_BOOK], pairs=pairs, callbacks=callbacks), timeout=timeout)
+
+    def add_consolidated_book(self, feeds, pairs, callback, tick_size=None, timeout=120):
+        """
+        feeds: list of feed classes
+            list of feeds (exchanges) whose L2 books are merged
+        pairs: list str
+            the trading pairs
+        callback: function pointer
+            invoked with (pair, delta, timestamp) when the consolidated book changes
+        tick_size: Decimal or dict
+            optional price bucket size, per pair if a dict. See `ConsolidatedBook`
+        timeout: int
+            seconds without a message before a connection will be considered dead and reestablished.
+            See `add_feed`
+
+        Returns the ConsolidatedBook, which can be used to query the book and
+        the per venue size of each level
         """
-        cb = NBBO(callback, pairs)
+        cb = ConsolidatedBook(callback, pairs, tick_size=tick_size)
         for feed in feeds:
-            self.add_feed(feed(channels=[L2_BOOK], pairs=pairs, callbacks={L2_BOOK: cb}), timeout=timeout)
+            self.add_feed(feed(channels=[L2_BOOK], pairs=pairs, callbacks={L2_BOOK: cb, BOOK_DELTA: cb.delta}), timeout=timeout)
+        return cb
 
     def run(self, start_loop=True):
         if len(self.feeds) == 0:
             LOG.error('No feeds specified')
             raise ValueError("No feeds specified")
 
+        # setting a policy discards the current event loop, only do so when it changes
+        if self.loop_policy is not None and not isinstance(asyncio.get_event_loop_policy(), type(self.loop_policy)):
+            asyncio.set_event_loop_policy(self.loop_policy)
+
         try:
             loop = asyncio.get_event_loop()
+            if self.profiler:
+                self.profiler.start(loop)
 
             for feed in self.feeds:
                 if isinstance(feed, RestFeed):
-                    loop.create_task(self._rest_connect(feed))
+                    self.tasks.append(loop.create_task(self._rest_connect(feed)))
+                elif feed.uuid in self.redundant:
+                    for index in range(len(self.redundant[feed.uuid].addresses)):
+                        self.tasks.append(loop.create_task(self._redundant_connect(feed, index)))
                 else:
-                    loop.create_task(self._connect(feed))
+                    self.tasks.append(loop.create_task(self._connect(feed)))
             if start_loop:
                 loop.run_forever()
         except KeyboardInterrupt:
@@ -151,14 +447,61 @@ class FeedHandler:
         except Exception:
             LOG.error("Unhandled exception", exc_info=True)
 
-    async def _watch(self, feed_id, websocket):
-        while websocket.open:
-            if self.last_msg[feed_id]:
-                if time() - self.last_msg[feed_id] > self.timeout[feed_id]:
-                    LOG.warning("%s: received no messages within timeout, restarting connection", feed_id)
-                    await websocket.close()
-                    break
-            await asyncio.sleep(self.timeout_interval)
+    def stop(self):
+        """
+        Cancel the connection tasks, closing the connections, and shut down the
+        decode threads and parser processes. The feedhandler can not be run again
+        """
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        if self.profiler:
+            self.profiler.stop()
+        for pool in (self.decoder, self.parser):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def _backoff(self) -> Backoff:
+        return Backoff(self.retries, maximum=self.max_retry_delay)
+
+    async def _subscribe(self, feed, websocket):
+        books = feed.retained_books()
+        if feed.use_private_channels:
+            if feed.id in [BITMEX, BYBIT, OKEX, OKEX_SWAP]:
+                await feed.authenticate(websocket)
+        await feed.subscribe(websocket)
+        if books:
+            await feed.restore_books(books)
+
+    def _watch(self, feed, conn_id, websocket, channels=True):
+        """
+        Register the connection, and if configured the channels of the feed, with the
+        watchdog. The connection is closed (and reestablished) when one of them times
+        out. Returns a function that unregisters them
+        """
+        keys = [conn_id]
+
+        def stalled(key):
+            LOG.warning("%s: received no messages within timeout on %s, restarting connection", feed.id, key)
+            asyncio.ensure_future(websocket.close())
+
+        self.watchdog.add(conn_id, self.timeout[conn_id], lambda: self.last_msg[conn_id], stalled)
+
+        timeouts = self.channel_timeouts.get(feed.uuid) if channels else None
+        if timeouts:
+            activity = {}
+
+            def watch_channel(key):
+                data_type, pair = key
+                keys.append((conn_id, data_type, pair))
+                self.watchdog.add(keys[-1], timeouts[data_type], lambda: activity.get(key), stalled)
+
+            feed.watch_activity(activity, set(timeouts), watch_channel)
+
+        def unwatch():
+            for key in keys:
+                self.watchdog.remove(key)
+        return unwatch
 
     async def _watch_listen_key(self, feed, websocket):
         """
@@ -181,29 +524,31 @@ class FeedHandler:
         """
         Connect to REST feed
         """
-        retries = 0
-        delay = 1
-        while retries <= self.retries or self.retries == -1:
+        backoff = self._backoff()
+        while not backoff.exhausted:
             await feed.subscribe()
             try:
                 while True:
-                    await feed.message_handler()
+                    try:
+                        await feed.message_handler()
+                    except BaseException:
+                        feed.clear_batches()
+                        raise
+                    if feed.batches:
+                        await feed.flush_batches()
             except Exception:
                 LOG.error("%s: encountered an exception, reconnecting", feed.id, exc_info=True)
-                await asyncio.sleep(delay)
-                retries += 1
-                delay *= 2
+                await backoff.wait()
 
-        LOG.error("%s: failed to reconnect after %d retries - exiting", feed.id, retries)
+        LOG.error("%s: failed to reconnect after %d retries - exiting", feed.id, backoff.failures)
         raise ExhaustedRetries()
 
     async def _connect(self, feed):
         """
         Connect to websocket feeds
         """
-        retries = 0
-        delay = 1
-        while retries <= self.retries or self.retries == -1:
+        backoff = self._backoff()
+        while not backoff.exhausted:
             self.last_msg[feed.uuid] = None
             try:
                 # Coinbase frequently will not respond to pings within the ping interval, so
@@ -211,103 +556,150 @@ class FeedHandler:
                 # close the connection and reconnect in the event that no message from the exchange
                 # has been received (as opposed to a missing ping)
                 async with websockets.connect(feed.address, ping_interval=30, ping_timeout=None, max_size=2**23) as websocket:
-                    asyncio.ensure_future(self._watch(feed.uuid, websocket))
+                    # watchers are tied to this connection, and cancelled when it ends
+                    unwatch = self._watch(feed, feed.uuid, websocket)
+                    tasks = []
                     if feed.id in [BINANCE_FUTURES, BINANCE] and feed.use_private_channels:
-                        asyncio.ensure_future(self._watch_listen_key(feed, websocket))
-                    # connection was successful, reset retry count and delay
-                    retries = 0
-                    delay = 1
-
-                    if feed.use_private_channels:
-                        if feed.id in [BITMEX, BYBIT, OKEX, OKEX_SWAP]:
-                            await feed.authenticate(websocket)
-
-                    await feed.subscribe(websocket)
-                    await self._handler(websocket, feed.message_handler, feed.uuid)
+                        tasks.append(asyncio.ensure_future(self._watch_listen_key(feed, websocket)))
+                    try:
+                        await self._subscribe(feed, websocket)
+                        # subscription was successful, reset the backoff
+                        backoff.reset()
+                        await self._handler(websocket, feed)
+                    finally:
+                        unwatch()
+                        for task in tasks:
+                            task.cancel()
             except asyncio.CancelledError as e:
                 LOG.info("%s: at FeedHandler._connect, asyncio task is cancelled, Return.", feed.uuid)
                 return
             except (ConnectionClosed, ConnectionAbortedError, ConnectionResetError, socket_error) as e:
                 LOG.warning("%s: encountered connection issue %s - reconnecting...", feed.id, str(e), exc_info=True)
-                await asyncio.sleep(delay)
-                retries += 1
-                delay *= 2
+                await backoff.wait()
             except Exception:
                 LOG.error("%s: encountered an exception, reconnecting", feed.id, exc_info=True)
-                await asyncio.sleep(delay)
-                retries += 1
-                delay *= 2
+                await backoff.wait()
 
-        LOG.error("%s: failed to reconnect after %d retries - exiting", feed.id, retries)
+        LOG.error("%s: failed to reconnect after %d retries - exiting", feed.id, backoff.failures)
         raise ExhaustedRetries()
 
-    async def _handler(self, websocket, handler, feed_id):
+    async def _redundant_connect(self, feed, index: int):
+        """
+        Connect one of the redundant connections of a feed. The first connection to
+        come up subscribes the feed as usual; connections made while another one is
+        alive only replay the subscription messages, so the feed's state is kept
+        """
+        state = self.redundant[feed.uuid]
+        address = state.addresses[index]
+        conn_id = f"{feed.uuid}-{index}"
+        self.timeout[conn_id] = self.timeout[feed.uuid]
+        backoff = self._backoff()
+        while not backoff.exhausted:
+            self.last_msg[conn_id] = None
+            try:
+                async with websockets.connect(address, ping_interval=30, ping_timeout=None, max_size=2**23) as websocket:
+                    unwatch = self._watch(feed, conn_id, websocket, channels=False)
+                    try:
+                        async with state.lock:
+                            if state.alive == 0 or state.subscription is None:
+                                recorder = _RecordingWebsocket(websocket)
+                                await self._subscribe(feed, recorder)
+                                state.subscription = recorder.sent
+                                state.reset()
+                            else:
+                                for message in state.subscription:
+                                    await websocket.send(message)
+                            state.alive += 1
+                        backoff.reset()
+                        try:
+                            await self._redundant_handler(websocket, feed, state, index)
+                        finally:
+                            state.alive -= 1
+                    finally:
+                        unwatch()
+            except asyncio.CancelledError:
+                LOG.info("%s: at FeedHandler._redundant_connect, asyncio task is cancelled, Return.", conn_id)
+                return
+            except Exception:
+                LOG.error("%s: connection %d encountered an exception, reconnecting", feed.id, index, exc_info=True)
+                await backoff.wait()
+
+        LOG.error("%s: connection %d failed to reconnect after %d retries - exiting", feed.id, index, backoff.failures)
+        raise ExhaustedRetries()
+
+    async def _redundant_handler(self, websocket, feed, state, index: int):
+        handler = feed.message_handler
+        if self.profiler:
+            handler = self.profiler.wrap(feed, handler)
+        feed_id = feed.uuid
+        conn_id = f"{feed_id}-{index}"
+        async for message in websocket:
+            now = time()
+            self.last_msg[conn_id] = now
+            raw = message
+            if feed.compressed:
+                # compressed frames of the same message can differ, keys are taken from the decoded message
+                message, elapsed = _decode(feed, message)
+                _record_decode(feed, elapsed)
+            key = feed.message_key(message)
+            if state.duplicate(key):
+                continue
+            # messages are handled one at a time, in order of first arrival
+            async with state.lock:
+                # the other connection may have delivered it while waiting for the lock
+                if state.duplicate(key):
+                    continue
+                self.last_msg[feed_id] = now
+                if self.raw_message_capture:
+                    await self.raw_message_capture(raw, now, feed_id)
+                await _handle(feed, handler, message, now)
+                # only once handled, so a message whose handler raises is handled from another connection
+                state.handled(key)
+            state.wins[index] += 1
+
+    async def _received(self, feed_id, message):
+        now = self.last_msg[feed_id] = time()
+        if self.raw_message_capture:
+            await self.raw_message_capture(message, now, feed_id)
+        return now
+
+    async def _handler(self, websocket, feed):
+        handler = feed.message_handler
+        feed_id = feed.uuid
+        message = None
+        received = partial(self._received, feed_id)
+        pipeline = None
+        if self.parser and type(feed).apply is not Feed.apply:
+            pipeline = _Pipeline(websocket, partial(_parse, type(feed)), received, partial(_record_parse, feed), self.parser, 2 * self.parse_processes)
+            handler = feed.apply
+        elif feed.compressed:
+            pipeline = _Pipeline(websocket, partial(_decode, feed), received, partial(_record_decode, feed), self.decoder, 2 * self.decode_threads)
+        if self.profiler:
+            handler = self.profiler.wrap(feed, handler)
         try:
-            if self.raw_message_capture:
+            if pipeline:
+                try:
+                    async for message, timestamp in pipeline:
+                        await _handle(feed, handler, message, timestamp)
+                finally:
+                    pipeline.close()
+            elif self.raw_message_capture:
                 async for message in websocket:
                     self.last_msg[feed_id] = time()
                     await self.raw_message_capture(message, self.last_msg[feed_id], feed_id)
-                    await handler(message, self.last_msg[feed_id])
+                    await _handle(feed, handler, message, self.last_msg[feed_id])
             else:
                 async for message in websocket:
                     self.last_msg[feed_id] = time()
-                    await handler(message, self.last_msg[feed_id])
+                    await _handle(feed, handler, message, self.last_msg[feed_id])
         except asyncio.CancelledError as e:
             LOG.info("%s: at FeedHandler._handler, asyncio task is cancelled, Close websocket. %s", feed_id, str(e))
             await websocket.close()
             raise e
         except Exception:
             if self.log_messages_on_error:
-                if feed_id in {HUOBI, HUOBI_US, HUOBI_DM}:
-                    message = zlib.decompress(message, 16+zlib.MAX_WBITS)
-                elif feed_id in {OKCOIN, OKEX}:
-                    message = zlib.decompress(message, -15)
+                # messages passed through a decode / parse stage are logged as handed to the handler
                 LOG.error("%s: error handling message %s", feed_id, message)
             # exception will be logged with traceback when connection handler
             # retries the connection
             raise
-
-    def _do_bitmax_subscribe(self, feed, timeout: int, **kwargs):
-        """
-        Bitmax is a special case, a separate websocket is needed for each symbol,
-        and each connection receives all data for that symbol. We allow the user
-        to configure Bitmax like they would any other exchange and parse out the
-        relevant information to create a separate feed object per symbol.
-        """
-        config = {}
-        pairs = []
-
-        # Need to handle the two configuration cases - Feed object and Feed Name with config dict
-        if 'config' in kwargs:
-            config = kwargs.pop('config')
-        elif hasattr(feed, 'config'):
-            config = feed.config
-
-        if isinstance(feed, str):
-            callbacks = kwargs.pop('callbacks')
-        else:
-            callbacks = feed.callbacks
-
-        if config:
-            new_config = defaultdict(list)
-            for cb, symbols in config.items():
-                for symbol in symbols:
-                    new_config[symbol].append(cb)
-
-            for symbol, cbs in new_config.items():
-                cb = {cb: deepcopy(callbacks[cb]) for cb in cbs}
-                feed = Bitmax(pairs=[symbol], callbacks=cb, **kwargs)
-                self.feeds.append(feed)
-                self.last_msg[feed.uuid] = None
-                self.timeout[feed.uuid] = timeout
-        else:
-            if 'pairs' in kwargs:
-                pairs = kwargs.pop('pairs')
-            elif hasattr(feed, 'pairs'):
-                pairs = feed.pairs
-
-            for pair in pairs:
-                feed = Bitmax(pairs=[pair], callbacks=callbacks, **kwargs)
-                self.feeds.append(feed)
-                self.last_msg[feed.uuid] = None
-                self.timeout[feed.uuid] = timeout
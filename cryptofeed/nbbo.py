@@ -4,48 +4,228 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
-import asyncio
-from decimal import Decimal
+from collections import defaultdict
+from itertools import islice
+
+from sortedcontainers import SortedDict as sd
 
 from cryptofeed.callback import Callback
 from cryptofeed.defines import BID, ASK
 
 
+class IndexedHeap:
+    """
+    Binary min-heap of (priority, key) entries with a key -> position index, so
+    the priority of a key can be updated, or the key removed, in O(log n)
+    """
+    def __init__(self):
+        self.heap = []
+        self.index = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def top(self):
+        """
+        Return the (priority, key) entry with the lowest priority, or None if empty
+        """
+        return self.heap[0] if self.heap else None
+
+    def update(self, key, priority):
+        entry = (priority, key)
+        if key in self.index:
+            pos = self.index[key]
+            old = self.heap[pos]
+            self.heap[pos] = entry
+            if entry < old:
+                self._sift_up(pos)
+            else:
+                self._sift_down(pos)
+        else:
+            self.heap.append(entry)
+            self.index[key] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+
+    def remove(self, key):
+        if key not in self.index:
+            return
+        pos = self.index.pop(key)
+        last = self.heap.pop()
+        if pos < len(self.heap):
+            self.heap[pos] = last
+            self.index[last[1]] = pos
+            self._sift_up(pos)
+            self._sift_down(self.index[last[1]])
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.index[heap[i][1]] = i
+        self.index[heap[j][1]] = j
+
+    def _sift_up(self, pos):
+        heap = self.heap
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if heap[pos] < heap[parent]:
+                self._swap(pos, parent)
+                pos = parent
+            else:
+                break
+
+    def _sift_down(self, pos):
+        heap = self.heap
+        size = len(heap)
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[child] < heap[pos]:
+                self._swap(pos, child)
+                pos = child
+            else:
+                break
+
+
+def _top_levels(book, side, depth):
+    levels = book[side]
+    prices = reversed(levels) if side == BID else iter(levels)
+    return [(price, levels[price]) for price in islice(prices, depth)]
+
+
 class NBBO(Callback):
-    def __init__(self, callback, pairs):
-        self.bids = {pair: {} for pair in pairs}
-        self.asks = {pair: {} for pair in pairs}
+    """
+    Synthetic NBBO across feeds. The best bid and ask per feed are kept in an
+    indexed heap per pair, so an update from one feed is applied in
+    O(log feeds), and the callback is only invoked when the consolidated best
+    bid / ask changes:
+
+        callback(pair, bid, bid_size, ask, ask_size, bid_feed, ask_feed)
+
+    Inputs are full L2 books (the instance itself is the L2_BOOK callback), book
+    deltas (`delta`, registered for BOOK_DELTA, requires deltas=True) and top of
+    book updates (`top_of_book`, or `ticker` for TICKER callbacks).
+
+    If depth is set, depth_callback is invoked with the consolidated top `depth`
+    levels per side, sizes summed across feeds, whenever they change:
+
+        depth_callback(pair, {BID: [(price, size), ...], ASK: [(price, size), ...]})
+    """
+    def __init__(self, callback, pairs, depth=None, depth_callback=None, deltas=False, **kwargs):
+        # bids are stored with negated prices so the heap top is the highest bid
+        self.bids = {pair: IndexedHeap() for pair in pairs}
+        self.asks = {pair: IndexedHeap() for pair in pairs}
+        # pair -> feed -> (price, size) at the top of that feed's book
+        self.top = {pair: {BID: {}, ASK: {}} for pair in pairs}
+        self.depth = depth
+        self.depth_callback = Callback(depth_callback, **kwargs) if depth_callback else None
+        # pair -> feed -> {BID: [(price, size), ...], ASK: [...]}, best first
+        self.levels = {pair: {} for pair in pairs}
+        self.last_depth = {}
+        self.deltas = deltas
+        # pair -> feed -> local copy of the book, maintained from deltas
+        self.books = defaultdict(dict)
+        self.last_update = {}
 
-        self.last_update = None
+        super(NBBO, self).__init__(callback, **kwargs)
 
-        super(NBBO, self).__init__(callback)
+    def _set(self, feed, pair, side, price, size):
+        heap = self.bids[pair] if side == BID else self.asks[pair]
+        if price is None:
+            heap.remove(feed)
+            self.top[pair][side].pop(feed, None)
+        else:
+            heap.update(feed, -price if side == BID else price)
+            self.top[pair][side][feed] = (price, size)
+
+    def _quote(self, pair):
+        bid = self.bids[pair].top()
+        ask = self.asks[pair].top()
+        if bid is None or ask is None:
+            return None
+        bid_feed = bid[1]
+        ask_feed = ask[1]
+        bid_price, bid_size = self.top[pair][BID][bid_feed]
+        ask_price, ask_size = self.top[pair][ASK][ask_feed]
+        return bid_price, bid_size, ask_price, ask_size, bid_feed, ask_feed
+
+    def _update_from_book(self, feed, pair, book):
+        for side in (BID, ASK):
+            if self.depth:
+                levels = _top_levels(book, side, self.depth)
+                self.levels[pair].setdefault(feed, {})[side] = levels
+                best = levels[0] if levels else (None, None)
+            elif len(book[side]):
+                best = book[side].peekitem(-1 if side == BID else 0)
+            else:
+                best = (None, None)
+            self._set(feed, pair, side, *best)
 
-    def _update(self, feed, pair, book, timestamp):
-        bid = Decimal(list(book[BID].keys())[-1])
-        size = book[BID][bid]
-        self.bids[pair][feed] = {'price': bid, 'size': size}
-        ask = Decimal(list(book[ASK].keys())[0])
-        size = book[ASK][ask]
-        self.asks[pair][feed] = {'price': ask, 'size': size}
+    async def _publish(self, pair):
+        update = self._quote(pair)
+        # only write updates when a best bid / best ask changes
+        if update is not None and self.last_update.get(pair) != update:
+            self.last_update[pair] = update
+            await super().__call__(pair, *update)
 
-        min_ask = min(self.asks[pair], key=lambda x: self.asks[pair][x]['price'])
-        max_bid = max(self.bids[pair], key=lambda x: self.bids[pair][x]['price'])
+        if self.depth_callback:
+            book = self.consolidated(pair)
+            if self.last_depth.get(pair) != book:
+                self.last_depth[pair] = book
+                await self.depth_callback(pair, book)
 
-        return self.bids[pair][max_bid], self.asks[pair][min_ask], max_bid, min_ask
+    def consolidated(self, pair) -> dict:
+        """
+        Top `depth` levels per side across all feeds, with sizes summed per price
+        """
+        ret = {}
+        for side in (BID, ASK):
+            sizes = defaultdict(int)
+            for levels in self.levels[pair].values():
+                for price, size in levels.get(side, ()):
+                    sizes[price] += size or 0
+            prices = sorted(sizes, reverse=side == BID)[:self.depth]
+            ret[side] = [(price, sizes[price]) for price in prices]
+        return ret
 
     async def __call__(self, *, feed: str, pair: str, book: dict, timestamp):
-        update = self._update(feed, pair, book, timestamp)
+        if self.deltas:
+            self.books[pair][feed] = {BID: sd(book[BID]), ASK: sd(book[ASK])}
+        self._update_from_book(feed, pair, book)
+        await self._publish(pair)
 
-        # only write updates when a best bid / best aks changes
-        if self.last_update == update:
+    async def delta(self, *, feed: str, pair: str, delta: dict, timestamp):
+        """
+        BOOK_DELTA callback. The book is kept in sync from the full L2 book
+        updates the feed sends periodically
+        """
+        book = self.books[pair].get(feed)
+        if book is None:
             return
-        self.last_update = update
+        for side in (BID, ASK):
+            for price, size in delta[side]:
+                if size == 0:
+                    book[side].pop(price, None)
+                else:
+                    book[side][price] = size
+        self._update_from_book(feed, pair, book)
+        await self._publish(pair)
 
-        bid, ask, bid_feed, ask_feed = update
-        if bid is None:
-            return
-        if self.is_async:
-            await self.callback(pair, bid['price'], bid['size'], ask['price'], ask['size'], bid_feed, ask_feed)
-        else:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.callback, pair, bid['price'], bid['size'], ask['price'], ask['size'], bid_feed, ask_feed)
+    async def top_of_book(self, *, feed: str, pair: str, bid, bid_size, ask, ask_size, timestamp=None):
+        """
+        Update the best bid / ask of a feed directly. A price of None removes the feed's side
+        """
+        self._set(feed, pair, BID, bid, bid_size)
+        self._set(feed, pair, ASK, ask, ask_size)
+        if self.depth:
+            self.levels[pair][feed] = {BID: [(bid, bid_size)] if bid is not None else [],
+                                       ASK: [(ask, ask_size)] if ask is not None else []}
+        await self._publish(pair)
+
+    async def ticker(self, *, feed: str, pair: str, bid, ask, timestamp=None):
+        """
+        TICKER callback. Tickers do not carry sizes, so sizes are reported as None
+        """
+        await self.top_of_book(feed=feed, pair=pair, bid=bid, bid_size=None, ask=ask, ask_size=None, timestamp=timestamp)
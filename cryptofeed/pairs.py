@@ -7,8 +7,6 @@ associated with this software.
 
 Pair generation code for exchanges
 '''
-import requests
-
 from cryptofeed.defines import (BITSTAMP, BITFINEX, COINBASE, GEMINI, HITBTC, POLONIEX, KRAKEN,
                                 BINANCE, BINANCE_MARGIN, BINANCE_US, BINANCE_JERSEY, BINANCE_FUTURES,
                                 EXX, HUOBI, HUOBI_US, HUOBI_DM, OKCOIN, OKEX, OKEX_SWAP, COINBENE,
@@ -23,13 +21,19 @@ def set_pair_separator(symbol: str):
     PAIR_SEP = symbol
 
 
+def _get(*args, **kwargs):
+    # requests is only imported when pairs are generated, not on import of cryptofeed
+    import requests
+    return requests.get(*args, **kwargs)
+
+
 def gen_pairs(exchange):
     return _exchange_function_map[exchange]()
 
 
 def _binance_pairs(endpoint: str):
     ret = {}
-    pairs = requests.get(endpoint).json()
+    pairs = _get(endpoint).json()
     for symbol in pairs['symbols']:
         split = len(symbol['baseAsset'])
         normalized = symbol['symbol'][:split] + PAIR_SEP + symbol['symbol'][split:]
@@ -55,7 +59,7 @@ def binance_futures_pairs():
 
 def bitfinex_pairs():
     ret = {}
-    r = requests.get('https://api.bitfinex.com/v2/tickers?symbols=ALL').json()
+    r = _get('https://api.bitfinex.com/v2/tickers?symbols=ALL').json()
     for data in r:
         pair = data[0]
         if pair[0] == 'f':
@@ -75,7 +79,7 @@ def bybit_pairs():
 
 def ftx_pairs():
     ret = {}
-    r = requests.get('https://ftx.com/api/markets').json()
+    r = _get('https://ftx.com/api/markets').json()
     for data in r['result']:
         normalized = data['name'].replace("/", PAIR_SEP)
         pair = data['name']
@@ -84,13 +88,13 @@ def ftx_pairs():
 
 
 def coinbase_pairs():
-    r = requests.get('https://api.pro.coinbase.com/products').json()
+    r = _get('https://api.pro.coinbase.com/products').json()
     return {data['id'].replace("-", PAIR_SEP): data['id'] for data in r}
 
 
 def gemini_pairs():
     ret = {}
-    r = requests.get('https://api.gemini.com/v1/symbols').json()
+    r = _get('https://api.gemini.com/v1/symbols').json()
 
     for pair in r:
         std = f"{pair[:-3]}{PAIR_SEP}{pair[-3:]}"
@@ -103,7 +107,7 @@ def gemini_pairs():
 
 def hitbtc_pairs():
     ret = {}
-    pairs = requests.get('https://api.hitbtc.com/api/2/public/symbol').json()
+    pairs = _get('https://api.hitbtc.com/api/2/public/symbol').json()
     for symbol in pairs:
         split = len(symbol['baseCurrency'])
         normalized = symbol['id'][:split] + PAIR_SEP + symbol['id'][split:]
@@ -113,7 +117,7 @@ def hitbtc_pairs():
 
 def poloniex_id_pair_mapping():
     ret = {}
-    pairs = requests.get('https://poloniex.com/public?command=returnTicker').json()
+    pairs = _get('https://poloniex.com/public?command=returnTicker').json()
     for pair in pairs:
         ret[pairs[pair]['id']] = pair
     return ret
@@ -125,7 +129,7 @@ def poloniex_pairs():
 
 def bitstamp_pairs():
     ret = {}
-    r = requests.get('https://www.bitstamp.net/api/v2/trading-pairs-info/').json()
+    r = _get('https://www.bitstamp.net/api/v2/trading-pairs-info/').json()
     for data in r:
         normalized = data['name'].replace("/", PAIR_SEP)
         pair = data['url_symbol']
@@ -135,7 +139,7 @@ def bitstamp_pairs():
 
 def kraken_pairs():
     ret = {}
-    r = requests.get('https://api.kraken.com/0/public/AssetPairs')
+    r = _get('https://api.kraken.com/0/public/AssetPairs')
     data = r.json()
     for pair in data['result']:
         alt = data['result'][pair]['altname']
@@ -152,7 +156,7 @@ def kraken_pairs():
 
 def kraken_rest_pairs():
     ret = {}
-    r = requests.get('https://api.kraken.com/0/public/AssetPairs')
+    r = _get('https://api.kraken.com/0/public/AssetPairs')
     data = r.json()
     for pair in data['result']:
         alt = data['result'][pair]['altname']
@@ -168,7 +172,7 @@ def kraken_rest_pairs():
 
 
 def exx_pairs():
-    r = requests.get('https://api.exx.com/data/v1/tickers').json()
+    r = _get('https://api.exx.com/data/v1/tickers').json()
 
     exchange = [key.upper() for key in r.keys()]
     pairs = [key.replace("_", PAIR_SEP) for key in exchange]
@@ -176,12 +180,12 @@ def exx_pairs():
 
 
 def huobi_pairs():
-    r = requests.get('https://api.huobi.pro/v1/common/symbols').json()
+    r = _get('https://api.huobi.pro/v1/common/symbols').json()
     return {'{}{}{}'.format(e['base-currency'].upper(), PAIR_SEP, e['quote-currency'].upper()) : '{}{}'.format(e['base-currency'], e['quote-currency']) for e in r['data']}
 
 
 def huobi_us_pairs():
-    r = requests.get('https://api.huobi.com/v1/common/symbols').json()
+    r = _get('https://api.huobi.com/v1/common/symbols').json()
     return {'{}{}{}'.format(e['base-currency'].upper(), PAIR_SEP, e['quote-currency'].upper()) : '{}{}'.format(e['base-currency'], e['quote-currency']) for e in r['data']}
 
 
@@ -195,7 +199,7 @@ def huobi_dm_pairs():
         "next_week": "NW",
         "quarter": "CQ"
     }
-    r = requests.get('https://www.hbdm.com/api/v1/contract_contract_info').json()
+    r = _get('https://www.hbdm.com/api/v1/contract_contract_info').json()
     pairs = {}
     for e in r['data']:
        pairs["{}_{}".format(e['symbol'], mapping[e['contract_type']])] = e['contract_code']
@@ -203,42 +207,42 @@ def huobi_dm_pairs():
 
 
 def okcoin_pairs():
-    r = requests.get('https://www.okcoin.com/api/spot/v3/instruments').json()
+    r = _get('https://www.okcoin.com/api/spot/v3/instruments').json()
     return {e['instrument_id'] : e['instrument_id'] for e in r}
 
 
 def okex_pairs():
-    r = requests.get('https://www.okex.com/api/spot/v3/instruments').json()
+    r = _get('https://www.okex.com/api/spot/v3/instruments').json()
     data = {e['instrument_id'] : e['instrument_id'] for e in r}
     # swaps
-    r = requests.get('https://www.okex.com/api/swap/v3/instruments/ticker').json()
+    r = _get('https://www.okex.com/api/swap/v3/instruments/ticker').json()
     for update in r:
         data[update['instrument_id']] = update['instrument_id']
     # futures
-    r = requests.get('https://www.okex.com/api/futures/v3/instruments/ticker').json()
+    r = _get('https://www.okex.com/api/futures/v3/instruments/ticker').json()
     for update in r:
         data[update['instrument_id']] = update['instrument_id']
     return data
 
 
 def coinbene_pairs():
-    r = requests.get('http://api.coinbene.com/v1/market/symbol').json()
+    r = _get('http://api.coinbene.com/v1/market/symbol').json()
     return {f"{e['baseAsset']}{PAIR_SEP}{e['quoteAsset']}" : e['ticker'] for e in r['symbol']}
 
 
 def bittrex_pairs():
-    r = requests.get('https://api.bittrex.com/api/v1.1/public/getmarkets').json()
+    r = _get('https://api.bittrex.com/api/v1.1/public/getmarkets').json()
     r = r['result']
     return {f"{e['MarketCurrency']}{PAIR_SEP}{e['BaseCurrency']}": e['MarketName'] for e in r if e['IsActive']}
 
 
 def bitcoincom_pairs():
-    r = requests.get('https://api.exchange.bitcoin.com/api/2/public/symbol').json()
+    r = _get('https://api.exchange.bitcoin.com/api/2/public/symbol').json()
     return {f"{data['baseCurrency']}{PAIR_SEP}{data['quoteCurrency'].replace('USD', 'USDT')}": data['id'] for data in r}
 
 
 def bitmax_pairs():
-    r = requests.get('https://bitmax.io/api/v1/products').json()
+    r = _get('https://bitmax.io/api/v1/products').json()
     return {f"{data['baseAsset']}{PAIR_SEP}{data['quoteAsset']}": data['symbol'] for data in r}
 
 _exchange_function_map = {
@@ -10,9 +10,7 @@ from time import sleep
 import logging
 from decimal import Decimal
 
-import pandas as pd
 import requests
-import yaml
 
 from cryptofeed.standards import load_exchange_pair_mapping
 
@@ -63,6 +61,7 @@ class API:
             config = "config.yaml"
 
         try:
+            import yaml
             with open(os.path.join(path, config), 'r') as fp:
                 data = yaml.safe_load(fp)
                 self.key_id = data[self.ID.lower()]['key_id']
@@ -74,6 +73,7 @@ class API:
 
     @staticmethod
     def _timestamp(ts):
+        import pandas as pd
         if isinstance(ts, (float, int)):
             return pd.to_datetime(ts, unit='s')
         return pd.Timestamp(ts)
@@ -16,7 +16,6 @@ from datetime import timedelta
 
 from sortedcontainers import SortedDict as sd
 import requests
-import pandas as pd
 
 from cryptofeed.rest.api import API, request_retry
 from cryptofeed.defines import BITMEX, SELL, BUY, BID, ASK
@@ -62,6 +61,7 @@ class Bitmex(API):
         }
 
     def _get(self, ep, symbol, start_date, end_date, retry, retry_wait, freq='6H'):
+        import pandas as pd
         dates = [None]
         if start_date:
             if not end_date:
@@ -156,6 +156,7 @@ class Bitmex(API):
             'foreignNotional': 1900
         }
         """
+        import pandas as pd
         d = dt.utcnow().date()
         d -= timedelta(days=1)
         rest_end_date = pd.Timestamp(dt(d.year, d.month, d.day))
@@ -214,6 +215,7 @@ class Bitmex(API):
         return ret
 
     def _s3_data_normalization(self, data):
+        import pandas as pd
         vals = data.split(",")
         return {
             'timestamp': pd.Timestamp(vals[0].replace("D", "T")).timestamp(),
@@ -226,6 +228,7 @@ class Bitmex(API):
         }
 
     def _scrape_s3(self, symbol: str, dtype: str, start_date, end_date):
+        import pandas as pd
         date = dt(end_date.year, end_date.month, end_date.day)
         end = dt(start_date.year, start_date.month, start_date.day)
 
@@ -16,7 +16,6 @@ from datetime import timedelta
 
 from sortedcontainers import SortedDict as sd
 import requests
-import pandas as pd
 
 from cryptofeed.rest.api import API, request_retry
 from cryptofeed.defines import BYBIT, SELL, BUY, BID, ASK
@@ -4,13 +4,8 @@ Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
-from cryptofeed.rest.bitmex import Bitmex
-from cryptofeed.rest.bitfinex import Bitfinex
-from cryptofeed.rest.coinbase import Coinbase
-from cryptofeed.rest.poloniex import Poloniex
-from cryptofeed.rest.gemini import Gemini
-from cryptofeed.rest.kraken import Kraken
-from cryptofeed.rest.deribit import Deribit
+import importlib
+
 from cryptofeed.log import get_logger
 from cryptofeed.standards import load_exchange_pair_mapping
 
@@ -18,6 +13,19 @@ from cryptofeed.standards import load_exchange_pair_mapping
 LOG = get_logger('rest', 'rest.log')
 
 
+# exchange name -> (module, class, supports sandbox). The exchange modules are
+# only imported when first accessed
+_REST_EXCHANGES = {
+    'bitmex': ('cryptofeed.rest.bitmex', 'Bitmex', False),
+    'bitfinex': ('cryptofeed.rest.bitfinex', 'Bitfinex', False),
+    'coinbase': ('cryptofeed.rest.coinbase', 'Coinbase', True),
+    'poloniex': ('cryptofeed.rest.poloniex', 'Poloniex', False),
+    'gemini': ('cryptofeed.rest.gemini', 'Gemini', True),
+    'kraken': ('cryptofeed.rest.kraken', 'Kraken', False),
+    'deribit': ('cryptofeed.rest.deribit', 'Deribit', False)
+}
+
+
 class Rest:
     """
     The rest class is a common interface for accessing the individual exchanges
@@ -30,18 +38,19 @@ class Rest:
     """
     def __init__(self, config=None, sandbox=False):
         self.config = config
-        self.lookup = {
-            'bitmex': Bitmex(config),
-            'bitfinex': Bitfinex(config),
-            'coinbase': Coinbase(config, sandbox=sandbox),
-            'poloniex': Poloniex(config),
-            'gemini': Gemini(config, sandbox=sandbox),
-            'kraken': Kraken(config),
-            'deribit': Deribit(config)
-        }
+        self.sandbox = sandbox
+        self.lookup = {}
 
-    def __getitem__(self, key):
-        exch = self.lookup[key.lower()]
+    def _get_exchange(self, name):
+        name = name.lower()
+        if name not in self.lookup:
+            if name not in _REST_EXCHANGES:
+                raise KeyError(name)
+            module, cls, sandbox = _REST_EXCHANGES[name]
+            cls = getattr(importlib.import_module(module), cls)
+            self.lookup[name] = cls(self.config, sandbox=self.sandbox) if sandbox else cls(self.config)
+
+        exch = self.lookup[name]
         if not exch.mapped:
             try:
                 load_exchange_pair_mapping(exch.ID + 'REST')
@@ -50,12 +59,10 @@ class Rest:
             exch.mapped = True
         return exch
 
+    def __getitem__(self, key):
+        return self._get_exchange(key)
+
     def __getattr__(self, attr):
-        exch = self.lookup[attr.lower()]
-        if not exch.mapped:
-            try:
-                load_exchange_pair_mapping(exch.ID + 'REST')
-            except KeyError:
-                load_exchange_pair_mapping(exch.ID)
-            exch.mapped = True
-        return exch
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return self._get_exchange(attr)
@@ -10,7 +10,6 @@ between exchanges. These include trading pairs, timestamps, and
 data channel names
 '''
 import logging
-import pandas as pd
 
 from cryptofeed.defines import (L2_BOOK, L3_BOOK, TRADES, TICKER, VOLUME, FUNDING, POSITION, UNSUPPORTED, BITFINEX, GEMINI, BITMAX,
                                 POLONIEX, HITBTC, BITSTAMP, COINBASE, BITMEX, KRAKEN, KRAKEN_FUTURES, BINANCE, BINANCE_MARGIN, EXX, HUOBI, HUOBI_US, HUOBI_DM,
@@ -67,6 +66,8 @@ def pair_exchange_to_std(pair):
 
 def timestamp_normalize(exchange, ts):
     if exchange in {BITMEX, COINBASE, HITBTC, OKCOIN, OKEX, OKEX_SWAP, BYBIT, FTX, BITCOINCOM}:
+        # pandas is slow to import, defer until a feed actually needs it
+        import pandas as pd
         return pd.Timestamp(ts).timestamp()
     elif exchange in  {HUOBI, HUOBI_US, HUOBI_DM, BITFINEX, COINBENE, DERIBIT, BINANCE, BINANCE_US, BINANCE_JERSEY, BINANCE_FUTURES, GEMINI, BITTREX, BITMAX, KRAKEN_FUTURES}:
         return ts / 1000.0
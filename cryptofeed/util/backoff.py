@@ -0,0 +1,41 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import random
+
+
+class Backoff:
+    """
+    Capped exponential backoff with full jitter, for reconnects. After the nth
+    consecutive failure the wait is random between 0 and min(maximum, initial * 2 ** n)
+    seconds, so the first retry is fast on average and reconnects of many feeds
+    are spread out. retries is the number of consecutive failures allowed (-1 for
+    no limit)
+    """
+    def __init__(self, retries: int = 10, initial: float = 1, maximum: float = 30):
+        self.retries = retries
+        self.initial = initial
+        self.maximum = maximum
+        self.failures = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.retries != -1 and self.failures > self.retries
+
+    def reset(self):
+        self.failures = 0
+
+    def delay(self) -> float:
+        return random.uniform(0, min(self.maximum, self.initial * 2 ** self.failures))
+
+    async def wait(self):
+        """
+        Record a failure and wait before the next attempt
+        """
+        delay = self.delay()
+        self.failures += 1
+        await asyncio.sleep(delay)
@@ -5,11 +5,18 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 
 
-A set of helper functions for regulating book depth
+A set of helper functions for regulating book depth, read-only
+views of books for delivery to callbacks, and the L3 book maintained
+by the exchanges with order by order books
 '''
+from collections.abc import Mapping
+from itertools import islice
+from types import MappingProxyType
+
 from sortedcontainers import SortedDict as sd
 
 from cryptofeed.defines import BID, ASK, L2_BOOK
+from cryptofeed.exceptions import StaleBook
 
 
 def depth(book: dict, depth: int, book_type=L2_BOOK) -> dict:
@@ -48,3 +55,316 @@ def book_delta(former: dict, latter: dict, book_type=L2_BOOK) -> list:
         raise ValueError("Not supported for L3 Books")
 
     return ret
+
+
+class L3Level(dict):
+    """
+    The orders at a price, order id -> size in priority (arrival) order, with their
+    aggregate size. Modified through `L3Book`, which keeps `size` up to date
+    """
+    __slots__ = ('price', 'size')
+
+    def __init__(self, price):
+        super().__init__()
+        self.price = price
+        self.size = 0
+
+
+class L3Book(dict):
+    """
+    L3 book of a pair, {BID: SortedDict, ASK: SortedDict} of price -> `L3Level`, so it
+    is handled like the other books by callbacks and the book utilities, with an
+    index of the orders, order id -> (side, level).
+
+    Orders are found, changed and removed without a price lookup, a change of size
+    keeps the priority of the order within its level, and levels keep their
+    aggregate size so L2 is derived without summing the orders
+    """
+    __slots__ = ('orders',)
+
+    def __init__(self):
+        super().__init__(((BID, sd()), (ASK, sd())))
+        self.orders = {}
+
+    def add(self, order_id, side, price, size):
+        """
+        Add an order at the back of its level. An order already in the book is
+        removed first, losing its priority
+        """
+        if order_id in self.orders:
+            self.remove(order_id)
+        levels = self[side]
+        level = levels.get(price)
+        if level is None:
+            level = levels[price] = L3Level(price)
+        level[order_id] = size
+        level.size += size
+        self.orders[order_id] = (side, level)
+
+    def change(self, order_id, size):
+        """
+        Change the size of an order, keeping its priority. Returns (side, price)
+        of the order, None if it is not in the book
+        """
+        entry = self.orders.get(order_id)
+        if entry is None:
+            return None
+        side, level = entry
+        level.size += size - level[order_id]
+        level[order_id] = size
+        return side, level.price
+
+    def remove(self, order_id):
+        """
+        Remove an order, returns (side, price, size) of the order, None if it is
+        not in the book
+        """
+        entry = self.orders.pop(order_id, None)
+        if entry is None:
+            return None
+        side, level = entry
+        size = level.pop(order_id)
+        if level:
+            level.size -= size
+        else:
+            del self[side][level.price]
+        return side, level.price, size
+
+    def order(self, order_id):
+        """
+        (side, price, size) of an order, None if it is not in the book
+        """
+        entry = self.orders.get(order_id)
+        if entry is None:
+            return None
+        side, level = entry
+        return side, level.price, level[order_id]
+
+    def l2(self, depth: int = None) -> dict:
+        """
+        L2 book of aggregate sizes, with at most `depth` levels per side
+        """
+        ret = {}
+        for side in (BID, ASK):
+            levels = self[side]
+            if depth is None:
+                ret[side] = sd({price: level.size for price, level in levels.items()})
+            else:
+                ret[side] = sd({price: level.size for price, level in _levels(self, side, depth)})
+        return ret
+
+
+class BookSideView(Mapping):
+    """
+    Read-only view of one side of a book (a SortedDict of price -> size, or
+    price -> {order id: size} for L3 books). Iteration is in ascending price order
+    """
+    __slots__ = ('_book', '_side')
+
+    def __init__(self, book, side):
+        self._book = book
+        self._side = side
+
+    def _data(self):
+        if self._book._stale:
+            raise StaleBook("Book has been updated since this view was created")
+        return self._book._data[self._side]
+
+    def __getitem__(self, price):
+        ret = self._data()[price]
+        if isinstance(ret, dict):
+            return MappingProxyType(ret)
+        return ret
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __reversed__(self):
+        return reversed(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+    def __contains__(self, price):
+        return price in self._data()
+
+    def keys(self):
+        return self._data().keys()
+
+    def peekitem(self, index=-1):
+        price, size = self._data().peekitem(index)
+        if isinstance(size, dict):
+            return price, MappingProxyType(size)
+        return price, size
+
+
+class BookView(Mapping):
+    """
+    Read-only view of a live book, handed to book callbacks in place of the book
+    itself. No data is copied, and the exchange changes the book in place, so a view
+    is only valid until the callback it was passed to returns: the feed then
+    invalidates it (further access raises StaleBook). Callbacks that need the book
+    beyond their invocation, e.g. from a task they start, should call `copy()`
+    before returning. BookCallback copies the book for THREAD dispatched callbacks.
+
+    Per-update results that every consumer would otherwise recompute (array exports,
+    backend conversions) are cached on the view, so they are computed at most
+    once per update no matter how many callbacks receive it.
+    """
+    __slots__ = ('_data', '_stale', '_sides', '_cache')
+
+    def __init__(self, book: dict):
+        self._data = book
+        self._stale = False
+        self._sides = {BID: BookSideView(self, BID), ASK: BookSideView(self, ASK)}
+        self._cache = {}
+
+    def invalidate(self):
+        self._stale = True
+        self._cache = {}
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def __getitem__(self, side):
+        if self._stale:
+            raise StaleBook("Book has been updated since this view was created")
+        return self._sides[side]
+
+    def __iter__(self):
+        return iter((BID, ASK))
+
+    def __len__(self):
+        return 2
+
+    def copy(self) -> dict:
+        """
+        Return a standalone copy of the book, in the usual dict of SortedDicts format
+        """
+        if self._stale:
+            raise StaleBook("Book has been updated since this view was created")
+        ret = {}
+        for side in (BID, ASK):
+            ret[side] = sd({price: dict(size) if isinstance(size, dict) else size for price, size in self._data[side].items()})
+        return ret
+
+    def cached(self, key, func):
+        """
+        Return func(self), computing it only once for this update. key identifies
+        the computation
+        """
+        if self._stale:
+            raise StaleBook("Book has been updated since this view was created")
+        if key not in self._cache:
+            self._cache[key] = func(self)
+        return self._cache[key]
+
+    def to_arrays(self) -> dict:
+        """
+        Export the book to NumPy arrays:
+            {BID: (prices, sizes), ASK: (prices, sizes)}
+
+        prices and sizes are float64 arrays, ordered from the best price
+        outwards (bids descending, asks ascending). L3 levels are reported
+        with their aggregate size. See book_arrays
+        """
+        return self.cached('arrays', _view_to_arrays)
+
+    def to_l3_arrays(self) -> dict:
+        """
+        Export an L3 book to NumPy structured arrays, one row per order. See l3_book_arrays
+        """
+        return self.cached('l3_arrays', _view_to_l3_arrays)
+
+
+def _levels(book: dict, side: str, depth: int):
+    """
+    Iterate (price, size) for one side of a book, best price first
+    """
+    items = reversed(book[side].items()) if side == BID else iter(book[side].items())
+    if depth is not None:
+        items = islice(items, depth)
+    return items
+
+
+def _to_scaled(values, scale):
+    return values if scale is None else (round(value * scale) for value in values)
+
+
+def book_arrays(book: dict, depth: int = None, price_scale=None, size_scale=None) -> dict:
+    """
+    Export an L2 book to NumPy arrays:
+        {BID: (prices, sizes), ASK: (prices, sizes)}
+
+    Levels are ordered from the best price outwards (bids descending, asks ascending),
+    with at most `depth` levels per side. Arrays are float64, unless a scale is given
+    for prices or sizes, in which case those values are multiplied by the scale and
+    returned as int64 (e.g. price_scale=100 for a book with a 0.01 tick size).
+    L3 levels are reported with their aggregate size.
+    """
+    import numpy as np
+
+    ret = {}
+    for side in (BID, ASK):
+        count = len(book[side]) if depth is None else min(depth, len(book[side]))
+        prices = []
+        sizes = []
+        for price, size in _levels(book, side, depth):
+            prices.append(price)
+            if isinstance(size, L3Level):
+                size = size.size
+            elif isinstance(size, Mapping):
+                size = sum(size.values())
+            sizes.append(size)
+        ret[side] = (np.fromiter(_to_scaled(prices, price_scale), dtype=np.float64 if price_scale is None else np.int64, count=count),
+                     np.fromiter(_to_scaled(sizes, size_scale), dtype=np.float64 if size_scale is None else np.int64, count=count))
+    return ret
+
+
+def l3_book_arrays(book: dict, depth: int = None) -> dict:
+    """
+    Export an L3 book to NumPy structured arrays, one row per order:
+        {BID: array, ASK: array}
+
+    with fields price (float64), size (float64) and order_id (object). Rows are
+    ordered from the best price outwards, with at most `depth` price levels per side.
+    Orders within a level keep the book's order
+    """
+    import numpy as np
+
+    dtype = np.dtype([('price', np.float64), ('size', np.float64), ('order_id', object)])
+    ret = {}
+    for side in (BID, ASK):
+        rows = [(price, size, order_id) for price, orders in _levels(book, side, depth) for order_id, size in orders.items()]
+        ret[side] = np.array(rows, dtype=dtype)
+    return ret
+
+
+def delta_arrays(delta: dict) -> dict:
+    """
+    Export a book delta to NumPy structured arrays:
+        {BID: array, ASK: array}
+
+    L2 deltas have the fields price and size (float64), L3 deltas have an
+    additional order_id field (object). Rows keep the order of the delta
+    """
+    import numpy as np
+
+    ret = {}
+    for side in (BID, ASK):
+        if delta[side] and len(delta[side][0]) == 3:
+            dtype = np.dtype([('price', np.float64), ('size', np.float64), ('order_id', object)])
+            ret[side] = np.array([(price, size, order_id) for order_id, price, size in delta[side]], dtype=dtype)
+        else:
+            dtype = np.dtype([('price', np.float64), ('size', np.float64)])
+            ret[side] = np.array(delta[side], dtype=dtype)
+    return ret
+
+
+def _view_to_arrays(view: BookView) -> dict:
+    return book_arrays(view._data)
+
+
+def _view_to_l3_arrays(view: BookView) -> dict:
+    return l3_book_arrays(view._data)
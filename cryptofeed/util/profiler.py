@@ -0,0 +1,211 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+
+
+LOG = logging.getLogger('feedhandler')
+
+
+# stages
+DECODE = 'decode'
+PARSE = 'parse'
+WORKER = 'worker'
+BOOK = 'book'
+CALLBACK = 'callback'
+BACKEND = 'backend'
+
+
+# stack of the stages being timed in the current task, set while a sampled message is handled
+_frames = contextvars.ContextVar('profiler_frames', default=None)
+
+
+class _Stage:
+    __slots__ = ('profiler', 'key')
+
+    def __init__(self, profiler, key):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        self.profiler.enter(_frames.get(), self.key)
+
+    def __exit__(self, *args):
+        self.profiler.exit(_frames.get())
+
+
+class Profiler:
+    """
+    Opt-in profiling of the feedhandler (see the profiler option on FeedHandler).
+
+    Wall and CPU time of every `sample`th message is attributed to (feed, channel, stage):
+
+        decode   - decompression of the frames of compressed feeds
+        worker   - decoding and parsing in the parser processes
+        parse    - message handling by the exchange on the event loop (parsing,
+                   book maintenance)
+        book     - Feed.book_callback (max depth, deltas, book views)
+        callback - user callbacks
+        backend  - callbacks from cryptofeed.backends
+
+    Times are exclusive: time spent in a nested stage (e.g. callbacks invoked from
+    the book stage) is only attributed to the nested stage. Wall time includes the
+    time a stage spends waiting, e.g. a backend awaiting a write.
+
+    A monitor thread reports event loop blocks longer than `block_threshold`
+    seconds, with the stack of the blocking code. Every `report_interval` seconds
+    the report is logged, or passed to `report` if set.
+    """
+    def __init__(self, sample: int = 1, block_threshold: float = 0.1, report_interval: float = 60, report=None):
+        if sample < 1:
+            raise ValueError("sample must be at least 1")
+        self.sample = sample
+        self.block_threshold = block_threshold
+        self.report_interval = report_interval
+        self.report_callback = report
+        # (feed, channel, stage) -> [calls, wall seconds, cpu seconds]
+        self.stats = defaultdict(lambda: [0, 0.0, 0.0])
+        self.messages = 0
+        # (time, seconds blocked, stack) of the recent event loop blocks
+        self.blocks = deque(maxlen=100)
+        self.loop = None
+        self.beat = None
+        self.thread_id = None
+        self.stopped = threading.Event()
+        # timer handles of the next heartbeat and report
+        self.beat_handle = None
+        self.report_handle = None
+
+    @staticmethod
+    def sampling() -> bool:
+        """
+        True while a sampled message is being handled in the current task
+        """
+        return _frames.get() is not None
+
+    def stage(self, feed, channel, stage) -> _Stage:
+        return _Stage(self, (feed, channel, stage))
+
+    def sample_next(self) -> bool:
+        """
+        True if the next message passed to a wrapped handler will be sampled. Stages
+        timed before the handler (decode, worker) are only recorded for those messages
+        """
+        return (self.messages + 1) % self.sample == 0
+
+    def add(self, key, wall: float, cpu: float):
+        stats = self.stats[key]
+        stats[0] += 1
+        stats[1] += wall
+        stats[2] += cpu
+
+    def enter(self, frames, key):
+        now = time.perf_counter()
+        cpu = time.thread_time()
+        if frames:
+            self._charge(frames[-1], now, cpu)
+        frames.append([key, now, cpu])
+        self.stats[key][0] += 1
+
+    def exit(self, frames):
+        now = time.perf_counter()
+        cpu = time.thread_time()
+        self._charge(frames.pop(), now, cpu)
+        if frames:
+            # the enclosing stage resumes
+            frames[-1][1] = now
+            frames[-1][2] = cpu
+
+    def _charge(self, frame, now, cpu):
+        stats = self.stats[frame[0]]
+        stats[1] += now - frame[1]
+        stats[2] += cpu - frame[2]
+
+    def wrap(self, feed, handler):
+        """
+        Message handler of the feed, timing every `sample`th message
+        """
+        key = (feed.id, None, PARSE)
+
+        async def profiled(msg, timestamp):
+            self.messages += 1
+            if self.messages % self.sample:
+                return await handler(msg, timestamp)
+            frames = []
+            token = _frames.set(frames)
+            self.enter(frames, key)
+            try:
+                return await handler(msg, timestamp)
+            finally:
+                self.exit(frames)
+                _frames.reset(token)
+        return profiled
+
+    def start(self, loop):
+        """
+        Start the loop block monitor and the periodic reports. Must be called from
+        the thread running the loop
+        """
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.stopped.clear()
+        self._beat()
+        if self.report_interval:
+            self.report_handle = loop.call_later(self.report_interval, self._report)
+        if self.block_threshold:
+            threading.Thread(target=self._monitor, name='profiler', daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+        for handle in (self.beat_handle, self.report_handle):
+            if handle is not None:
+                handle.cancel()
+        self.beat_handle = self.report_handle = None
+
+    def _beat(self):
+        self.beat = time.perf_counter()
+        if not self.stopped.is_set():
+            self.beat_handle = self.loop.call_later(self.block_threshold / 4 if self.block_threshold else 1, self._beat)
+
+    def _monitor(self):
+        reported = None
+        while not self.stopped.wait(self.block_threshold / 4):
+            beat = self.beat
+            blocked = time.perf_counter() - beat
+            if blocked > self.block_threshold and beat != reported:
+                # report each block once, with the stack of the code blocking the loop
+                reported = beat
+                frame = sys._current_frames().get(self.thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame else ''
+                self.blocks.append((time.time(), blocked, stack))
+                LOG.warning("Event loop blocked for more than %.0f ms in:\n%s", blocked * 1000, stack)
+
+    def _report(self):
+        if self.stopped.is_set():
+            return
+        report = self.report()
+        if self.report_callback:
+            self.report_callback(report)
+        else:
+            LOG.info("Profile:\n%s", report)
+        self.report_handle = self.loop.call_later(self.report_interval, self._report)
+
+    def report(self, limit: int = 30) -> str:
+        """
+        The stages with the most wall time, and the recent event loop blocks
+        """
+        lines = [f"{'feed':<16} {'channel':<16} {'stage':<9} {'calls':>9} {'wall ms':>11} {'cpu ms':>11} {'us/call':>9}"]
+        for (feed, channel, stage), (calls, wall, cpu) in sorted(self.stats.items(), key=lambda item: -item[1][1])[:limit]:
+            lines.append(f"{feed:<16} {str(channel or '-'):<16} {stage:<9} {calls:>9} {wall * 1000:>11.1f} {cpu * 1000:>11.1f} {wall / max(calls, 1) * 1e6:>9.1f}")
+        if self.blocks:
+            lines.append(f"{len(self.blocks)} event loop blocks over {self.block_threshold * 1000:.0f} ms, longest {max(block[1] for block in self.blocks) * 1000:.0f} ms")
+        return '\n'.join(lines)
@@ -0,0 +1,465 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Local websocket exchange simulator, for load and soak tests without exchange
+connections. It speaks the wire protocol of the exchange named in the path of
+the connection (subscription acks, snapshots, book updates, trades, tickers,
+sequence numbers, heartbeats and compression), at a configurable rate:
+
+    python -m cryptofeed.util.simulator --port 8765 --rate 1000
+
+and feeds are pointed at it with the address option of FeedHandler.add_feed:
+
+    fh.add_feed(Coinbase(pairs=['BTC-USD'], channels=[L2_BOOK, TRADES]), address='ws://localhost:8765/coinbase')
+
+Simulated exchanges: Coinbase, Bitmex, Huobi, HuobiUS, HuobiDM, OKCoin and OKEx.
+Note that exchange feeds still load their pair mappings / instruments over REST
+when they are created.
+'''
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import websockets
+from websockets import ConnectionClosed
+
+from cryptofeed.defines import (BID, ASK, BUY, SELL, L2_BOOK, TRADES, TICKER,
+                                COINBASE, BITMEX, HUOBI, HUOBI_US, HUOBI_DM, OKCOIN, OKEX)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class Market:
+    """
+    Random walk L2 book of a simulated pair. Each step changes, adds or removes a
+    level, or trades at the touch (trades do not change the book)
+    """
+    def __init__(self, rng, mid=7500, tick='0.5', levels=20, trade_ratio=0.1):
+        self.rng = rng
+        self.tick = Decimal(tick)
+        self.levels = levels
+        self.trade_ratio = trade_ratio
+        mid = Decimal(mid)
+        self.book = {
+            BID: {mid - self.tick * (i + 1): self._size() for i in range(levels)},
+            ASK: {mid + self.tick * (i + 1): self._size() for i in range(levels)}
+        }
+
+    def _size(self) -> Decimal:
+        return Decimal(self.rng.randint(1, 10000)) / 1000
+
+    def best(self, side) -> Decimal:
+        return max(self.book[BID]) if side == BID else min(self.book[ASK])
+
+    def step(self) -> tuple:
+        """
+        Returns (TRADES, side, price, amount), with the side of the taker, or
+        (L2_BOOK, side, price, size), with size 0 when a level is removed
+        """
+        side = self.rng.choice((BID, ASK))
+        levels = self.book[side]
+        if self.rng.random() < self.trade_ratio:
+            price = self.best(side)
+            return TRADES, SELL if side == BID else BUY, price, min(levels[price], self._size())
+
+        offset = self.rng.randrange(-2, 2 * self.levels)
+        if side == BID:
+            price = self.best(BID) - self.tick * offset
+            if price >= self.best(ASK):
+                price = self.best(BID)
+        else:
+            price = self.best(ASK) + self.tick * offset
+            if price <= self.best(BID):
+                price = self.best(ASK)
+
+        if price in levels and len(levels) > 1 and (len(levels) > self.levels or self.rng.random() < 0.3):
+            del levels[price]
+            return L2_BOOK, side, price, Decimal(0)
+        levels[price] = self._size()
+        return L2_BOOK, side, price, levels[price]
+
+
+class _Protocol:
+    """
+    Wire format of an exchange. One instance per connection, so sequence numbers
+    are per connection
+    """
+    def __init__(self):
+        self.trade_ids = itertools.count(1)
+
+    def welcome(self) -> list:
+        return []
+
+    def subscribe(self, msg) -> tuple:
+        """
+        Returns the (data type, pair, channel) subscribed to by a client message,
+        and the messages acknowledging the subscription
+        """
+        return [], []
+
+    def snapshot(self, pair, channel, market) -> list:
+        return []
+
+    def book(self, pair, channel, market, side, price, size) -> list:
+        raise NotImplementedError
+
+    def trade(self, pair, channel, side, price, amount) -> list:
+        raise NotImplementedError
+
+    def ticker(self, pair, channel, market) -> list:
+        return []
+
+    def heartbeat(self) -> list:
+        return []
+
+    def encode(self, msg):
+        return json.dumps(msg)
+
+
+class _Coinbase(_Protocol):
+    channels = {'level2': L2_BOOK, 'matches': TRADES, 'ticker': TICKER}
+
+    def __init__(self):
+        super().__init__()
+        self.sequence = {}
+
+    def _sequence(self, pair) -> int:
+        self.sequence[pair] = self.sequence.get(pair, 0) + 1
+        return self.sequence[pair]
+
+    def subscribe(self, msg):
+        if msg.get('type') != 'subscribe':
+            return [], []
+        subs = []
+        for channel in msg['channels']:
+            name = channel['name'] if isinstance(channel, dict) else channel
+            pairs = channel.get('product_ids', msg.get('product_ids')) if isinstance(channel, dict) else msg['product_ids']
+            if name in self.channels:
+                subs.extend((self.channels[name], pair, name) for pair in pairs)
+        ack = {'type': 'subscriptions', 'channels': [{'name': name, 'product_ids': [pair for _, pair, chan in subs if chan == name]} for name in dict.fromkeys(chan for _, _, chan in subs)]}
+        return subs, [ack]
+
+    def snapshot(self, pair, channel, market):
+        if channel != 'level2':
+            return []
+        return [{'type': 'snapshot', 'product_id': pair,
+                 'bids': [[str(price), str(size)] for price, size in sorted(market.book[BID].items(), reverse=True)],
+                 'asks': [[str(price), str(size)] for price, size in sorted(market.book[ASK].items())]}]
+
+    def book(self, pair, channel, market, side, price, size):
+        return [{'type': 'l2update', 'product_id': pair, 'time': _iso(time.time()),
+                 'changes': [['buy' if side == BID else 'sell', str(price), str(size)]]}]
+
+    def trade(self, pair, channel, side, price, amount):
+        # side of a match is the maker's side
+        return [{'type': 'match', 'trade_id': next(self.trade_ids), 'maker_order_id': '', 'taker_order_id': '',
+                 'side': 'sell' if side == BUY else 'buy', 'size': str(amount), 'price': str(price),
+                 'product_id': pair, 'sequence': self._sequence(pair), 'time': _iso(time.time())}]
+
+    def ticker(self, pair, channel, market):
+        return [{'type': 'ticker', 'sequence': self._sequence(pair), 'product_id': pair,
+                 'best_bid': str(market.best(BID)), 'best_ask': str(market.best(ASK)), 'time': _iso(time.time())}]
+
+
+class _Bitmex(_Protocol):
+    channels = {'orderBookL2': L2_BOOK, 'trade': TRADES, 'quote': TICKER}
+
+    def __init__(self):
+        super().__init__()
+        # levels in the client's book, updates of which are sent as update rather than insert
+        self.levels = set()
+
+    def welcome(self):
+        return [{'info': 'Welcome to the simulated BitMEX Realtime API.', 'timestamp': _iso(time.time())}]
+
+    def subscribe(self, msg):
+        if msg.get('op') != 'subscribe':
+            return [], []
+        subs = []
+        acks = []
+        for arg in msg['args']:
+            name, _, pair = arg.partition(':')
+            if name in self.channels:
+                subs.append((self.channels[name], pair, name))
+            acks.append({'success': name in self.channels, 'subscribe': arg, 'request': msg})
+        return subs, acks
+
+    @staticmethod
+    def _level(pair, side, price, size=None):
+        # bitmex level ids are derived from the price
+        ret = {'symbol': pair, 'id': int(price * 100), 'side': 'Buy' if side == BID else 'Sell'}
+        if size is not None:
+            ret['size'] = float(size)
+        return ret
+
+    def snapshot(self, pair, channel, market):
+        if channel != 'orderBookL2':
+            return []
+        data = [dict(self._level(pair, side, price, size), price=float(price)) for side in (ASK, BID) for price, size in market.book[side].items()]
+        self.levels.update((pair, side, price) for side in (ASK, BID) for price in market.book[side])
+        return [{'table': 'orderBookL2', 'action': 'partial', 'data': data}]
+
+    def book(self, pair, channel, market, side, price, size):
+        key = (pair, side, price)
+        level = self._level(pair, side, price, size if size else None)
+        if not size:
+            action = 'delete'
+            self.levels.discard(key)
+        elif key in self.levels:
+            action = 'update'
+        else:
+            action = 'insert'
+            level['price'] = float(price)
+            self.levels.add(key)
+        return [{'table': 'orderBookL2', 'action': action, 'data': [level]}]
+
+    def trade(self, pair, channel, side, price, amount):
+        return [{'table': 'trade', 'action': 'insert', 'data': [{'timestamp': _iso(time.time()), 'symbol': pair, 'side': 'Buy' if side == BUY else 'Sell',
+                                                                 'size': float(amount), 'price': float(price), 'trdMatchID': str(next(self.trade_ids))}]}]
+
+    def ticker(self, pair, channel, market):
+        return [{'table': 'quote', 'action': 'insert', 'data': [{'timestamp': _iso(time.time()), 'symbol': pair,
+                                                                 'bidPrice': float(market.best(BID)), 'askPrice': float(market.best(ASK))}]}]
+
+
+class _Huobi(_Protocol):
+    """
+    Huobi sends the full book on every change, gzip compressed, and pings the client
+    """
+    def subscribe(self, msg):
+        if 'sub' not in msg:
+            return [], []
+        _, pair, channel = msg['sub'].split('.', 2)
+        data_type = L2_BOOK if 'depth' in channel else TRADES if 'trade' in channel else None
+        subs = [(data_type, pair, msg['sub'])] if data_type else []
+        return subs, [{'id': msg.get('id'), 'status': 'ok' if subs else 'error', 'subbed': msg['sub'], 'ts': int(time.time() * 1000)}]
+
+    def snapshot(self, pair, channel, market):
+        if 'depth' not in channel:
+            return []
+        now = int(time.time() * 1000)
+        return [{'ch': channel, 'ts': now,
+                 'tick': {'bids': [[float(price), float(size)] for price, size in sorted(market.book[BID].items(), reverse=True)],
+                          'asks': [[float(price), float(size)] for price, size in sorted(market.book[ASK].items())],
+                          'ts': now}}]
+
+    def book(self, pair, channel, market, side, price, size):
+        return self.snapshot(pair, channel, market)
+
+    def trade(self, pair, channel, side, price, amount):
+        now = int(time.time() * 1000)
+        trade_id = next(self.trade_ids)
+        return [{'ch': channel, 'ts': now, 'tick': {'id': trade_id, 'ts': now, 'data': [
+            {'id': trade_id, 'amount': float(amount), 'price': float(price), 'direction': 'buy' if side == BUY else 'sell', 'ts': now}]}}]
+
+    def heartbeat(self):
+        return [{'ping': int(time.time() * 1000)}]
+
+    def encode(self, msg):
+        obj = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        return obj.compress(json.dumps(msg).encode()) + obj.flush()
+
+
+class _OKEx(_Protocol):
+    """
+    OKCoin / OKEx v3 tables, raw DEFLATE compressed
+    """
+    channels = {'depth': L2_BOOK, 'trade': TRADES, 'ticker': TICKER}
+
+    def subscribe(self, msg):
+        if msg.get('op') != 'subscribe':
+            return [], []
+        subs = []
+        acks = []
+        for arg in msg['args']:
+            table, _, pair = arg.partition(':')
+            name = table.split('/')[-1]
+            if name in self.channels:
+                subs.append((self.channels[name], pair, table))
+                acks.append({'event': 'subscribe', 'channel': arg})
+            else:
+                acks.append({'event': 'error', 'message': f'Channel {table} doesn\'t exist', 'errorCode': 30040})
+        return subs, acks
+
+    @staticmethod
+    def _levels(levels):
+        return [[str(price), str(size), '0', 1] for price, size in levels]
+
+    def snapshot(self, pair, channel, market):
+        if not channel.endswith('depth'):
+            return []
+        return [{'table': channel, 'action': 'partial', 'data': [{
+            'instrument_id': pair, 'timestamp': _iso(time.time()), 'checksum': 0,
+            'bids': self._levels(sorted(market.book[BID].items(), reverse=True)),
+            'asks': self._levels(sorted(market.book[ASK].items()))}]}]
+
+    def book(self, pair, channel, market, side, price, size):
+        levels = self._levels([(price, size)])
+        return [{'table': channel, 'action': 'update', 'data': [{
+            'instrument_id': pair, 'timestamp': _iso(time.time()), 'checksum': 0,
+            'bids': levels if side == BID else [], 'asks': levels if side == ASK else []}]}]
+
+    def trade(self, pair, channel, side, price, amount):
+        # futures trades carry the amount in qty
+        amount_key = 'qty' if channel.startswith('futures') else 'size'
+        return [{'table': channel, 'data': [{'instrument_id': pair, 'price': str(price), 'side': 'buy' if side == BUY else 'sell',
+                                             amount_key: str(amount), 'timestamp': _iso(time.time()), 'trade_id': str(next(self.trade_ids))}]}]
+
+    def ticker(self, pair, channel, market):
+        return [{'table': channel, 'data': [{'instrument_id': pair, 'last': str(market.best(BID)), 'best_bid': str(market.best(BID)),
+                                             'best_ask': str(market.best(ASK)), 'timestamp': _iso(time.time())}]}]
+
+    def encode(self, msg):
+        obj = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        return obj.compress(json.dumps(msg).encode()) + obj.flush()
+
+
+_PROTOCOLS = {
+    COINBASE: _Coinbase,
+    BITMEX: _Bitmex,
+    HUOBI: _Huobi,
+    HUOBI_US: _Huobi,
+    HUOBI_DM: _Huobi,
+    OKCOIN: _OKEx,
+    OKEX: _OKEx
+}
+
+
+class Simulator:
+    """
+    Websocket server simulating the exchanges in _PROTOCOLS, each at ws://host:port/<exchange>.
+
+    rate: messages per second per connection, spread over its subscriptions
+    heartbeat: seconds between heartbeats, on exchanges that send them
+    levels: number of levels per side of the simulated books
+    trade_ratio: fraction of the updates that are trades
+    ticker_ratio: fraction of the updates followed by a ticker, when subscribed
+    seed: seed of the random data, for repeatable runs
+    """
+    def __init__(self, host='localhost', port=0, rate=100, heartbeat=5, levels=20, trade_ratio=0.1, ticker_ratio=0.1, seed=None):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.heartbeat = heartbeat
+        self.levels = levels
+        self.trade_ratio = trade_ratio
+        self.ticker_ratio = ticker_ratio
+        self.seed = seed
+        self.server = None
+        # messages sent, per exchange
+        self.sent = {}
+
+    def address(self, exchange: str) -> str:
+        return f"ws://{self.host}:{self.port}/{exchange.lower()}"
+
+    async def start(self):
+        self.server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handler(self, websocket, path=None):
+        # websockets < 10 passes the path, later versions expose the request
+        path = path or websocket.request.path
+        exchange = path.strip('/').upper()
+        if exchange not in _PROTOCOLS:
+            await websocket.close(reason=f"{exchange} is not simulated")
+            return
+
+        protocol = _PROTOCOLS[exchange]()
+        rng = random.Random(self.seed)
+        markets = {}
+        # (data type, pair) -> exchange channel
+        subscriptions = {}
+
+        async def send(messages):
+            for msg in messages:
+                await websocket.send(protocol.encode(msg))
+            self.sent[exchange] = self.sent.get(exchange, 0) + len(messages)
+
+        producer = asyncio.ensure_future(self._produce(send, protocol, rng, markets, subscriptions))
+        try:
+            await send(protocol.welcome())
+            async for message in websocket:
+                subs, acks = protocol.subscribe(json.loads(message))
+                await send(acks)
+                for data_type, pair, channel in subs:
+                    if pair not in markets:
+                        markets[pair] = Market(rng, levels=self.levels, trade_ratio=self.trade_ratio)
+                    subscriptions[(data_type, pair)] = channel
+                    await send(protocol.snapshot(pair, channel, markets[pair]))
+        except ConnectionClosed:
+            pass
+        finally:
+            producer.cancel()
+
+    async def _produce(self, send, protocol, rng, markets, subscriptions):
+        last = last_heartbeat = time.time()
+        credit = 0.0
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.time()
+                credit += (now - last) * self.rate
+                last = now
+                if self.heartbeat and now - last_heartbeat >= self.heartbeat:
+                    last_heartbeat = now
+                    await send(protocol.heartbeat())
+                if not subscriptions:
+                    credit = 0
+                    continue
+                pairs = list(markets)
+                while credit >= 1:
+                    credit -= 1
+                    pair = rng.choice(pairs)
+                    market = markets[pair]
+                    data_type, side, price, size = market.step()
+                    if (data_type, pair) in subscriptions:
+                        channel = subscriptions[(data_type, pair)]
+                        if data_type == L2_BOOK:
+                            await send(protocol.book(pair, channel, market, side, price, size))
+                        else:
+                            await send(protocol.trade(pair, channel, side, price, size))
+                    if (TICKER, pair) in subscriptions and rng.random() < self.ticker_ratio:
+                        await send(protocol.ticker(pair, subscriptions[(TICKER, pair)], market))
+        except ConnectionClosed:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local websocket exchange simulator")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=float, default=100, help='messages per second per connection')
+    parser.add_argument('--heartbeat', type=float, default=5)
+    parser.add_argument('--levels', type=int, default=20)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    async def run():
+        sim = Simulator(args.host, args.port, rate=args.rate, heartbeat=args.heartbeat, levels=args.levels, seed=args.seed)
+        await sim.start()
+        for exchange in _PROTOCOLS:
+            print(f"{exchange:<10} {sim.address(exchange)}")
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
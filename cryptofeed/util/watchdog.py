@@ -0,0 +1,87 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import heapq
+import time
+from itertools import count
+
+
+class _Entry:
+    __slots__ = ('timeout', 'last_activity', 'on_timeout', 'start')
+
+    def __init__(self, timeout, last_activity, on_timeout, start):
+        self.timeout = timeout
+        self.last_activity = last_activity
+        self.on_timeout = on_timeout
+        self.start = start
+
+
+class Watchdog:
+    """
+    Stall detection for any number of connections / channels with a single timer.
+
+    Each watched key has a timeout, a function returning the time of its last
+    activity (None if there was none yet, in which case the time it was added is used)
+    and a function called with the key when it times out. Keys are kept in a heap
+    ordered by deadline and only examined when their deadline passes: the key either
+    timed out, or is rescheduled at last activity + timeout. Activity itself costs
+    nothing here, and stalls are detected when the timeout expires rather than on
+    the next poll.
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.heap = []
+        self.entries = {}
+        self.handle = None
+        self.next = None
+        self.counter = count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, timeout: float, last_activity, on_timeout):
+        entry = _Entry(timeout, last_activity, on_timeout, self.clock())
+        self.entries[key] = entry
+        self._push(entry.start + timeout, key, entry)
+
+    def remove(self, key):
+        # the heap entry is dropped when it comes up
+        self.entries.pop(key, None)
+
+    def _push(self, deadline, key, entry):
+        heapq.heappush(self.heap, (deadline, next(self.counter), key, entry))
+        if self.next is None or deadline < self.next:
+            self._schedule(deadline)
+
+    def _schedule(self, deadline):
+        if self.handle is not None:
+            self.handle.cancel()
+        self.next = deadline
+        self.handle = asyncio.get_event_loop().call_later(max(deadline - self.clock(), 0), self.check)
+
+    def check(self):
+        """
+        Time out or reschedule every key whose deadline has passed
+        """
+        self.handle = None
+        self.next = None
+        now = self.clock()
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, _, key, entry = heapq.heappop(heap)
+            if self.entries.get(key) is not entry:
+                continue
+            last = entry.last_activity()
+            if last is None:
+                last = entry.start
+            if now - last >= entry.timeout:
+                del self.entries[key]
+                entry.on_timeout(key)
+            else:
+                heapq.heappush(heap, (last + entry.timeout, next(self.counter), key, entry))
+        if heap:
+            self._schedule(heap[0][0])
@@ -36,7 +36,7 @@ setup(
     license="XFree86",
     keywords=["cryptocurrency", "bitcoin", "btc", "feed handler", "market feed", "market data"],
     url="https://github.com/bmoscon/cryptofeed",
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks', 'benchmarks.*']),
     package_data={'': ['rest/config.yaml']},
     cmdclass={'test': Test},
     classifiers=[
@@ -50,6 +50,7 @@ setup(
         "websockets>=7.0",
         "sortedcontainers>=1.5.9",
         "pandas",
+        "numpy",
         "pyyaml",
         "aiohttp",
         "aiodns",
@@ -62,6 +63,7 @@ setup(
         'zmq': ['pyzmq'],
         'mongo': ['motor'],
         'kafka': ['aiokafka'],
-        'rabbit': ['aio_pika', 'pika']
+        'rabbit': ['aio_pika', 'pika'],
+        'uvloop': ['uvloop']
     },
 )
@@ -0,0 +1,364 @@
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+
+from cryptofeed.backends.aggregate import Conflate, OHLCVBars, RenkoFixed, RenkoATR, RangeBars, TradeDedupe, TradeMerge
+from cryptofeed.defines import BID, ASK, BUY, SELL
+
+
+def test_ohlcv_bars():
+    bars = []
+
+    async def handler(window=None, start=None, data=None):
+        bars.append((window, start, data))
+
+    agg = OHLCVBars(handler, windows=(1, 3), lateness=0.5)
+
+    async def trade(pair, price, amount, timestamp):
+        await agg(feed='TEST', pair=pair, side=BUY, amount=Decimal(amount), price=Decimal(price), timestamp=timestamp)
+
+    async def run():
+        await trade('BTC-USD', 10, 1, 100.1)
+        await trade('BTC-USD', 12, 1, 100.5)
+        await trade('ETH-USD', 1, 2, 100.7)
+        await trade('BTC-USD', 9, 2, 101.2)
+        # late but within the lateness window
+        await trade('BTC-USD', 11, 1, 100.9)
+        await agg.close_bars(101.6)
+        # too late, bar 100 is closed
+        await trade('BTC-USD', 50, 1, 100.2)
+        # no trades at all in bars 102 and 103
+        await agg.close_bars(104.5)
+        agg.stop()
+
+    asyncio.run(run())
+    assert agg.late == 1
+    assert [(w, s) for w, s, _ in bars] == [(1, 100), (1, 101), (3, 99), (1, 102), (1, 103)]
+
+    first = bars[0][2]
+    assert first['BTC-USD'] == {'open': 10, 'high': 12, 'low': 10, 'close': 11, 'volume': 3, 'vwap': 11, 'trades': 3}
+    assert first['ETH-USD']['vwap'] == 1
+
+    # empty bar carries the last close
+    assert bars[3][2]['BTC-USD'] == {'open': 9, 'high': 9, 'low': 9, 'close': 9, 'volume': 0, 'vwap': 9, 'trades': 0}
+
+    rollup = bars[2][2]
+    assert rollup['BTC-USD'] == {'open': 10, 'high': 12, 'low': 9, 'close': 9, 'volume': 5, 'vwap': pytest.approx(10.2), 'trades': 4}
+    assert rollup['ETH-USD']['close'] == 1
+
+
+def test_ohlcv_bars_timer_survives_handler_error():
+    bars = []
+
+    async def handler(window=None, start=None, data=None):
+        bars.append(start)
+        if len(bars) == 1:
+            raise ValueError("handler failure")
+
+    agg = OHLCVBars(handler, windows=(0.1,))
+
+    async def run():
+        await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal(1), timestamp=None)
+        await asyncio.sleep(0.45)
+        agg.stop()
+
+    asyncio.run(run())
+    # bars keep closing after the handler raised
+    assert len(bars) >= 3
+
+
+def test_ohlcv_bars_windows():
+    with pytest.raises(ValueError):
+        OHLCVBars(None, windows=(2, 3))
+
+
+def test_renko_per_pair():
+    bricks = []
+
+    async def handler(data=None):
+        bricks.append({pair: dict(d) for pair, d in data.items()})
+
+    agg = RenkoFixed(handler, brick_size=10)
+
+    async def run():
+        for pair, price in [('BTC-USD', 100), ('ETH-USD', 5), ('BTC-USD', 105), ('ETH-USD', 14),
+                            ('BTC-USD', 111), ('ETH-USD', 15), ('BTC-USD', 121), ('BTC-USD', 100)]:
+            await agg(feed='TEST', pair=pair, side=BUY, amount=Decimal(1), price=Decimal(price))
+
+    asyncio.run(run())
+    # ETH trades do not affect the BTC brick
+    assert [b['BTC-USD'] for b in bricks] == [{'brick_open': 100, 'brick_close': 111},
+                                              {'brick_open': 100, 'brick_close': 111},
+                                              {'brick_open': 111, 'brick_close': 121},
+                                              {'brick_open': 111, 'brick_close': 100}]
+    assert bricks[1]['ETH-USD'] == {'brick_open': 5, 'brick_close': 15}
+
+
+def test_renko_atr():
+    agg = RenkoATR(None, brick_size=100, interval=1, period=2, multiplier=2, min_brick_size=1)
+
+    for ts, price in [(0, 10), (0.5, 12), (1, 11), (1.5, 14), (2, 13)]:
+        agg._update_atr('BTC-USD', Decimal(price), ts)
+    # true ranges 2 and 3 (14 - 11)
+    assert agg.atr['BTC-USD'].atr == Decimal('2.5')
+    assert agg._brick_size('BTC-USD', None, None, 2) == 5
+    assert agg._brick_size('ETH-USD', None, None, 2) == 100
+
+    with pytest.raises(ValueError):
+        RenkoATR(None, min_brick_size=0)
+
+
+def test_renko_atr_float_multiplier():
+    bricks = []
+
+    async def handler(data=None):
+        bricks.append(dict(data['BTC-USD']))
+
+    agg = RenkoATR(handler, brick_size=Decimal('0.5'), interval=1, period=2, multiplier=1.5, min_brick_size=Decimal('0.1'))
+
+    async def run():
+        for ts, price in [(0, 10), (0.5, 12), (1, 11), (1.5, 14), (2, 13), (2.5, 20)]:
+            await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal(price), timestamp=ts)
+
+    asyncio.run(run())
+    # the ATR has warmed up, bricks are 1.5 * ATR
+    assert agg._brick_size('BTC-USD', None, None, 3) == Decimal('1.5') * agg.atr['BTC-USD'].atr
+    assert bricks
+
+
+def test_renko_atr_flat_market():
+    bricks = []
+
+    async def handler(data=None):
+        bricks.append(dict(data['BTC-USD']))
+
+    agg = RenkoATR(handler, brick_size=5, interval=1, period=2)
+
+    async def run():
+        # next to no range, the ATR is close to 0
+        for ts in range(4):
+            await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal(100), timestamp=ts)
+        await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal('100.01'), timestamp=4)
+        await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal('100.02'), timestamp=5)
+
+    asyncio.run(run())
+    assert agg.atr['BTC-USD'].atr < Decimal('0.01')
+    # the brick size is floored at brick_size
+    assert agg._brick_size('BTC-USD', None, None, 5) == 5
+    assert bricks == []
+
+
+def test_range_bars():
+    bars = []
+
+    async def handler(pair=None, data=None):
+        bars.append((pair, data))
+
+    agg = RangeBars(handler, bar_range=5)
+
+    async def run():
+        for price in (100, 102, 98, 103, 104, 104):
+            await agg(feed='TEST', pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal(price))
+
+    asyncio.run(run())
+    assert bars == [('BTC-USD', {'open': 100, 'high': 103, 'low': 98, 'close': 103, 'volume': 4})]
+    assert agg.bars['BTC-USD'] == [104, 104, 104, 104, 2]
+
+
+def test_conflate_deltas():
+    received = []
+
+    async def handler(feed=None, pair=None, delta=None, timestamp=None):
+        received.append((pair, delta, timestamp))
+        # slow consumer
+        await asyncio.sleep(0.01)
+
+    agg = Conflate(handler)
+
+    async def run():
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(1), Decimal(1))], ASK: []}, timestamp=1)
+        await asyncio.sleep(0)
+        # arrive while the handler is busy
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(2), Decimal(1))], ASK: [(Decimal(3), Decimal(1))]}, timestamp=2)
+        await agg(feed='TEST', pair='ETH-USD', delta={BID: [(Decimal(1), Decimal(5))], ASK: []}, timestamp=3)
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(2), Decimal(0))], ASK: [(Decimal(3), Decimal(2))]}, timestamp=4)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert received == [('BTC-USD', {BID: [(1, 1)], ASK: []}, 1),
+                        ('BTC-USD', {BID: [(2, 0)], ASK: [(3, 2)]}, 4),
+                        ('ETH-USD', {BID: [(1, 5)], ASK: []}, 3)]
+    assert agg.updates == 4
+    assert agg.published == 3
+
+
+def test_conflate_books_interval():
+    received = []
+
+    async def handler(feed=None, pair=None, book=None, timestamp=None):
+        received.append((pair, book, timestamp))
+
+    agg = Conflate(handler, interval=0.02)
+
+    async def run():
+        for i in range(5):
+            await agg(feed='TEST', pair='BTC-USD', book={BID: {i: 1}, ASK: {}}, timestamp=i)
+        await asyncio.sleep(0.03)
+        agg.stop()
+
+    asyncio.run(run())
+    assert received == [('BTC-USD', {BID: {4: 1}, ASK: {}}, 4)]
+
+
+def test_conflate_handler_error():
+    received = []
+    failures = []
+
+    async def handler(feed=None, pair=None, delta=None, timestamp=None):
+        if not failures:
+            failures.append(timestamp)
+            raise ValueError("handler failure")
+        received.append((delta, timestamp))
+
+    agg = Conflate(handler, retry_delay=0.01)
+
+    async def run():
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(1), Decimal(1))], ASK: []}, timestamp=1)
+        await asyncio.sleep(0)
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(2), Decimal(1))], ASK: []}, timestamp=2)
+        await asyncio.sleep(0.02)
+        # the last update of a quiet pair is retried too
+        failures.clear()
+        await agg(feed='TEST', pair='ETH-USD', delta={BID: [(Decimal(1), Decimal(1))], ASK: []}, timestamp=3)
+        await asyncio.sleep(0.02)
+
+    asyncio.run(run())
+    # the failed update is merged with the next one, not lost
+    assert failures == [3]
+    assert received == [({BID: [(1, 1), (2, 1)], ASK: []}, 2), ({BID: [(1, 1)], ASK: []}, 3)]
+
+
+def test_conflate_book_replaces_delta():
+    received = []
+
+    async def handler(**kwargs):
+        received.append(kwargs)
+
+    agg = Conflate(handler, interval=0.02)
+
+    async def run():
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(1), Decimal(1))], ASK: []}, timestamp=1)
+        await agg(feed='TEST', pair='BTC-USD', book={BID: {1: 1, 2: 1}, ASK: {}}, timestamp=2)
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(2), Decimal(0))], ASK: []}, timestamp=3)
+        await asyncio.sleep(0.03)
+        agg.stop()
+
+    asyncio.run(run())
+    # the delta older than the book is dropped, the newer one follows the book
+    assert received == [{'feed': 'TEST', 'pair': 'BTC-USD', 'book': {BID: {1: 1, 2: 1}, ASK: {}}, 'timestamp': 2},
+                        {'feed': 'TEST', 'pair': 'BTC-USD', 'delta': {BID: [(2, 0)], ASK: []}, 'timestamp': 3}]
+
+
+def test_conflate_books_and_deltas():
+    received = []
+
+    async def handler(**kwargs):
+        received.append(kwargs)
+
+    agg = Conflate(handler, interval=0.02)
+
+    async def run():
+        await agg(feed='TEST', pair='BTC-USD', book={BID: {1: 1}, ASK: {}}, timestamp=1)
+        await agg(feed='TEST', pair='BTC-USD', delta={BID: [(Decimal(1), Decimal(2))], ASK: []}, timestamp=2)
+        # L3 deltas are merged per order and price
+        await agg(feed='TEST', pair='ETH-USD', delta={BID: [('a', Decimal(1), Decimal(1))], ASK: []}, timestamp=3)
+        await agg(feed='TEST', pair='ETH-USD', delta={BID: [('a', Decimal(1), Decimal(0)), ('a', Decimal(2), Decimal(1))], ASK: []}, timestamp=4)
+        await asyncio.sleep(0.03)
+        agg.stop()
+
+    asyncio.run(run())
+    assert received == [{'feed': 'TEST', 'pair': 'BTC-USD', 'book': {BID: {1: 1}, ASK: {}}, 'timestamp': 1},
+                        {'feed': 'TEST', 'pair': 'BTC-USD', 'delta': {BID: [(1, 2)], ASK: []}, 'timestamp': 2},
+                        {'feed': 'TEST', 'pair': 'ETH-USD', 'delta': {BID: [('a', 1, 0), ('a', 2, 1)], ASK: []}, 'timestamp': 4}]
+
+
+def test_trade_dedupe():
+    trades = []
+
+    async def handler(**kwargs):
+        trades.append((kwargs['feed'], kwargs['order_id']))
+
+    agg = TradeDedupe(handler, size=2)
+
+    async def run():
+        for feed, order_id in [('A', 1), ('A', 2), ('B', 1), ('A', 1), ('A', 3), ('A', 2), ('A', None), ('A', None)]:
+            await agg(feed=feed, pair='BTC-USD', side=BUY, amount=Decimal(1), price=Decimal(1), order_id=order_id, timestamp=0)
+
+    asyncio.run(run())
+    # trade 2 was evicted when trade 3 was seen (trade 1 was seen more recently)
+    assert trades == [('A', 1), ('A', 2), ('B', 1), ('A', 3), ('A', 2), ('A', None), ('A', None)]
+    assert agg.duplicates == 1
+
+
+def test_trade_merge():
+    trades = []
+
+    async def handler(**kwargs):
+        trades.append((kwargs['feed'], kwargs['timestamp']))
+
+    agg = TradeMerge(handler, lateness=1)
+
+    async def run():
+        for feed, timestamp in [('A', 10), ('B', 9.5), ('A', 10.6), ('B', 10.2), ('A', 11.5), ('B', 9.8), ('A', 12)]:
+            await agg(feed=feed, pair='BTC-USD', side=SELL, amount=Decimal(1), price=Decimal(1), order_id=None, timestamp=timestamp)
+        await agg.flush()
+        agg.stop()
+
+    asyncio.run(run())
+    assert trades == [('B', 9.5), ('A', 10), ('B', 10.2), ('A', 10.6), ('A', 11.5), ('A', 12)]
+    assert agg.late == 1
+
+
+def test_trade_merge_timer():
+    trades = []
+
+    async def handler(**kwargs):
+        trades.append((kwargs['feed'], kwargs['timestamp']))
+
+    agg = TradeMerge(handler, lateness=0.05)
+
+    async def run():
+        now = time.time()
+        await agg(feed='A', pair='BTC-USD', side=SELL, amount=Decimal(1), price=Decimal(1), order_id=None, timestamp=now)
+        await agg(feed='B', pair='BTC-USD', side=SELL, amount=Decimal(1), price=Decimal(1), order_id=None, timestamp=now - 0.01)
+        assert trades == []
+        # no further trades, the held trades are published once lateness has passed
+        await asyncio.sleep(0.1)
+        agg.stop()
+        return now
+
+    now = asyncio.run(run())
+    assert trades == [('B', now - 0.01), ('A', now)]
+
+
+def test_trade_merge_concurrent_publish():
+    trades = []
+
+    async def handler(**kwargs):
+        # the first trade takes longer to handle
+        await asyncio.sleep(0.01 if kwargs['timestamp'] == 1 else 0)
+        trades.append(kwargs['timestamp'])
+
+    agg = TradeMerge(handler, lateness=10)
+
+    async def run():
+        for timestamp in (1, 2, 3):
+            await agg(feed='A', pair='BTC-USD', side=SELL, amount=Decimal(1), price=Decimal(1), order_id=None, timestamp=timestamp)
+        # e.g. the timer and a new trade publishing at the same time
+        await asyncio.gather(agg.flush(), agg.flush())
+        agg.stop()
+
+    asyncio.run(run())
+    assert trades == [1, 2, 3]
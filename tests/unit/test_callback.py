@@ -0,0 +1,134 @@
+import asyncio
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.callback import Callback, BookCallback, BookArrayCallback, dispatch_stats
+from cryptofeed.defines import INLINE, THREAD, EXECUTOR, PROCESS, BID, ASK
+from cryptofeed.util.book import BookView
+
+
+def test_inline_dispatch():
+    calls = []
+
+    def cb(value):
+        calls.append((value, threading.current_thread()))
+
+    callback = Callback(cb, dispatch=INLINE)
+
+    async def run():
+        for i in range(5):
+            await callback(i)
+
+    asyncio.run(run())
+    assert [c[0] for c in calls] == list(range(5))
+    assert all(c[1] is threading.main_thread() for c in calls)
+    assert callback.calls == 5
+    assert dispatch_stats()[INLINE]['calls'] >= 5
+
+
+def test_thread_dispatch_ordered():
+    calls = []
+
+    def cb(value):
+        calls.append((value, threading.current_thread()))
+
+    callback = Callback(cb, dispatch=THREAD)
+
+    async def run():
+        for i in range(1000):
+            await callback(i)
+
+    asyncio.run(run())
+    callback.stop()
+    assert [c[0] for c in calls] == list(range(1000))
+    assert len({c[1] for c in calls}) == 1
+    assert calls[0][1] is not threading.main_thread()
+    assert callback.calls == 1000
+
+
+def test_executor_dispatch():
+    calls = []
+    callback = Callback(calls.append, dispatch=EXECUTOR)
+
+    async def run():
+        await callback(1)
+        await callback(2)
+
+    asyncio.run(run())
+    assert calls == [1, 2]
+    assert callback.calls == 2
+
+
+def _write_pid(path, value):
+    with open(path, 'a') as fp:
+        fp.write(f"{value} {os.getpid()}\n")
+
+
+def test_process_dispatch(tmp_path):
+    path = str(tmp_path / 'calls')
+    callback = Callback(_write_pid, dispatch=PROCESS)
+
+    async def run():
+        await callback(path, 1)
+        await callback(path, 2)
+
+    asyncio.run(run())
+    with open(path) as fp:
+        calls = [line.split() for line in fp]
+    assert [value for value, _ in calls] == ['1', '2']
+    assert all(int(pid) != os.getpid() for _, pid in calls)
+    assert callback.calls == 2
+    assert dispatch_stats()[PROCESS]['calls'] >= 2
+
+
+def test_thread_dispatch_copies_books():
+    received = []
+    ready = threading.Event()
+
+    def cb(feed, pair, book, timestamp):
+        ready.wait()
+        received.append(book)
+
+    book = {BID: sd({Decimal(1): Decimal(2)}), ASK: sd({Decimal(3): {'a': Decimal(4)}})}
+    callback = BookCallback(cb, dispatch=THREAD)
+
+    async def run():
+        await callback(feed='TEST', pair='BTC-USD', book=BookView(book), timestamp=0)
+        # the feed updates the book before the worker runs
+        book[BID][Decimal(1)] = Decimal(5)
+        book[ASK][Decimal(3)]['a'] = Decimal(6)
+        book[BID][Decimal('0.5')] = Decimal(1)
+
+    asyncio.run(run())
+    ready.set()
+    callback.stop()
+    assert received[0] == {BID: {Decimal(1): Decimal(2)}, ASK: {Decimal(3): {'a': Decimal(4)}}}
+
+
+def test_invalid_dispatch():
+    with pytest.raises(ValueError):
+        Callback(print, dispatch='bogus')
+
+
+def test_book_array_callback():
+    received = []
+
+    def cb(feed, pair, book, timestamp):
+        received.append(book)
+
+    book = {BID: sd({Decimal(1): Decimal(2)}), ASK: sd({Decimal(3): Decimal(4)})}
+    l3_book = {BID: sd({Decimal(1): {'a': Decimal(2)}}), ASK: sd()}
+    callback = BookArrayCallback(cb, dispatch=INLINE)
+
+    async def run():
+        await callback(feed='TEST', pair='BTC-USD', book=book, timestamp=0)
+        await callback(feed='TEST', pair='BTC-USD', book=BookView(l3_book), timestamp=0)
+
+    asyncio.run(run())
+    assert received[0][BID][0].tolist() == [1.0]
+    assert received[0][ASK][1].tolist() == [4.0]
+    assert received[1][BID]['order_id'].tolist() == ['a']
@@ -0,0 +1,54 @@
+import asyncio
+from decimal import Decimal
+
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.consolidated import ConsolidatedBook
+from cryptofeed.defines import BID, ASK, INLINE
+
+
+def D(value):
+    return Decimal(str(value))
+
+
+def book(bids, asks):
+    return {BID: sd({D(p): D(s) for p, s in bids}), ASK: sd({D(p): D(s) for p, s in asks})}
+
+
+def test_consolidated_book():
+    deltas = []
+    cb = ConsolidatedBook(lambda *args: deltas.append(args[1]), ['BTC-USD'], dispatch=INLINE)
+
+    async def run():
+        await cb(feed='A', pair='BTC-USD', book=book([(99, 1)], [(101, 1)]), timestamp=0)
+        await cb(feed='B', pair='BTC-USD', book=book([(99, 2), (98, 1)], [(102, 1)]), timestamp=0)
+        await cb.delta(feed='A', pair='BTC-USD', delta={BID: [(D(99), D(0))], ASK: [(D(101), D(3))]}, timestamp=0)
+        # full book resync from A, should only emit the difference
+        await cb(feed='A', pair='BTC-USD', book=book([(98, 4)], [(101, 3)]), timestamp=0)
+
+    asyncio.run(run())
+    consolidated = cb.book('BTC-USD')
+    assert consolidated[BID] == {D(99): {'B': D(2)}, D(98): {'A': D(4), 'B': D(1)}}
+    assert consolidated[ASK] == {D(101): {'A': D(3)}, D(102): {'B': D(1)}}
+    assert cb.level_size('BTC-USD', BID, D(98)) == 5
+
+    assert sorted(deltas[1][BID]) == [(D(98), D(1)), (D(99), D(3))]
+    assert deltas[1][ASK] == [(D(102), D(1))]
+    assert deltas[2] == {BID: [(D(99), D(2))], ASK: [(D(101), D(3))]}
+    assert deltas[3] == {BID: [(D(98), D(5))], ASK: []}
+
+
+def test_consolidated_tick_size():
+    deltas = []
+    cb = ConsolidatedBook(lambda *args: deltas.append(args[1]), tick_size=D('0.5'), dispatch=INLINE)
+
+    async def run():
+        await cb(feed='A', pair='BTC-USD', book=book([(99.3, 1), (99.1, 1)], [(100.2, 1)]), timestamp=0)
+        await cb(feed='B', pair='BTC-USD', book=book([(99.25, 2)], [(100.5, 1)]), timestamp=0)
+        await cb.remove_feed('A', 'BTC-USD')
+
+    asyncio.run(run())
+    assert deltas[0] == {BID: [(D(99), D(2))], ASK: [(D('100.5'), D(1))]}
+    assert deltas[1] == {BID: [(D(99), D(4))], ASK: [(D('100.5'), D(2))]}
+    assert cb.book('BTC-USD')[BID] == {D(99): {'B': D(2)}}
+    assert cb.book('BTC-USD')[ASK] == {D('100.5'): {'B': D(1)}}
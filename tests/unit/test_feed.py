@@ -0,0 +1,254 @@
+import asyncio
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.callback import TradeCallback, TradeBatchCallback, BookDeltaBatchCallback, BookCallback, BookStatusCallback, BookUpdateCallback
+from cryptofeed.exceptions import MissingSequenceNumber, BadChecksum, StaleBook
+from cryptofeed.defines import BITMEX, TRADES, TRADES_BATCH, BOOK_DELTA, BOOK_DELTA_BATCH, BOOK_STATUS, L2_BOOK, BID, ASK, BUY
+from cryptofeed.feed import Feed
+from cryptofeed.util.book import BookView
+
+
+class DummyFeed(Feed):
+    # bitmex does not load pair mappings, so no network access is needed
+    id = BITMEX
+
+    def copy_kwargs(self):
+        # exchanges set their own address, the base class takes it as an argument
+        return dict(super().copy_kwargs(), address=self.address)
+
+
+def test_trade_batch():
+    trades = []
+    batches = []
+
+    def trade(feed, pair, order_id, timestamp, side, amount, price):
+        trades.append(price)
+
+    def batch(feed, updates):
+        batches.append(updates)
+
+    async def run():
+        feed = DummyFeed(None, callbacks={TRADES: TradeCallback(trade), TRADES_BATCH: TradeBatchCallback(batch)})
+        for price in range(3):
+            await feed.callback(TRADES, feed=feed.id, pair='XBTUSD', side=BUY, amount=Decimal(1), price=Decimal(price), order_id=None, timestamp=1.0)
+        await feed.flush_batches()
+        # nothing new, no callback
+        await feed.flush_batches()
+
+    asyncio.run(run())
+    assert trades == [0, 1, 2]
+    assert len(batches) == 1
+    assert [t['price'] for t in batches[0]] == [0, 1, 2]
+
+
+def test_book_delta_batch_only():
+    batches = []
+
+    async def batch(feed, updates):
+        batches.append(updates)
+
+    async def run():
+        feed = DummyFeed(None, callbacks={BOOK_DELTA_BATCH: BookDeltaBatchCallback(batch)})
+        assert feed.do_deltas
+        book = {BID: {Decimal(1): Decimal(1)}, ASK: {Decimal(2): Decimal(1)}}
+        delta = {BID: [(Decimal(1), Decimal(1))], ASK: []}
+        await feed.book_callback(book, L2_BOOK, 'XBTUSD', False, delta, 1.0)
+        await feed.book_callback(book, L2_BOOK, 'XBTUSD', False, delta, 2.0)
+        await feed.flush_batches()
+
+    asyncio.run(run())
+    assert len(batches) == 1
+    assert [u['timestamp'] for u in batches[0]] == [1.0, 2.0]
+
+
+def test_book_view_invalidated():
+    views = []
+
+    async def book(feed, pair, book, timestamp):
+        assert not book.stale
+        assert book[BID][Decimal(1)] == 1
+        views.append(book)
+
+    async def run():
+        feed = DummyFeed(None, callbacks={L2_BOOK: BookCallback(book)}, book_view=True)
+        l2_book = {BID: sd({Decimal(1): Decimal(1)}), ASK: sd({Decimal(2): Decimal(1)})}
+        await feed.book_callback(l2_book, L2_BOOK, 'XBTUSD', True, None, 1.0)
+
+    asyncio.run(run())
+    assert isinstance(views[0], BookView)
+    # the view is invalidated when the callback returns, before the exchange changes the book
+    assert views[0].stale
+    with pytest.raises(StaleBook):
+        views[0][BID]
+
+
+def test_book_view_invalidated_on_error():
+    views = []
+
+    async def book(feed, pair, book, timestamp):
+        views.append(book)
+        raise ValueError
+
+    async def run():
+        feed = DummyFeed(None, callbacks={L2_BOOK: BookCallback(book)}, book_view=True)
+        l2_book = {BID: sd({Decimal(1): Decimal(1)}), ASK: sd({Decimal(2): Decimal(1)})}
+        with pytest.raises(ValueError):
+            await feed.book_callback(l2_book, L2_BOOK, 'XBTUSD', True, None, 1.0)
+
+    asyncio.run(run())
+    assert views[0].stale
+
+
+def test_check_sequence():
+    async def run():
+        feed = DummyFeed(None)
+        assert await feed.check_sequence('XBTUSD', 5)
+        assert await feed.check_sequence('XBTUSD', 6)
+        # duplicate
+        assert not await feed.check_sequence('XBTUSD', 6)
+        # other pairs are tracked separately
+        assert await feed.check_sequence('ETHUSD', 1)
+        with pytest.raises(MissingSequenceNumber):
+            await feed.check_sequence('XBTUSD', 8)
+        assert feed.gaps == {'XBTUSD': 1}
+
+    asyncio.run(run())
+
+
+def test_check_checksum_sampled():
+    resynced = []
+    calculated = []
+
+    class ResyncFeed(DummyFeed):
+        async def resync(self, pair, error):
+            resynced.append((pair, type(error)))
+
+    def calculate():
+        calculated.append(1)
+        return 42
+
+    async def run():
+        feed = ResyncFeed(None, checksum_sample=3)
+        results = [await feed.check_checksum('XBTUSD', 42 if i < 3 else 0, calculate) for i in range(6)]
+        assert results == [True, True, True, True, True, False]
+        assert feed.checksum_checks['XBTUSD'] == 2
+        assert feed.checksum_errors['XBTUSD'] == 1
+
+        feed = DummyFeed(None, checksum_sample=1)
+        with pytest.raises(BadChecksum):
+            await feed.check_checksum('XBTUSD', 0, calculate)
+        feed = DummyFeed(None, checksum_sample=0)
+        assert await feed.check_checksum('XBTUSD', 0, calculate)
+
+    asyncio.run(run())
+    assert len(calculated) == 3
+    assert resynced == [('XBTUSD', BadChecksum)]
+
+
+def test_shard():
+    cb = TradeCallback(lambda **kwargs: None)
+    feed = DummyFeed(None, pairs=['A', 'B', 'C'], channels=[TRADES], callbacks={TRADES: cb}, max_depth=10)
+    shards = feed.shard(2)
+    assert [shard.pairs for shard in shards] == [['A', 'C'], ['B']]
+    for shard in shards:
+        assert shard.max_depth == 10
+        assert shard.callbacks[TRADES] == [cb]
+        assert shard.uuid != feed.uuid
+    assert len(feed.shard(5)) == 3
+    assert feed.shard(1) == [feed]
+
+    feed = DummyFeed(None, config={TRADES: ['A', 'B'], L2_BOOK: ['B', 'C']})
+    # the channels of a pair stay together
+    assert [shard.config for shard in feed.shard(2)] == [{'trade': {'A'}, 'orderBookL2': {'C'}},
+                                                         {'trade': {'B'}, 'orderBookL2': {'B'}}]
+
+
+def test_retain_books():
+    books = []
+    statuses = []
+
+    async def book(feed, pair, book, timestamp):
+        books.append(book)
+
+    async def status(feed, pair, stale, timestamp):
+        statuses.append((pair, stale))
+
+    async def run():
+        feed = DummyFeed(None, callbacks={L2_BOOK: BookCallback(book), BOOK_STATUS: BookStatusCallback(status)}, retain_books=True)
+        feed.l2_book['XBTUSD'] = {BID: sd({Decimal(1): Decimal(1)}), ASK: sd()}
+        feed.l2_book['ETHUSD'] = {BID: sd(), ASK: sd()}
+        retained = feed.retained_books()
+        # reconnect, the exchange resets its books on subscribe
+        feed.l2_book = {'ETHUSD': {BID: sd(), ASK: sd()}}
+        await feed.restore_books(retained)
+        assert feed.l2_book['XBTUSD'] is retained[0]['XBTUSD']
+        assert list(feed.stale_books) == ['XBTUSD']
+        assert statuses == [('XBTUSD', True)]
+
+        # updates to the stale book are not published
+        feed.l2_book['XBTUSD'][BID][Decimal(2)] = Decimal(1)
+        await feed.book_callback(feed.l2_book['XBTUSD'], L2_BOOK, 'XBTUSD', False, None, 0)
+        assert books == []
+        # new snapshot
+        feed.l2_book['XBTUSD'] = {BID: sd({Decimal(3): Decimal(1)}), ASK: sd()}
+        await feed.book_callback(feed.l2_book['XBTUSD'], L2_BOOK, 'XBTUSD', True, None, 0)
+        assert feed.stale_books == {}
+
+    asyncio.run(run())
+    assert books == [{BID: {3: 1}, ASK: {}}]
+    assert statuses == [('XBTUSD', True), ('XBTUSD', False)]
+
+
+def test_bitfinex_l3_order_update():
+    from cryptofeed.exchanges import Bitfinex
+
+    deltas = []
+
+    async def delta(feed, pair, delta, timestamp):
+        deltas.append(delta)
+
+    async def run():
+        with mock.patch('cryptofeed.standards.gen_pairs', return_value={'BTC-USD': 'tBTCUSD'}):
+            feed = Bitfinex(callbacks={BOOK_DELTA: BookUpdateCallback(delta)})
+            feed.channel_map[1] = {'symbol': 'tBTCUSD', 'channel': 'book'}
+            await feed._raw_book([1, [[10, 100, 1], [11, 100, 2]]], 0)
+            # size change, order 10 stays first at its level
+            await feed._raw_book([1, [10, 100, 3]], 0)
+            assert list(feed.l3_book['BTC-USD'][BID][Decimal(100)]) == [10, 11]
+            # price change, the order moves
+            await feed._raw_book([1, [10, 101, 3]], 0)
+            assert list(feed.l3_book['BTC-USD'][BID][Decimal(100)]) == [11]
+
+    asyncio.run(run())
+    assert deltas == [{BID: [(10, Decimal(100), Decimal(3))], ASK: []},
+                      {BID: [(10, Decimal(100), 0), (10, Decimal(101), Decimal(3))], ASK: []}]
+
+
+def test_binance_parse_normalizes():
+    from cryptofeed.exchanges import Binance
+
+    trades = []
+
+    async def trade(feed, pair, order_id, timestamp, side, amount, price):
+        trades.append((pair, order_id, timestamp, side, amount, price))
+
+    book = '{"stream": "btcusdt@depth@100ms", "data": {"e": "depthUpdate", "E": 1500, "s": "BTCUSDT", "U": 5, "u": 6, "b": [["10.5", "2"]], "a": [["11", "0"]]}}'
+    agg = '{"stream": "btcusdt@aggTrade", "data": {"e": "aggTrade", "E": 2000, "s": "BTCUSDT", "a": 7, "p": "10.5", "q": "0.25", "f": 1, "l": 1, "T": 2000, "m": false, "M": true}}'
+    # parse runs in the workers, it only depends on the frame
+    assert Binance.parse(book) == (L2_BOOK, ('BTCUSDT', 5, 6, 1.5, ((Decimal('10.5'), Decimal(2)),), ((Decimal(11), Decimal(0)),)))
+    assert Binance.parse(agg) == (TRADES, ('BTCUSDT', 7, BUY, Decimal('0.25'), Decimal('10.5'), 2.0))
+
+    async def run():
+        with mock.patch('cryptofeed.standards.gen_pairs', return_value={'BTC-USDT': 'BTCUSDT'}):
+            feed = Binance(pairs=['BTC-USDT'], channels=[TRADES], callbacks={TRADES: TradeCallback(trade)})
+            feed.l2_book['BTC-USDT'] = {BID: sd(), ASK: sd({Decimal(11): Decimal(1)})}
+            await feed.apply(Binance.parse(book), 0)
+            await feed.apply(Binance.parse(agg), 0)
+            assert feed.l2_book['BTC-USDT'] == {BID: {Decimal('10.5'): Decimal(2)}, ASK: {}}
+
+    asyncio.run(run())
+    assert trades == [('BTC-USDT', 7, 2.0, BUY, Decimal('0.25'), Decimal('10.5'))]
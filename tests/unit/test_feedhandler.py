@@ -0,0 +1,432 @@
+import asyncio
+import json
+import time
+import zlib
+from unittest import mock
+
+import pytest
+import websockets
+
+from cryptofeed.callback import TradeBatchCallback
+from cryptofeed.defines import BITMEX, TRADES, TRADES_BATCH, BUY
+from cryptofeed.feed import Feed
+from cryptofeed.exchanges import Coinbase
+from cryptofeed.feedhandler import FeedHandler, _Redundant, _handle
+from cryptofeed.util.profiler import Profiler, DECODE, PARSE, CALLBACK
+
+
+class DummyFeed(Feed):
+    # bitmex does not load pair mappings, so no network access is needed
+    id = BITMEX
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = []
+        self.subscriptions = 0
+
+    async def subscribe(self, websocket):
+        self.subscriptions += 1
+        await websocket.send('subscribe')
+
+    async def message_handler(self, msg, timestamp):
+        self.messages.append(msg)
+        if msg == 'trade':
+            await self.callback(TRADES, feed=self.id, pair='XBTUSD', side=BUY, amount=1, price=1, order_id=None, timestamp=timestamp)
+
+
+def test_batches_of_failed_message_discarded():
+    batches = []
+
+    async def batch(feed, updates):
+        batches.append([update['price'] for update in updates])
+
+    class FailingFeed(DummyFeed):
+        async def message_handler(self, msg, timestamp):
+            await self.callback(TRADES, feed=self.id, pair='XBTUSD', side=BUY, amount=1, price=msg, order_id=None, timestamp=timestamp)
+            if msg == 2:
+                raise ValueError
+
+    async def run():
+        feed = FailingFeed(None, callbacks={TRADES_BATCH: TradeBatchCallback(batch)})
+        await _handle(feed, feed.message_handler, 1, 0)
+        with pytest.raises(ValueError):
+            await _handle(feed, feed.message_handler, 2, 0)
+        await _handle(feed, feed.message_handler, 3, 0)
+
+    asyncio.run(run())
+    # the trade of the failed message is not delivered with the next message's
+    assert batches == [[1], [3]]
+
+
+class CompressedFeed(DummyFeed):
+    compressed = True
+
+    def decode(self, msg):
+        return zlib.decompress(msg, -15).decode()
+
+
+def test_decode_threads_preserve_order():
+    def compress(data):
+        obj = zlib.compressobj(wbits=-15)
+        return obj.compress(data.encode()) + obj.flush()
+
+    async def handler(websocket):
+        await websocket.recv()
+        for i in range(50):
+            # frames of varying size, so decoding finishes out of order
+            await websocket.send(compress(str(i) + ' ' * (i % 7) * 10000))
+        await asyncio.sleep(1)
+
+    async def run(threads):
+        server = await websockets.serve(handler, 'localhost', 0)
+        fh = FeedHandler(decode_threads=threads)
+        feed = CompressedFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}")
+        fh.add_feed(feed)
+        task = asyncio.ensure_future(fh._connect(feed))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        server.close()
+        fh.stop()
+        return feed
+
+    for threads in (0, 4):
+        feed = asyncio.run(run(threads))
+        assert [msg.strip() for msg in feed.messages] == [str(i) for i in range(50)]
+        assert feed.decoded == 50
+        assert feed.decode_time > 0
+
+
+class SplitFeed(DummyFeed):
+    message_handler = Feed.message_handler
+
+    @classmethod
+    def parse(cls, msg):
+        return json.loads(msg)
+
+    async def apply(self, msg, timestamp):
+        self.messages.append(msg)
+
+
+def test_parse_processes_preserve_order():
+    async def handler(websocket):
+        await websocket.recv()
+        for i in range(50):
+            await websocket.send(json.dumps({'i': i, 'data': [0] * (i % 7) * 1000}))
+        await asyncio.sleep(2)
+
+    async def run(processes):
+        server = await websockets.serve(handler, 'localhost', 0)
+        fh = FeedHandler(parse_processes=processes)
+        feed = SplitFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}")
+        fh.add_feed(feed)
+        task = asyncio.ensure_future(fh._connect(feed))
+        for _ in range(40):
+            await asyncio.sleep(0.05)
+            if len(feed.messages) == 50:
+                break
+        task.cancel()
+        server.close()
+        fh.stop()
+        return feed
+
+    feed = asyncio.run(run(2))
+    assert [msg['i'] for msg in feed.messages] == list(range(50))
+    assert feed.parsed == 50
+
+    # without workers, messages go through message_handler (parse then apply)
+    feed = asyncio.run(run(0))
+    assert [msg['i'] for msg in feed.messages] == list(range(50))
+    assert feed.parsed == 0
+
+
+def test_stop_shuts_down_pools():
+    fh = FeedHandler(decode_threads=2, parse_processes=1)
+    fh.stop()
+    for pool in (fh.decoder, fh.parser):
+        with pytest.raises(RuntimeError):
+            pool.submit(int)
+
+
+class RedundantFeed(DummyFeed):
+    def message_key(self, msg):
+        return None, None, msg
+
+
+def test_redundant_connections():
+    async def server(delay):
+        async def handler(websocket):
+            assert await websocket.recv() == 'subscribe'
+            for i in range(5):
+                await asyncio.sleep(delay)
+                await websocket.send(str(i))
+            await asyncio.sleep(1)
+        return await websockets.serve(handler, 'localhost', 0)
+
+    async def run():
+        fast = await server(0.01)
+        slow = await server(0.05)
+        addresses = [f"ws://localhost:{s.sockets[0].getsockname()[1]}" for s in (slow, fast)]
+
+        fh = FeedHandler()
+        feed = RedundantFeed(None)
+        fh.add_feed(feed, addresses=addresses)
+        tasks = [asyncio.ensure_future(fh._redundant_connect(feed, index)) for index in range(2)]
+        await asyncio.sleep(0.5)
+        for task in tasks:
+            task.cancel()
+        fast.close()
+        slow.close()
+        return feed, fh.redundant[feed.uuid]
+
+    feed, state = asyncio.run(run())
+    assert feed.messages == ['0', '1', '2', '3', '4']
+    # only the first connection subscribes the feed, the other replays the subscription
+    assert feed.subscriptions == 1
+    assert state.duplicates == 5
+    assert sum(state.wins) == 5
+    assert state.wins[1] > state.wins[0]
+
+
+class Level2Feed(DummyFeed):
+    # keys level 2 updates by product and time, as Coinbase does
+    message_key = Coinbase.message_key
+    _time_position = staticmethod(Coinbase._time_position)
+
+
+def test_redundant_connection_lagging_past_window():
+    updates = [json.dumps({'type': 'l2update', 'product_id': 'BTC-USD', 'time': f"2019-12-01T00:00:{i // 10:02d}.{i % 10}Z",
+                           'changes': [['buy', str(i), '1']]}) for i in range(30)]
+
+    async def server(delay):
+        async def handler(websocket):
+            await websocket.recv()
+            await asyncio.sleep(delay)
+            for update in updates:
+                await websocket.send(update)
+            await asyncio.sleep(1)
+        return await websockets.serve(handler, 'localhost', 0)
+
+    async def run():
+        # the second connection delivers the updates after the first, more than window messages behind
+        servers = [await server(0), await server(0.2)]
+        fh = FeedHandler()
+        feed = Level2Feed(None)
+        fh.add_feed(feed, addresses=[f"ws://localhost:{s.sockets[0].getsockname()[1]}" for s in servers])
+        tasks = [asyncio.ensure_future(fh._redundant_connect(feed, index)) for index in range(2)]
+        await asyncio.sleep(0.5)
+        for task in tasks:
+            task.cancel()
+        for s in servers:
+            s.close()
+        return feed, fh.redundant[feed.uuid]
+
+    with mock.patch.object(_Redundant, 'window', 5):
+        feed, state = asyncio.run(run())
+    assert feed.messages == updates
+    assert state.duplicates == 30
+
+
+class ChannelIdFeed(DummyFeed):
+    """
+    Bitfinex style feed: data frames carry a channel id assigned by each connection,
+    and a sequence number of the channel
+    """
+    def __init__(self, *args, fail=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail = fail
+
+    async def message_handler(self, msg, timestamp):
+        msg = json.loads(msg)
+        if isinstance(msg, list) and msg[2] == self.fail:
+            self.fail = None
+            raise ValueError("handler failure")
+        self.messages.append(msg)
+
+
+class KeyedChannelIdFeed(ChannelIdFeed):
+    def message_key(self, msg):
+        msg = json.loads(msg)
+        if isinstance(msg, dict):
+            return None, None, (msg['event'], msg['channel'], msg['pair'])
+        # channel name, pair and sequence, not the connection's channel id
+        _, channel, seq = msg
+        return channel, seq, None
+
+
+def test_redundant_connection_channel_ids():
+    async def server(chan_id, delay):
+        async def handler(websocket):
+            await websocket.recv()
+            await websocket.send(json.dumps({'event': 'subscribed', 'channel': 'trades', 'pair': 'BTCUSD', 'chanId': chan_id}))
+            for seq in range(5):
+                await asyncio.sleep(delay)
+                await websocket.send(json.dumps([chan_id, 'trades', seq]))
+            await asyncio.sleep(1)
+        return await websockets.serve(handler, 'localhost', 0)
+
+    # frames differ per connection, the feed has to provide a key
+    with pytest.raises(ValueError):
+        FeedHandler().add_feed(ChannelIdFeed(None), redundancy=2)
+
+    async def run():
+        servers = [await server(1, 0.01), await server(2, 0.03)]
+        addresses = [f"ws://localhost:{s.sockets[0].getsockname()[1]}" for s in servers]
+        fh = FeedHandler()
+        # the handler fails on sequence 2 from the faster connection
+        feed = KeyedChannelIdFeed(None, fail=2)
+        fh.add_feed(feed, addresses=addresses)
+        tasks = [asyncio.ensure_future(fh._redundant_connect(feed, index)) for index in range(2)]
+        await asyncio.sleep(0.4)
+        for task in tasks:
+            task.cancel()
+        for s in servers:
+            s.close()
+        return feed
+
+    feed = asyncio.run(run())
+    assert feed.messages[0]['event'] == 'subscribed'
+    # every message is handled once, and the message whose handler raised is handled from the other connection
+    assert [msg[2] for msg in feed.messages[1:]] == [0, 1, 2, 3, 4]
+
+
+def test_reconnect_cancels_watchers():
+    connections = []
+
+    async def handler(websocket):
+        connections.append(await websocket.recv())
+        await websocket.send('0')
+
+    async def run():
+        server = await websockets.serve(handler, 'localhost', 0)
+        fh = FeedHandler(max_retry_delay=0)
+        feed = DummyFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}")
+        fh.add_feed(feed)
+        task = asyncio.ensure_future(fh._connect(feed))
+        await asyncio.sleep(0.5)
+        # only the current connection is watched
+        running = len(fh.watchdog)
+        task.cancel()
+        server.close()
+        return running
+
+    running = asyncio.run(run())
+    assert len(connections) > 2
+    assert running <= 1
+
+
+def test_channel_timeout():
+    connections = []
+
+    async def handler(websocket):
+        connections.append(await websocket.recv())
+        await websocket.send('trade')
+        # the connection stays alive, but no more trades
+        while True:
+            await asyncio.sleep(0.05)
+            await websocket.send('heartbeat')
+
+    async def run():
+        server = await websockets.serve(handler, 'localhost', 0)
+        fh = FeedHandler(max_retry_delay=0)
+        feed = DummyFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}")
+        fh.add_feed(feed, timeout=60, channel_timeouts={TRADES: 0.2})
+        task = asyncio.ensure_future(fh._connect(feed))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        server.close()
+
+    asyncio.run(run())
+    # restarted by the trade timeout, well before the connection timeout
+    assert len(connections) >= 2
+
+
+def test_loop_policy():
+    policy = asyncio.DefaultEventLoopPolicy()
+    assert FeedHandler(loop_policy=policy).loop_policy is policy
+    assert isinstance(FeedHandler(loop_policy='asyncio').loop_policy, asyncio.DefaultEventLoopPolicy)
+    assert FeedHandler().loop_policy is None
+    with pytest.raises(ValueError):
+        FeedHandler(loop_policy='invalid')
+
+
+def test_profiler():
+    async def handler(websocket):
+        await websocket.recv()
+        for msg in ('book', 'trade', 'trade'):
+            await websocket.send(msg)
+        await asyncio.sleep(1)
+
+    async def blocking(**kwargs):
+        time.sleep(0.05)
+
+    async def run():
+        server = await websockets.serve(handler, 'localhost', 0)
+        profiler = Profiler(block_threshold=0.02, report_interval=0)
+        fh = FeedHandler(profiler=profiler)
+        feed = DummyFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}", callbacks={TRADES: blocking})
+        fh.add_feed(feed)
+        profiler.start(asyncio.get_event_loop())
+        task = asyncio.ensure_future(fh._connect(feed))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        fh.stop()
+        server.close()
+        return profiler
+
+    profiler = asyncio.run(run())
+    assert profiler.stats[(BITMEX, None, PARSE)][0] == 3
+    calls, wall, cpu = profiler.stats[(BITMEX, TRADES, CALLBACK)]
+    assert calls == 2
+    # time spent in the callbacks is attributed to them only
+    assert wall >= 0.1
+    assert profiler.stats[(BITMEX, None, PARSE)][1] < 0.05
+    assert profiler.blocks and 'blocking' in profiler.blocks[0][2]
+    assert 'callback' in profiler.report()
+
+
+def test_profiler_sampled_decode():
+    def compress(data):
+        obj = zlib.compressobj(wbits=-15)
+        return obj.compress(data.encode()) + obj.flush()
+
+    async def handler(websocket):
+        await websocket.recv()
+        for i in range(6):
+            await websocket.send(compress(str(i)))
+        await asyncio.sleep(1)
+
+    async def run():
+        server = await websockets.serve(handler, 'localhost', 0)
+        profiler = Profiler(sample=3, block_threshold=0, report_interval=0)
+        fh = FeedHandler(profiler=profiler)
+        feed = CompressedFeed(f"ws://localhost:{server.sockets[0].getsockname()[1]}")
+        fh.add_feed(feed)
+        task = asyncio.ensure_future(fh._connect(feed))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        fh.stop()
+        server.close()
+        return profiler, feed
+
+    profiler, feed = asyncio.run(run())
+    assert feed.decoded == 6
+    # decoding is timed for the sampled messages only, like the other stages
+    assert profiler.stats[(BITMEX, None, DECODE)][0] == profiler.stats[(BITMEX, None, PARSE)][0] == 2
+
+
+def test_profiler_stop():
+    reports = []
+
+    async def run():
+        profiler = Profiler(block_threshold=0.02, report_interval=0.05, report=reports.append)
+        profiler.start(asyncio.get_event_loop())
+        await asyncio.sleep(0.12)
+        profiler.stop()
+        count = len(reports)
+        await asyncio.sleep(0.2)
+        # no reports after stop
+        assert count and len(reports) == count
+
+    asyncio.run(run())
+    with pytest.raises(ValueError):
+        Profiler(sample=0)
@@ -0,0 +1,26 @@
+import json
+import subprocess
+import sys
+
+
+def _run(code):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def test_import_is_lazy():
+    """
+    importing cryptofeed, in a fresh interpreter, should not load the exchange modules
+    or REST clients, nor pandas, numpy or requests (see benchmarks/imports.py for the import time)
+    """
+    loaded = _run("import sys, json; import cryptofeed; print(json.dumps(list(sys.modules)))")
+    assert {m.split('.')[0] for m in loaded} & {'pandas', 'numpy', 'requests'} == set()
+    assert not [m for m in loaded if m.startswith(('cryptofeed.exchange.', 'cryptofeed.rest.'))]
+
+
+def test_exchange_lazy_load():
+    loaded = _run("import sys, json; from cryptofeed.exchanges import Coinbase; print(json.dumps(list(sys.modules)))")
+    assert 'cryptofeed.exchange.coinbase' in loaded
+    assert 'cryptofeed.exchange.bitmex' not in loaded
+    assert 'pandas' not in loaded
+
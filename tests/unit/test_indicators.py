@@ -0,0 +1,66 @@
+import asyncio
+import math
+from decimal import Decimal
+
+import pytest
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.backends.indicators import (RingBuffer, RollingVWAP, TradeFlowImbalance, RealizedVolatility,
+                                            EWMAMid, BookImbalance)
+from cryptofeed.defines import BID, ASK, BUY, SELL
+
+
+def test_ring_buffer():
+    buf = RingBuffer(3)
+    for value in (1.0, 2.0, 3.0, 4.0, 5.0):
+        buf.append(value)
+    assert buf.full()
+    assert buf.total == 12.0
+    assert len(buf) == 3
+
+
+def run_trades(indicator, trades):
+    out = []
+
+    async def handler(**kwargs):
+        out.append(kwargs['indicators'])
+
+    async def run():
+        chain = indicator(handler)
+        for side, amount, price in trades:
+            await chain(feed='TEST', pair='BTC-USD', side=side, amount=Decimal(amount), price=Decimal(price), order_id=None, timestamp=0)
+
+    asyncio.run(run())
+    return out
+
+
+def test_trade_indicators():
+    trades = [(BUY, 1, 100), (SELL, 3, 110), (BUY, 1, 121), (BUY, 2, 110)]
+    out = run_trades(lambda handler: RollingVWAP(TradeFlowImbalance(RealizedVolatility(handler, window=2), window=2), window=2), trades)
+
+    assert out[0] == {'vwap': 100, 'trade_imbalance': 1, 'realized_vol': None}
+    assert out[1]['vwap'] == pytest.approx((100 + 330) / 4)
+    assert out[2]['vwap'] == pytest.approx((330 + 121) / 4)
+    assert out[3]['trade_imbalance'] == 1
+    assert out[2]['trade_imbalance'] == pytest.approx(-0.5)
+    assert out[3]['realized_vol'] == pytest.approx(math.sqrt(2 * math.log(1.1) ** 2))
+
+
+def test_book_indicators():
+    out = []
+
+    async def handler(**kwargs):
+        out.append(kwargs['indicators'])
+
+    async def run():
+        chain = EWMAMid(BookImbalance(handler, levels=2), alpha=0.5)
+        book = {BID: sd({Decimal(97): Decimal(5), Decimal(98): Decimal(1), Decimal(99): Decimal(1)}),
+                ASK: sd({Decimal(101): Decimal(1), Decimal(102): Decimal(2)})}
+        await chain(feed='TEST', pair='BTC-USD', book=book, timestamp=0)
+        book[ASK][Decimal(100)] = Decimal(1)
+        await chain(feed='TEST', pair='BTC-USD', book=book, timestamp=0)
+
+    asyncio.run(run())
+    assert out[0] == {'ewma_mid': 100, 'book_imbalance': pytest.approx(-1 / 5)}
+    assert out[1]['ewma_mid'] == pytest.approx(99.75)
+    assert out[1]['book_imbalance'] == 0
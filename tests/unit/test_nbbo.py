@@ -0,0 +1,67 @@
+import asyncio
+import random
+from decimal import Decimal
+
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.defines import BID, ASK, INLINE
+from cryptofeed.nbbo import NBBO, IndexedHeap
+
+
+def test_indexed_heap():
+    random.seed(7)
+    heap = IndexedHeap()
+    expected = {}
+    for _ in range(2000):
+        key = random.randint(0, 20)
+        if random.random() < 0.3:
+            heap.remove(key)
+            expected.pop(key, None)
+        else:
+            priority = random.randint(0, 100)
+            heap.update(key, priority)
+            expected[key] = priority
+        assert len(heap) == len(expected)
+        if expected:
+            assert heap.top() == min((p, k) for k, p in expected.items())
+        else:
+            assert heap.top() is None
+
+
+def book(bids, asks):
+    return {BID: sd({Decimal(p): Decimal(s) for p, s in bids}), ASK: sd({Decimal(p): Decimal(s) for p, s in asks})}
+
+
+def test_nbbo_books():
+    updates = []
+    depth = []
+    nbbo = NBBO(lambda *args: updates.append(args), ['BTC-USD'], depth=2, depth_callback=lambda *args: depth.append(args), dispatch=INLINE)
+
+    async def run():
+        await nbbo(feed='A', pair='BTC-USD', book=book([(99, 1), (98, 1)], [(101, 1), (102, 1)]), timestamp=0)
+        await nbbo(feed='B', pair='BTC-USD', book=book([(100, 2), (98, 3)], [(103, 2)]), timestamp=0)
+        # best bid / ask unchanged
+        await nbbo(feed='B', pair='BTC-USD', book=book([(100, 2), (97, 3)], [(103, 2)]), timestamp=0)
+        await nbbo(feed='A', pair='BTC-USD', book=book([(99, 1)], [(104, 1)]), timestamp=0)
+
+    asyncio.run(run())
+    assert updates == [('BTC-USD', 99, 1, 101, 1, 'A', 'A'),
+                       ('BTC-USD', 100, 2, 101, 1, 'B', 'A'),
+                       ('BTC-USD', 100, 2, 103, 2, 'B', 'B')]
+    assert depth[1][1] == {BID: [(100, 2), (99, 1)], ASK: [(101, 1), (102, 1)]}
+    assert depth[-1][1] == {BID: [(100, 2), (99, 1)], ASK: [(103, 2), (104, 1)]}
+
+
+def test_nbbo_deltas():
+    updates = []
+    nbbo = NBBO(lambda *args: updates.append(args), ['BTC-USD'], deltas=True, dispatch=INLINE)
+
+    async def run():
+        await nbbo(feed='A', pair='BTC-USD', book=book([(99, 1), (98, 1)], [(101, 1)]), timestamp=0)
+        await nbbo.delta(feed='A', pair='BTC-USD', delta={BID: [(Decimal(99), Decimal(0))], ASK: []}, timestamp=0)
+        await nbbo.ticker(feed='B', pair='BTC-USD', bid=Decimal('98.5'), ask=Decimal(100), timestamp=0)
+
+    asyncio.run(run())
+    assert updates == [('BTC-USD', 99, 1, 101, 1, 'A', 'A'),
+                       ('BTC-USD', 98, 1, 101, 1, 'A', 'A'),
+                       ('BTC-USD', Decimal('98.5'), None, 100, None, 'B', 'B')]
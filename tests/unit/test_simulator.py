@@ -0,0 +1,75 @@
+import asyncio
+import json
+import zlib
+from decimal import Decimal
+
+import websockets
+
+from cryptofeed.defines import COINBASE, HUOBI, OKEX
+from cryptofeed.util.simulator import Simulator
+
+
+def collect(exchange, subscribe, duration=0.5, **kwargs):
+    async def run():
+        sim = Simulator(rate=1000, seed=1, **kwargs)
+        await sim.start()
+        messages = []
+        async with websockets.connect(sim.address(exchange)) as websocket:
+            await websocket.send(json.dumps(subscribe))
+
+            async def receive():
+                async for message in websocket:
+                    messages.append(message)
+            try:
+                await asyncio.wait_for(receive(), duration)
+            except asyncio.TimeoutError:
+                pass
+        await sim.stop()
+        return messages
+
+    return asyncio.run(run())
+
+
+def test_coinbase_book_consistent():
+    messages = [json.loads(msg) for msg in collect(COINBASE, {'type': 'subscribe', 'product_ids': ['BTC-USD'], 'channels': ['level2', 'matches']})]
+    assert messages[0]['type'] == 'subscriptions'
+    assert messages[1]['type'] == 'snapshot'
+
+    book = {'buy': {Decimal(price): size for price, size in messages[1]['bids']},
+            'sell': {Decimal(price): size for price, size in messages[1]['asks']}}
+    sequence = 0
+    updates = 0
+    for msg in messages[2:]:
+        if msg['type'] == 'l2update':
+            updates += 1
+            for side, price, size in msg['changes']:
+                if Decimal(size) == 0:
+                    # only levels in the book are removed
+                    del book[side][Decimal(price)]
+                else:
+                    book[side][Decimal(price)] = size
+            assert max(book['buy']) < min(book['sell'])
+        else:
+            assert msg['type'] == 'match'
+            assert msg['sequence'] == sequence + 1
+            sequence = msg['sequence']
+    assert updates > 100
+    assert sequence > 0
+
+
+def test_huobi_compression_and_heartbeat():
+    messages = collect(HUOBI, {'sub': 'market.btcusdt.depth.step0', 'id': 1}, heartbeat=0.1)
+    messages = [json.loads(zlib.decompress(msg, 16 + zlib.MAX_WBITS)) for msg in messages]
+    assert messages[0]['status'] == 'ok'
+    assert messages[1]['ch'] == 'market.btcusdt.depth.step0'
+    assert any('ping' in msg for msg in messages)
+
+
+def test_okex_partial_then_updates():
+    messages = collect(OKEX, {'op': 'subscribe', 'args': ['spot/depth:BTC-USDT', 'spot/trade:BTC-USDT']})
+    messages = [json.loads(zlib.decompress(msg, -15)) for msg in messages]
+    assert [msg['event'] for msg in messages[:2]] == ['subscribe', 'subscribe']
+    assert messages[2]['action'] == 'partial'
+    tables = {msg['table'] for msg in messages[3:]}
+    assert tables == {'spot/depth', 'spot/trade'}
+    assert all(msg['action'] == 'update' for msg in messages[3:] if msg['table'] == 'spot/depth')
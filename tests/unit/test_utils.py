@@ -1,5 +1,16 @@
-from cryptofeed.util.book import book_delta
+import asyncio
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sortedcontainers import SortedDict as sd
+
+from cryptofeed.util.backoff import Backoff
+from cryptofeed.util.watchdog import Watchdog
+from cryptofeed.util.book import book_delta, BookView, book_arrays, l3_book_arrays, delta_arrays, L3Book
+from cryptofeed.backends._util import book_convert
 from cryptofeed.defines import BID, ASK
+from cryptofeed.exceptions import StaleBook
 
 
 def test_book_delta_simple():
@@ -49,3 +60,134 @@ def test_book_delta_empty():
 
     assert book_delta(a, b) == {'bid': [(0.9, 0), (1.0, 0), (0.8, 0)], 'ask': [(1.2, 0), (1.1, 0), (1.3, 0)]}
     assert book_delta(b, a) == {'ask': [(1.2, 0.6), (1.1, 1.1), (1.3, 2.1)], 'bid': [(0.9, 0.5), (1.0, 1), (0.8, 2)]}
+
+
+def test_book_view():
+    book = {BID: sd({Decimal('1.0'): Decimal(1), Decimal('0.9'): Decimal(2)}),
+            ASK: sd({Decimal('1.1'): Decimal(3), Decimal('1.2'): Decimal(4)})}
+    view = BookView(book)
+
+    assert list(view[BID].keys()) == [Decimal('0.9'), Decimal('1.0')]
+    assert view[ASK][Decimal('1.1')] == 3
+    assert list(reversed(view[BID])) == [Decimal('1.0'), Decimal('0.9')]
+    assert len(view[ASK]) == 2
+    with pytest.raises(TypeError):
+        view[BID][Decimal('1.0')] = 5
+
+    copy = view.copy()
+    assert copy == book
+    assert copy[BID] is not book[BID]
+
+    arrays = view.to_arrays()
+    assert arrays[BID][0].tolist() == [1.0, 0.9]
+    assert arrays[BID][1].tolist() == [1.0, 2.0]
+    assert arrays[ASK][0].tolist() == [1.1, 1.2]
+    assert view.to_arrays() is arrays
+
+    view.invalidate()
+    with pytest.raises(StaleBook):
+        view[BID]
+
+
+def test_book_view_l3():
+    book = {BID: sd({Decimal('1.0'): {'a': Decimal(1), 'b': Decimal(2)}}), ASK: sd()}
+    view = BookView(book)
+    with pytest.raises(TypeError):
+        view[BID][Decimal('1.0')]['a'] = 5
+    assert view.to_arrays()[BID][1].tolist() == [3.0]
+
+    data = {BID: {}, ASK: {}}
+    book_convert(view, data)
+    assert data[BID] == {'1.0': {'a': '1', 'b': '2'}}
+    assert book[BID][Decimal('1.0')]['a'] == Decimal(1)
+
+
+def test_book_arrays():
+    book = {BID: sd({Decimal('1.00'): Decimal('1.5'), Decimal('0.99'): Decimal(2), Decimal('0.98'): Decimal(1)}),
+            ASK: sd({Decimal('1.01'): Decimal(3)})}
+
+    arrays = book_arrays(book)
+    assert arrays[BID][0].tolist() == [1.0, 0.99, 0.98]
+    assert arrays[BID][1].dtype == np.float64
+    assert arrays[ASK][1].tolist() == [3.0]
+
+    arrays = book_arrays(book, depth=2, price_scale=100, size_scale=10)
+    assert arrays[BID][0].tolist() == [100, 99]
+    assert arrays[BID][1].tolist() == [15, 20]
+    assert arrays[BID][0].dtype == np.int64
+
+
+def test_l3_and_delta_arrays():
+    book = {BID: sd({Decimal(1): {'a': Decimal(1), 'b': Decimal(2)}, Decimal(2): {'c': Decimal(3)}}), ASK: sd()}
+    arrays = l3_book_arrays(book)
+    assert arrays[BID]['order_id'].tolist() == ['c', 'a', 'b']
+    assert arrays[BID]['size'].tolist() == [3.0, 1.0, 2.0]
+    assert len(arrays[ASK]) == 0
+
+    arrays = delta_arrays({BID: [(Decimal(1), Decimal(0))], ASK: [(Decimal(2), Decimal(1)), (Decimal(3), Decimal(1))]})
+    assert arrays[BID]['size'].tolist() == [0.0]
+    assert arrays[ASK]['price'].tolist() == [2.0, 3.0]
+
+    arrays = delta_arrays({BID: [('a', Decimal(1), Decimal(0))], ASK: []})
+    assert arrays[BID]['order_id'].tolist() == ['a']
+
+
+def test_l3_book():
+    book = L3Book()
+    book.add('a', BID, Decimal(1), Decimal(1))
+    book.add('b', BID, Decimal(1), Decimal(2))
+    book.add('c', BID, Decimal(2), Decimal(3))
+    book.add('d', ASK, Decimal(3), Decimal(1))
+    assert book[BID][Decimal(1)].size == 3
+    assert book.order('b') == (BID, Decimal(1), Decimal(2))
+
+    # a change of size keeps the order's priority, a replaced order goes to the back
+    assert book.change('a', Decimal('0.5')) == (BID, Decimal(1))
+    assert list(book[BID][Decimal(1)]) == ['a', 'b']
+    book.add('a', BID, Decimal(1), Decimal(1))
+    assert list(book[BID][Decimal(1)]) == ['b', 'a']
+    assert book.l2() == {BID: {Decimal(1): Decimal(3), Decimal(2): Decimal(3)}, ASK: {Decimal(3): Decimal(1)}}
+    assert book.l2(depth=1)[BID] == {Decimal(2): Decimal(3)}
+
+    assert book.remove('c') == (BID, Decimal(2), Decimal(3))
+    assert Decimal(2) not in book[BID]
+    assert book.remove('c') is None
+    assert book.change('c', Decimal(1)) is None
+    assert book_arrays(book)[BID][1].tolist() == [3.0]
+    assert l3_book_arrays(book)[BID]['order_id'].tolist() == ['b', 'a']
+    assert dict(BookView(book)[ASK][Decimal(3)]) == {'d': Decimal(1)}
+
+
+def test_backoff():
+    backoff = Backoff(retries=3, initial=1, maximum=5)
+    limits = []
+    while not backoff.exhausted:
+        limits.append(min(backoff.maximum, backoff.initial * 2 ** backoff.failures))
+        assert 0 <= backoff.delay() <= limits[-1]
+        backoff.failures += 1
+    assert limits == [1, 2, 4, 5]
+    backoff.reset()
+    assert not backoff.exhausted
+    assert not Backoff(retries=-1, maximum=1).exhausted
+
+
+def test_watchdog():
+    timeouts = []
+    last = {'a': None, 'b': None}
+
+    async def run():
+        watchdog = Watchdog()
+        start = watchdog.clock()
+        watchdog.add('a', 0.1, lambda: last['a'], lambda key: timeouts.append((key, watchdog.clock() - start)))
+        watchdog.add('b', 0.1, lambda: last['b'], timeouts.append)
+        watchdog.add('c', 0.1, lambda: None, timeouts.append)
+        watchdog.remove('c')
+        for _ in range(5):
+            await asyncio.sleep(0.05)
+            last['b'] = watchdog.clock()
+        assert len(watchdog) == 1
+
+    asyncio.run(run())
+    assert [key for key, _ in timeouts] == ['a']
+    # detected at the timeout, not on a later poll
+    assert 0.1 <= timeouts[0][1] < 0.15
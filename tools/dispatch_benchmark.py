@@ -0,0 +1,139 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Message handling cost of the real Huobi and OKEx handlers (decompression, routing,
+parsing and book maintenance) on a recorded session of the exchange simulator
+(cryptofeed.util.simulator), in the working tree and in other git revisions:
+
+    python tools/dispatch_benchmark.py [--count N] [revision ...]
+
+e.g. with the revisions before and after the dispatch table was introduced, the
+same frames are replayed through the message_handler of each revision, run in a
+temporary git worktree, so the routing cost is compared on the code that runs.
+'''
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from cryptofeed.defines import HUOBI, OKEX, L2_BOOK, TRADES
+
+
+# exchange -> (feed class name, exchange pair, standard pair)
+EXCHANGES = {
+    HUOBI: ('Huobi', 'btcusdt', 'BTC-USDT'),
+    OKEX: ('OKEx', 'BTC-USDT', 'BTC-USDT')
+}
+
+
+class _Websocket:
+    async def send(self, msg):
+        pass
+
+
+async def _handler(*args, **kwargs):
+    pass
+
+
+def feed(exchange):
+    # imported here, so replays use the cryptofeed of the revision being measured
+    from cryptofeed import exchanges
+
+    name, pair, std_pair = EXCHANGES[exchange]
+    # pair mappings come from the exchanges' REST apis, supply them
+    with mock.patch('cryptofeed.standards.gen_pairs', return_value={std_pair: pair}):
+        return getattr(exchanges, name)(pairs=[std_pair], channels=[L2_BOOK, TRADES], callbacks={L2_BOOK: _handler, TRADES: _handler})
+
+
+def replay(frames: dict, rounds: int = 3) -> dict:
+    """
+    Best time per frame (seconds) of each exchange's handler over the frames
+    """
+    loop = asyncio.new_event_loop()
+    ret = {}
+    for exchange, messages in frames.items():
+        instance = feed(exchange)
+
+        async def run():
+            await instance.subscribe(_Websocket())
+            # before the decode step was split out of the handlers, they decompressed the frames themselves
+            decode = getattr(instance, 'compressed', False)
+            for frame in messages:
+                if decode:
+                    frame = instance.decode(frame)
+                await instance.message_handler(frame, 0.0)
+
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            loop.run_until_complete(run())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        ret[exchange] = best / len(messages)
+    loop.close()
+    return ret
+
+
+def record(count: int) -> dict:
+    from benchmarks.exchanges import record as record_frames
+
+    loop = asyncio.new_event_loop()
+    ret = {exchange: record_frames(loop, feed(exchange), exchange, count) for exchange in EXCHANGES}
+    loop.close()
+    return ret
+
+
+def replay_revision(revision: str, frames_path: str) -> dict:
+    """
+    Replay the frames in a worktree of the revision, in a subprocess importing its cryptofeed
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, 'tree')
+        subprocess.check_call(['git', 'worktree', 'add', '--detach', '--quiet', worktree, revision])
+        try:
+            env = dict(os.environ, PYTHONPATH=worktree)
+            out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--replay', frames_path], env=env, cwd=worktree)
+        finally:
+            subprocess.call(['git', 'worktree', 'remove', '--force', worktree])
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('revisions', nargs='*', help='git revisions to compare with the working tree')
+    parser.add_argument('--count', type=int, default=20000, help='frames per exchange')
+    parser.add_argument('--replay', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay, 'rb') as fp:
+            print(json.dumps(replay(pickle.load(fp))))
+        return
+
+    frames = record(args.count)
+    results = {'working tree': replay(frames)}
+    if args.revisions:
+        with tempfile.NamedTemporaryFile(suffix='.pickle') as fp:
+            pickle.dump(frames, fp)
+            fp.flush()
+            for revision in args.revisions:
+                results[revision] = replay_revision(revision, fp.name)
+
+    print(f"{'exchange':<10} {'revision':<20} {'us/frame':>10}")
+    for exchange in EXCHANGES:
+        for revision, times in results.items():
+            print(f"{exchange:<10} {revision:<20} {times[exchange] * 1e6:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Throughput and handler latency of the feedhandler under different event loop
+implementations. Frames are replayed as fast as possible by a local websocket
+server (in its own process) to a FeedHandler run with each loop policy, and
+handled by the real exchange feed (see benchmarks/exchanges.py):
+
+    PYTHONPATH=. python tools/loop_benchmark.py [--exchange COINBASE] [--capture FILE] [--count N] [--loops asyncio uvloop] [--rounds N]
+
+The capture is a raw_message_capture file (see examples/demo_raw_data.py) of the
+exchange's feed for the pair in benchmarks/exchanges.py. Without one, a session of
+the exchange simulator is recorded. Handler latency is the time from the receipt
+of a frame to the end of its handling by the feed.
+'''
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import websockets
+
+from benchmarks.exchanges import EXCHANGES, feed, record
+from cryptofeed import FeedHandler
+from cryptofeed.defines import COINBASE
+
+
+def simulated(exchange, count):
+    loop = asyncio.new_event_loop()
+    try:
+        return record(loop, feed(exchange), exchange, count)
+    finally:
+        loop.close()
+
+
+def load(path):
+    ret = []
+    with open(path) as fp:
+        for line in fp:
+            # <receipt timestamp>: <message>
+            _, _, message = line.rstrip('\n').partition(': ')
+            if message:
+                ret.append(message)
+    return ret
+
+
+def serve(messages, ports):
+    async def handler(websocket):
+        await websocket.recv()
+        for message in messages:
+            await websocket.send(message)
+        await asyncio.sleep(3600)
+
+    async def main():
+        server = await websockets.serve(handler, 'localhost', 0)
+        ports.put(server.sockets[0].getsockname()[1])
+        await asyncio.sleep(3600)
+
+    asyncio.run(main())
+
+
+class Latency:
+    """
+    Wraps the message handler of the feed, recording the handling latency of each frame
+    """
+    def __init__(self, instance, count):
+        self.handler = instance.message_handler
+        self.count = count
+        self.done = None
+        self.latencies = []
+        self.first = None
+        instance.message_handler = self.message_handler
+
+    async def message_handler(self, msg, timestamp):
+        if self.first is None:
+            self.first = timestamp
+        await self.handler(msg, timestamp)
+        now = time.time()
+        self.latencies.append(now - timestamp)
+        if len(self.latencies) == self.count:
+            self.done.set_result(now - self.first)
+
+
+def measure(policy, exchange, address, count, results):
+    fh = FeedHandler(loop_policy=policy)
+    instance = feed(exchange)
+    latency = Latency(instance, count)
+    fh.add_feed(instance, address=address)
+    fh.run(start_loop=False)
+    loop = asyncio.get_event_loop()
+    latency.done = loop.create_future()
+    elapsed = loop.run_until_complete(latency.done)
+    fh.stop()
+    latencies = sorted(latency.latencies)
+    results.put((count / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--exchange', default=COINBASE, choices=list(EXCHANGES))
+    parser.add_argument('--capture', help='raw_message_capture file to replay')
+    parser.add_argument('--count', type=int, default=100000, help='number of simulated frames')
+    parser.add_argument('--loops', nargs='+', default=['asyncio', 'uvloop'])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    messages = load(args.capture) if args.capture else simulated(args.exchange, args.count)
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(messages, ports), daemon=True)
+    server.start()
+    address = f"ws://localhost:{ports.get()}"
+
+    print(f"{args.exchange}: {len(messages)} frames, {args.rounds} rounds")
+    for policy in args.loops:
+        if policy == 'uvloop':
+            try:
+                import uvloop  # noqa: F401
+            except ImportError:
+                print("uvloop: not installed (pip install cryptofeed[uvloop])")
+                continue
+        results = multiprocessing.Queue()
+        runs = []
+        for _ in range(args.rounds):
+            # a fresh process per run, so each loop starts from the same state
+            proc = multiprocessing.Process(target=measure, args=(policy, args.exchange, address, len(messages), results))
+            proc.start()
+            runs.append(results.get())
+            proc.join()
+        rate, p50, p99 = (sorted(values)[len(values) // 2] for values in zip(*runs))
+        print(f"{policy:<8} {rate:>10.0f} msg/s  handler latency p50 {p50 * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us (median of rounds)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+Copyright (C) 2017-2019  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Per trade cost of the brick / bar aggregators with many pairs:
+
+    python tools/renko_benchmark.py [pairs] [trades]
+'''
+import asyncio
+import random
+import sys
+import time
+from decimal import Decimal
+
+from cryptofeed.backends.aggregate import RenkoFixed, RenkoATR, RangeBars
+from cryptofeed.defines import BUY
+
+
+async def handler(**kwargs):
+    pass
+
+
+def trades(pairs, count):
+    random.seed(1)
+    prices = {pair: 1000.0 for pair in pairs}
+    ret = []
+    for i in range(count):
+        pair = random.choice(pairs)
+        prices[pair] += random.gauss(0, 2)
+        ret.append((pair, Decimal(str(round(prices[pair], 2))), i * 0.001))
+    return ret
+
+
+async def run(agg, data):
+    start = time.perf_counter()
+    for pair, price, timestamp in data:
+        await agg(feed='BENCH', pair=pair, side=BUY, amount=Decimal(1), price=price, timestamp=timestamp)
+    return time.perf_counter() - start
+
+
+def main():
+    num_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    pairs = [f'PAIR{i}-USD' for i in range(num_pairs)]
+    data = trades(pairs, count)
+
+    for name, agg in (('RenkoFixed', RenkoFixed(handler, brick_size=10)),
+                      ('RenkoATR', RenkoATR(handler, brick_size=10, interval=1)),
+                      ('RangeBars', RangeBars(handler, bar_range=10))):
+        elapsed = asyncio.run(run(agg, data))
+        print(f"{name:<12} {num_pairs} pairs {count} trades: {elapsed / count * 1e6:.2f} us/trade")
+
+
+if __name__ == '__main__':
+    main()